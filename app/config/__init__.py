@@ -11,6 +11,14 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable track modifications to save resources.
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=15)
+    # Indicator build (market_utils.process_data): worker processes, 0 or 1 builds in the calling process,
+    # and tickers per shard (also bounds the memory of a single build)
+    INDICATOR_WORKERS = int(os.getenv('INDICATOR_WORKERS', 0))
+    INDICATOR_CHUNK_SIZE = int(os.getenv('INDICATOR_CHUNK_SIZE', 200))
+    # Strategy evaluation (strategy_utils.walk_forward): worker processes, 0 or 1 runs in the calling process
+    STRATEGY_WORKERS = int(os.getenv('STRATEGY_WORKERS', 0))
+    # Trained models of the ML strategies (model_utils): models kept on disk, the least recently used ones are evicted
+    MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', 32))
 
 class DevelopmentConfig(Config):
     """Configuration for development."""
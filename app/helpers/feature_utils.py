@@ -0,0 +1,105 @@
+"""
+Module Name: feature_utils.py
+=============================
+
+Description:
+------------
+This module is the feature store of the ML strategies. The model of an ML spec trains on and predicts the signal days of a
+ticker: the indicators and the engineered features of the spec (e.g. 'x1'..'x6') and the label 'target'. Building these rows
+means loading the indicators and evaluating the strategy frame (see `strategy_utils.ml_feature_rows`), so the store keeps
+them in the columnar store (see store_utils.py) and they are built once per version of the data:
+    - one dataset per feature definition, 'features_<hash>' of the parts of the spec the rows depend on (indicators,
+      feature expressions, signal, holding period, model features): specs with the same definition share their rows
+      (e.g. 'indicator_ml' and 'indicator_ml_pooled'), and a changed definition starts a new dataset.
+    - the entry of a ticker records the version of the raw bars it was built from, with the versions of the indicator
+      and the feature code, so a ticker is rebuilt when one of them changes (`stale_features`).
+Reads are memory-mapped like every dataset of the store: one ticker, a subset of the columns and a date slice only touch
+their rows.
+
+Layout:
+-------
+    app/static/data/store/features_<hash>/manifest.json        tickers of the definition, with the versions they were built from
+    app/static/data/store/features_<hash>/<TICKER>/<col>.npy   model features, 'log_returns' (K-day trade log return) and 'target' (label)
+
+Functions:
+----------
+1. `feature_definition(spec: dict) -> dict` / `feature_dataset(spec: dict) -> str`:
+    The parts of an ML spec its feature rows depend on / the dataset of the store holding them.
+
+2. `feature_columns(spec: dict) -> List[str]`:
+    The stored columns of the feature rows of a spec.
+
+3. `stale_features(spec: dict, tickers: List[str]) -> Tuple[List[str], dict]`:
+    Returns the tickers whose stored feature rows are missing or out of date with their raw bars, and the 'ohlcv' manifest entries.
+
+4. `write_features(spec: dict, frames: dict, source: dict) -> dict`:
+    Writes the feature rows {ticker: rows} of a spec with the versions of their raw bars (`source`), returns their versions.
+
+5. `read_features(spec: dict, tickers: Optional[List[str]], start: Optional[str], end: Optional[str], columns: Optional[List[str]]) -> pd.DataFrame`:
+    The stored feature rows of several tickers as a (date, ticker) MultiIndex frame, optionally sliced by date.
+
+6. `ticker_features(spec: dict, ticker: str, start: Optional[str], end: Optional[str], columns: Optional[List[str]]) -> pd.DataFrame`:
+    The stored feature rows of one ticker, indexed by 'date'.
+
+Example Usage:
+    stale, source = stale_features(spec, ['AAPL', 'MSFT'])
+    train = ticker_features(spec, 'AAPL', end='2022-12-31')
+
+Dependencies:
+-------------
+- hashlib / json: For the dataset name of a feature definition.
+- store_utils: For the column files of the feature rows.
+- market_utils: For the version of the indicator code.
+"""
+
+
+
+import hashlib
+import json
+from . import store_utils
+from .market_utils import INDICATOR_VERSION
+
+# version of the code building the feature rows (`strategy_utils.ml_feature_rows`), bumped when it changes
+FEATURE_VERSION = 1
+FEATURE_DATASET_PREFIX = 'features_'
+
+# === Definition ===
+def feature_definition(spec):
+    return {name: spec.get(name) for name in ['indicators', 'features', 'signal', 'params', 'holding_period', 'model_features']}
+
+def feature_dataset(spec):
+    digest = hashlib.sha1(json.dumps(feature_definition(spec), sort_keys=True).encode())
+    return FEATURE_DATASET_PREFIX + digest.hexdigest()[:12]
+
+def feature_columns(spec):
+    return list(dict.fromkeys(spec['model_features'] + ['log_returns', 'target']))
+
+# === Versions ===
+def stale_features(spec, tickers):
+    # like the indicator cache: stored rows are reused as long as the raw bars and the code building them are unchanged
+    source = store_utils.read_manifest('ohlcv')['tickers']
+    stored = store_utils.read_manifest(feature_dataset(spec))['tickers']
+    stale = []
+    for ticker in tickers:
+        if ticker not in source:
+            raise KeyError(f"'{ticker}' not found in 'ohlcv' store, fetch the data first")
+        entry = stored.get(ticker, {})
+        if (entry.get('source_version') != source[ticker]['version'] or entry.get('indicator_version') != INDICATOR_VERSION
+                or entry.get('feature_version') != FEATURE_VERSION):
+            stale.append(ticker)
+    return stale, source
+
+# === Write / Read ===
+def write_features(spec, frames, source):
+    frames = {ticker: rows[feature_columns(spec)] for ticker, rows in frames.items()}
+    meta = {ticker: {'source_version': source[ticker]['version'], 'indicator_version': INDICATOR_VERSION,
+                     'feature_version': FEATURE_VERSION} for ticker in frames}
+    versions = store_utils.write_tickers(feature_dataset(spec), frames, meta=meta)
+    print(f"[helpers/feature_utils.py]: Feature rows of {list(frames)} written to '{feature_dataset(spec)}'")
+    return versions
+
+def read_features(spec, tickers=None, start=None, end=None, columns=None):
+    return store_utils.read_frame(feature_dataset(spec), tickers=tickers, columns=columns or feature_columns(spec), start=start, end=end)
+
+def ticker_features(spec, ticker, start=None, end=None, columns=None):
+    return store_utils.read_ticker(feature_dataset(spec), ticker, columns=columns or feature_columns(spec), start=start, end=end)
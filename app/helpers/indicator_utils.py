@@ -0,0 +1,555 @@
+"""
+Module Name: indicator_utils.py
+===============================
+
+Description:
+------------
+This module provides the registry of technical indicators used by the strategies in market_utils.py.
+Each indicator is registered under one or more column name patterns (e.g. 'ema_{n}', 'adx_{n}') together with the columns
+it depends on. Requesting a column resolves its pattern, computes its dependencies first and then the column itself,
+so only what a strategy asks for is computed, and a new length (e.g. 'ema_30') needs no extra code.
+Intermediates shared by several lengths (true range, directional movement, gains / losses) are registered as hidden
+columns (leading underscore): they are computed once per panel, reused by every length, and never written back to the bars.
+
+Indicators registered as batched get every requested length in one call (e.g. all the norm_volume_{n} windows share
+one pass of the rolling-median kernel over the volume panel).
+
+Recursive indicators (EMA, wilder's RMA in RSI / ADX) are registered as stateful: a computation can hand back, per ticker,
+the state of every recursion at the last bar, and `update_frames` resumes from it. Appending N bars then only needs the
+N new bars plus a short tail of history for the rolling windows, instead of the whole history.
+
+The indicators are computed on 2-D NumPy panels (one column per ticker, rows counted from the first bar of each ticker),
+so each indicator is a single array pass over all the tickers instead of a `groupby('ticker').apply(...)`.
+The kernels reproduce the pandas_ta 0.3.14b0 definitions (SMA/EMA, RSI and ADX with wilder's RMA, Bollinger Bands with ddof=0).
+
+Functions:
+----------
+1. `indicator(*patterns: str, depends: Tuple[str]) -> Callable`:
+    Decorator registering a function that computes the columns matching `patterns`.
+    `depends` lists the columns the function reads, formatted with the same parameters (e.g. 'close').
+
+2. `resolve(column: str) -> Tuple[Callable, dict, List[str]]`:
+    Returns the registered function, its parameters and its dependencies for a column name.
+
+3. `plan(columns: List[str], available: List[str]) -> List[Tuple[Callable, dict]]`:
+    Returns the ordered computation steps for the given columns, skipping the ones already available.
+
+4. `to_panel(frames: dict, columns: List[str]) -> dict` / `from_panel(panel: dict, frames: dict, columns: List[str]) -> dict`:
+    Converts {ticker: bars} into {column: 2-D array} and back.
+
+5. `compute_panel(panel: dict, columns: List[str]) -> dict`:
+    Adds the given columns (and their dependencies) to a panel.
+
+6. `compute_frames(frames: dict, columns: List[str], states: Optional[dict]) -> dict`:
+    Adds the given columns to the bars of every ticker in {ticker: bars}, in one panel pass.
+    When a `states` dict is given, it is filled with {ticker: {key: array}}, the recursion state at the last bar.
+
+7. `compute_indicators(data: pd.DataFrame, columns: List[str]) -> pd.DataFrame`:
+    Adds the given columns (and their dependencies) to the bars of a single ticker.
+
+8. `warmup_rows(columns: List[str], available: List[str]) -> int`:
+    Number of history bars `update_frames` needs before the new bars (the longest rolling window, plus one bar for the diffs).
+
+9. `update_frames(tails: dict, frames: dict, states: dict, columns: List[str]) -> dict`:
+    Computes the given columns for new bars only. `tails` holds the last `warmup_rows` history bars of every ticker,
+    `frames` the new bars, `states` the state saved by the previous computation (updated in place).
+    The result equals a computation over the whole history, up to the last bits of float rounding.
+
+Registered Columns:
+-------------------
+    log_return, sma_{n}, ema_{n}, norm_volume_{n}, rsi_{n}, adx_{n}, +DI_{n}, -DI_{n},
+    bb_{n}_lb, bb_{n}_mb, bb_{n}_ub, bb_{n}_bw, bb_{n}_p
+    hidden: _gain, _loss (RSI), _true_range, _dm_pos, _dm_neg (ADX)
+
+Example Usage:
+    data = compute_indicators(ohlcv, ['ema_21', 'ema_50', 'rsi_14'])
+
+Dependencies:
+-------------
+- numpy: For the indicator kernels on 2-D panels.
+- pandas: For the per-ticker frames going in and out of the panels.
+- scipy: For the EMA / wilder's RMA recursions (scipy.signal.lfilter).
+"""
+
+
+
+import re
+import sys
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import rank_filter
+from scipy.signal import lfilter
+
+# every indicator column built by the original `contruct_indicators`, in the same order
+DEFAULT_INDICATORS = [
+    'sma_5', 'sma_10', 'sma_21', 'sma_50', 'sma_100', 'sma_200',
+    'ema_5', 'ema_10', 'ema_21', 'ema_50', 'ema_100', 'ema_200',
+    'norm_volume_3', 'norm_volume_5', 'norm_volume_10', 'norm_volume_21', 'norm_volume_50',
+    'rsi_7', 'rsi_9', 'rsi_10', 'rsi_14',
+    'adx_3', '+DI_3', '-DI_3',
+    'adx_5', '+DI_5', '-DI_5',
+    'adx_7', '+DI_7', '-DI_7',
+    'adx_14', '+DI_14', '-DI_14',
+    'bb_5_lb', 'bb_5_mb', 'bb_5_ub', 'bb_5_bw', 'bb_5_p',
+]
+
+_REGISTRY = []
+_STATEFUL = set()
+_BATCHED = set()
+EPSILON = sys.float_info.epsilon
+# upper bound on the elements of a rolling window view processed at once
+_CHUNK_SIZE = 4_000_000
+# rolling means up to this window are computed on the window view instead of running sums
+_SHORT_WINDOW = 32
+
+# === Registry ===
+def _compile(pattern):
+    # 'adx_{n}' -> r'adx_(?P<n>\d+)'
+    parts = re.split(r'\{(\w+)\}', pattern)
+    regex = ''.join(re.escape(part) if i % 2 == 0 else rf'(?P<{part}>\d+)' for i, part in enumerate(parts))
+    return re.compile(regex)
+
+def indicator(*patterns, depends=(), stateful=False, batched=False):
+    def decorator(func):
+        for pattern in patterns:
+            _REGISTRY.append((_compile(pattern), func, depends))
+        if stateful:
+            # receives the carried state of its recursions through a `carry` argument
+            _STATEFUL.add(func)
+        if batched:
+            # receives the parameters of every requested column at once, as a list of dicts
+            _BATCHED.add(func)
+        return func
+    return decorator
+
+def resolve(column):
+    for regex, func, depends in _REGISTRY:
+        match = regex.fullmatch(column)
+        if match:
+            params = {key: int(value) for key, value in match.groupdict().items()}
+            return func, params, [d.format(**params) for d in depends]
+    raise KeyError(f"No indicator registered for column '{column}'")
+
+def plan(columns, available=()):
+    steps = []
+    done = set(available)
+
+    def visit(column):
+        if column in done:
+            return
+        func, params, depends = resolve(column)
+        for dependency in depends:
+            visit(dependency)
+        # one step can produce several columns (e.g. adx, +DI and -DI), so it is only added once
+        step = (func, params)
+        if step not in steps:
+            steps.append(step)
+        done.add(column)
+
+    for column in columns:
+        visit(column)
+    return steps
+
+# === Panels ===
+def to_panel(frames, columns):
+    # {ticker: bars} -> {column: 2-D array}, one column per ticker, rows counted from the first bar of each ticker,
+    # so a ticker listed later (or missing a day) gets exactly the numbers a per-ticker computation would give
+    lengths = [len(data) for data in frames.values()]
+    rows = max(lengths, default=0)
+    panel = {}
+    for column in columns:
+        values = np.full((rows, len(frames)), np.nan)
+        for j, data in enumerate(frames.values()):
+            values[:lengths[j], j] = data[column].to_numpy(dtype=np.float64)
+        panel[column] = values
+    return panel
+
+def from_panel(panel, frames, columns, offset=0):
+    # inverse of `to_panel`: adds the given panel columns to the bars of every ticker, the bars of a ticker start at row `offset`
+    # (tickers, columns, rows): the block of one ticker is contiguous and becomes a single-block DataFrame
+    rows = max(map(len, frames.values()), default=0)
+    stacked = np.empty((len(frames), len(columns), rows))
+    for k, column in enumerate(columns):
+        stacked[:, k, :] = panel[column][offset:offset + rows].T
+    result = {}
+    for j, (ticker, data) in enumerate(frames.items()):
+        new = pd.DataFrame(stacked[j, :, :len(data)].T, index=data.index, columns=columns)
+        result[ticker] = pd.concat([data.drop(columns=[c for c in columns if c in data.columns]), new], axis=1)
+    return result
+
+def _is_hidden(column):
+    # shared intermediates stay inside the panel
+    return column.startswith('_')
+
+def compute_panel(panel, columns, carry=None):
+    # carry: {'start': first new row, 'last': last row of every ticker, 'state': {key: array}}, see update_frames
+    steps = plan(columns, panel)
+    batched = set()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for func, params in steps:
+            if func in _BATCHED:
+                # all the lengths at the position of the first one, batched indicators only read input columns
+                if func not in batched:
+                    batched.add(func)
+                    panel.update(func(panel, [p for f, p in steps if f is func]))
+            elif func in _STATEFUL:
+                panel.update(func(panel, **params, carry=carry))
+            else:
+                panel.update(func(panel, **params))
+    return panel
+
+def _inputs(frames):
+    first = next(iter(frames.values()))
+    return [c for c in first.select_dtypes('number').columns if all(c in data.columns for data in frames.values())]
+
+def _new_carry(frames, start, states=None):
+    carry = {'start': start, 'last': np.array([len(data) - 1 for data in frames.values()]), 'state': {}}
+    if states:
+        # {ticker: {key: array}} -> {key: array with one last axis entry per ticker}
+        keys = states[next(iter(frames))]
+        carry['state'] = {key: np.stack([states[t][key] for t in frames], axis=-1) for key in keys}
+    return carry
+
+def _split_carry(carry, frames, states):
+    for j, ticker in enumerate(frames):
+        states[ticker] = {key: values[..., j] for key, values in carry['state'].items()}
+
+def compute_frames(frames, columns, states=None):
+    # one array pass per indicator for all the tickers, instead of a groupby('ticker').apply(...)
+    if not frames:
+        return {}
+    inputs = _inputs(frames)
+    carry = _new_carry(frames, 0) if states is not None else None
+    panel = compute_panel(to_panel(frames, inputs), columns, carry)
+    if carry is not None:
+        _split_carry(carry, frames, states)
+    return from_panel(panel, frames, [c for c in panel if c not in inputs and not _is_hidden(c)])
+
+def compute_indicators(data, columns):
+    return compute_frames({None: data}, columns)[None]
+
+def warmup_rows(columns, available):
+    # the rolling windows need their n - 1 previous bars, the diffs one more
+    windows = [params.get('n', 0) for _, params in plan(columns, available)]
+    return max(windows, default=0) + 1
+
+def update_frames(tails, frames, states, columns):
+    # tails: {ticker: last history bars}, all of the same length, frames: {ticker: new bars}, states: {ticker: state}
+    if not frames:
+        return {}
+    start = {len(tails[t]) for t in frames}
+    if len(start) != 1:
+        raise ValueError(f"History tails of different lengths {sorted(start)}, expected one length for all the tickers")
+    start = start.pop()
+    combined = {t: pd.concat([tails[t], frames[t]]) for t in frames}
+    inputs = _inputs(combined)
+    # the recursions resume at `start` from the carried state, the rolling windows read the tail bars
+    carry = _new_carry(combined, start, states)
+    panel = compute_panel(to_panel(combined, inputs), columns, carry)
+    _split_carry(carry, combined, states)
+    return from_panel(panel, frames, [c for c in panel if c not in inputs and not _is_hidden(c)], offset=start)
+
+# === Kernels ===
+# Every kernel takes a 2-D array (rows = bars, columns = tickers) and reproduces the pandas_ta 0.3.14b0 definitions.
+def _shift(x, periods=1):
+    out = np.full_like(x, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+def _carried(carry, key):
+    # the state a recursion resumes from, None when it starts from the first bar
+    if carry is None or carry['start'] == 0:
+        return None
+    return carry['state'][key]
+
+def _keep(carry, key, *values, offset=0):
+    # saves the state of a recursion at the last bar of every ticker
+    if carry is not None:
+        rows = carry['last'] - offset
+        cols = np.arange(len(rows))
+        carry['state'][key] = np.stack([np.asarray(v, dtype=np.float64)[rows, cols] for v in values])
+
+def _non_zero_range(x, y, carry=None, key=None):
+    # pandas_ta.utils.non_zero_range, decided per ticker over its whole history
+    diff = x - y
+    zero = (diff == 0).any(axis=0)
+    state = _carried(carry, key)
+    if state is not None:
+        zero |= state[0].astype(bool)
+    if carry is not None:
+        carry['state'][key] = zero[None].astype(np.float64)
+    return diff + EPSILON * zero
+
+def _rolling_mean(x, n):
+    # pandas rolling(n).mean(): NaN unless the n values of the window are all present
+    if n <= _SHORT_WINDOW:
+        # averaged directly, exact on constant stretches where Bollinger %B divides by a zero band
+        return _rolling_apply(x, n, np.mean)
+    out = np.full_like(x, np.nan)
+    if len(x) < n:
+        return out
+    valid = ~np.isnan(x)
+    # centre each ticker on its first value so the running sums stay small
+    ref = np.nan_to_num(x[0])
+    sums = np.cumsum(np.where(valid, x - ref, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[n:] = sums[n:] - sums[:-n]
+    counts[n:] = counts[n:] - counts[:-n]
+    out[n - 1:] = np.where(counts[n - 1:] == n, sums[n - 1:] / n + ref, np.nan)
+    return out
+
+def _rolling_apply(x, n, func, chunk=_CHUNK_SIZE):
+    # func reduces the last axis of a (rows, tickers, n) window view, the rows are processed in chunks to bound memory
+    out = np.full_like(x, np.nan)
+    if len(x) < n:
+        return out
+    windows = sliding_window_view(x, n, axis=0)
+    step = max(1, chunk // max(1, x.shape[1] * n))
+    for i in range(0, len(windows), step):
+        out[n - 1 + i:n - 1 + i + step] = func(windows[i:i + step], axis=-1)
+    return out
+
+def _median3(x):
+    # rolling median of 3 as a min/max network over the whole panel
+    out = np.full_like(x, np.nan)
+    a, b, c = x[:-2], x[1:-1], x[2:]
+    out[2:] = np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    return out
+
+def _rolling_medians(x, windows):
+    # pandas rolling(w).median() for several windows: NaN unless the w values of the window are all present.
+    # The panel is transposed and its gaps masked once, then every ticker row goes through all the windows while it is
+    # in cache, each window as a trailing rank filter (scipy's 1-D double heap, O(log w) per bar instead of a sort per window)
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    rows = np.ascontiguousarray(filled.T)
+    filters = [w for w in windows if w != 3]
+    medians = {w: np.empty_like(rows) for w in filters}
+    for j, row in enumerate(rows):
+        for w in filters:
+            # origin moves the window from centred to trailing (ending on the current bar)
+            origin = (w - 1) // 2
+            if w % 2:
+                rank_filter(row, w // 2, size=w, origin=origin, mode='nearest', output=medians[w][j])
+            else:
+                lower = rank_filter(row, w // 2 - 1, size=w, origin=origin, mode='nearest')
+                upper = rank_filter(row, w // 2, size=w, origin=origin, mode='nearest')
+                medians[w][j] = (lower + upper) / 2
+    # gaps seen so far, to drop the windows containing one
+    missing = np.vstack([np.zeros((1, x.shape[1]), dtype=np.int64), np.cumsum(~valid, axis=0)])
+    result = {}
+    for w in windows:
+        out = _median3(filled) if w == 3 else medians[w].T
+        out[:w - 1] = np.nan
+        if len(x) >= w:
+            out[w - 1:][missing[w:] - missing[:-w] > 0] = np.nan
+        result[w] = out
+    return result
+
+def _ewm_runs(x, alpha):
+    # pandas ewm(adjust=False) of one ticker with gaps inside its history: every run of observations is a linear
+    # recursion, and a gap of g rows decays the weight of the previous value to (1 - alpha)**(g + 1)
+    decay = 1 - alpha
+    out = np.full_like(x, np.nan)
+    observed = np.flatnonzero(~np.isnan(x))
+    runs = np.split(observed, np.flatnonzero(np.diff(observed) > 1) + 1)
+    prev, prev_end = None, None
+    for run in runs:
+        start, end = run[0], run[-1] + 1
+        seg = x[start:end]
+        y = np.empty_like(seg)
+        if prev is None:
+            y[0] = seg[0]
+        else:
+            weight = decay ** (start - prev_end)
+            y[0] = (weight * prev + alpha * seg[0]) / (weight + alpha)
+            out[prev_end + 1:start] = prev  # the last value is held through the gap
+        if len(seg) > 1:
+            y[1:] = lfilter([alpha], [1.0, -decay], seg[1:], zi=[decay * y[0]])[0]
+        out[start:end] = y
+        prev, prev_end = y[-1], end - 1
+    out[prev_end + 1:] = prev
+    return out
+
+def _observations(valid):
+    # running count of the observations of every ticker, and which tickers have no gap between their first and last one
+    rows = len(valid)
+    present = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    last = rows - 1 - valid[::-1].argmax(axis=0)
+    total = valid.sum(axis=0)
+    contiguous = present & (total == last - first + 1)
+    # without gaps the count is the distance to the first observation, no running sum needed
+    counts = np.clip(np.arange(1, rows + 1)[:, None] - first, 0, total)
+    gaps = present & ~contiguous
+    if gaps.any():
+        counts[:, gaps] = np.cumsum(valid[:, gaps], axis=0)
+    return counts, contiguous, first, last
+
+def _ewm_carried(x, alpha, adjust, min_periods, carry, key, state):
+    # the recursion of `_ewm` resumed at carry['start'] from the state at the previous bar, the earlier rows are left NaN
+    start = carry['start']
+    seg = x[start:]
+    valid = ~np.isnan(seg)
+    decay = 1 - alpha
+    out = np.full_like(x, np.nan)
+    if adjust:
+        num, den, counts = state
+        num = lfilter([1.0], [1.0, -decay], np.where(valid, seg, 0.0), axis=0, zi=decay * num[None])[0]
+        den = lfilter([1.0], [1.0, -decay], valid.astype(np.float64), axis=0, zi=decay * den[None])[0]
+        counts = counts + np.cumsum(valid, axis=0)
+        part = num / den
+        if min_periods > 1:
+            part[counts < min_periods] = np.nan
+        _keep(carry, key, num, den, counts, offset=start)
+    else:
+        # the new bars have no gaps (update_frames callers fall back to a full computation otherwise)
+        part = lfilter([alpha], [1.0, -decay], seg, axis=0, zi=decay * state[0][None])[0]
+        _keep(carry, key, part, offset=start)
+    out[start:] = part
+    return out
+
+def _ewm(x, alpha, adjust, min_periods=0, carry=None, key=None):
+    # pandas ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean() (ignore_na=False) for every ticker at once
+    state = _carried(carry, key)
+    if state is not None:
+        return _ewm_carried(x, alpha, adjust, min_periods, carry, key, state)
+    valid = ~np.isnan(x)
+    decay = 1 - alpha
+    counts, contiguous, first, last = _observations(valid)
+    present = valid.any(axis=0)
+    if adjust:
+        # weighted mean with weights decay**age: (sum decay**age * x) / (sum decay**age), missing values only age the others
+        num = lfilter([1.0], [1.0, -decay], np.where(valid, x, 0.0), axis=0)
+        # the weights of a ticker without gaps sum to the geometric series (1 - decay**count) / alpha
+        powers = decay ** np.arange(len(x) + 1)
+        den = (1.0 - powers[counts]) / alpha
+        gaps = present & ~contiguous
+        if gaps.any():
+            den[:, gaps] = lfilter([1.0], [1.0, -decay], valid[:, gaps].astype(np.float64), axis=0)
+        out = num / den
+        _keep(carry, key, num, den, counts)
+        # after its last observation the mean of a ticker is held
+        held = contiguous & (last < len(x) - 1)
+        for j in np.flatnonzero(held):
+            out[last[j] + 1:, j] = out[last[j], j]
+    else:
+        out = np.full_like(x, np.nan)
+        # tickers without gaps: y[t] = decay * y[t-1] + alpha * x[t], grouped by their first valid row
+        for start in np.unique(first[contiguous]):
+            cols = np.flatnonzero(contiguous & (first == start))
+            seg = x[start:, cols]
+            y = np.empty_like(seg)
+            y[0] = seg[0]
+            if len(seg) > 1:
+                y[1:] = lfilter([alpha], [1.0, -decay], seg[1:], axis=0, zi=decay * seg[:1])[0]
+            out[start:, cols] = y
+        for j in np.flatnonzero(present & ~contiguous):
+            out[:, j] = _ewm_runs(x[:, j], alpha)
+        _keep(carry, key, out)
+    if min_periods > 1:
+        out[counts < min_periods] = np.nan
+    return out
+
+def _rma(x, n, carry=None, key=None):
+    # pandas_ta.rma: wilder's moving average
+    return _ewm(x, 1.0 / n, adjust=True, min_periods=n, carry=carry, key=key)
+
+def _ema(x, n, carry=None, key=None):
+    # pandas_ta.ema: seeded with the SMA of the first n bars, then ewm(span=n, adjust=False)
+    if _carried(carry, key) is not None:
+        return _ewm(x, 2.0 / (n + 1), adjust=False, carry=carry, key=key)
+    seeded = x.copy()
+    head = x[:n]
+    seeded[:n - 1] = np.nan
+    if len(x) >= n:
+        seeded[n - 1] = np.nansum(head, axis=0) / (~np.isnan(head)).sum(axis=0)
+    return _ewm(seeded, 2.0 / (n + 1), adjust=False, carry=carry, key=key)
+
+# === Indicators ===
+@indicator('log_return', depends=('close',))
+def _log_return(panel):
+    # daily log return
+    close = panel['close']
+    return {'log_return': np.log(close) - np.log(_shift(close))}
+
+@indicator('sma_{n}', depends=('close',))
+def _sma(panel, n):
+    # indicator: Simple Moving Averages
+    return {f'sma_{n}': _rolling_mean(panel['close'], n)}
+
+@indicator('ema_{n}', depends=('close',), stateful=True)
+def _ema_indicator(panel, n, carry=None):
+    # indicator: Exponential Moving Averages
+    return {f'ema_{n}': _ema(panel['close'], n, carry, f'ema_{n}')}
+
+@indicator('norm_volume_{n}', depends=('volume',), batched=True)
+def _norm_volume(panel, batch):
+    # indicator: normalized volume, volume over its rolling median, every window from one kernel pass
+    volume = panel['volume']
+    medians = _rolling_medians(volume, [params['n'] for params in batch])
+    return {f'norm_volume_{n}': volume / median for n, median in medians.items()}
+
+@indicator('_gain', '_loss', depends=('close',))
+def _gain_loss(panel):
+    # shared by every RSI length: positive and negative close to close changes
+    change = panel['close'] - _shift(panel['close'])
+    return {
+        '_gain': np.where(change < 0, 0.0, change),
+        '_loss': np.where(change > 0, 0.0, change),
+    }
+
+@indicator('rsi_{n}', depends=('_gain', '_loss'), stateful=True)
+def _rsi(panel, n, carry=None):
+    # indicator: Relative Strength Index
+    positive_avg = _rma(panel['_gain'], n, carry, f'rsi_{n}:gain')
+    negative_avg = _rma(panel['_loss'], n, carry, f'rsi_{n}:loss')
+    return {f'rsi_{n}': 100 * positive_avg / (positive_avg + np.abs(negative_avg))}
+
+@indicator('_true_range', '_dm_pos', '_dm_neg', depends=('high', 'low', 'close'), stateful=True)
+def _directional_movement(panel, carry=None):
+    # shared by every ADX length: true range and the positive / negative directional movement
+    high, low, close = panel['high'], panel['low'], panel['close']
+    prev_close = _shift(close)
+    true_range = np.fmax(np.fmax(np.abs(_non_zero_range(high, low, carry, '_true_range:zero')), np.abs(high - prev_close)), np.abs(prev_close - low))
+    true_range[:1] = np.nan
+    up = high - _shift(high)
+    down = _shift(low) - low
+    pos = ((up > down) & (up > 0)) * up
+    neg = ((down > up) & (down > 0)) * down
+    return {
+        '_true_range': true_range,
+        '_dm_pos': np.where(np.abs(pos) < EPSILON, 0.0, pos),
+        '_dm_neg': np.where(np.abs(neg) < EPSILON, 0.0, neg),
+    }
+
+@indicator('adx_{n}', '+DI_{n}', '-DI_{n}', depends=('_true_range', '_dm_pos', '_dm_neg'), stateful=True)
+def _adx(panel, n, carry=None):
+    # indicator: Average Directional Index
+    k = 100 / _rma(panel['_true_range'], n, carry, f'adx_{n}:tr')
+    dmp = k * _rma(panel['_dm_pos'], n, carry, f'adx_{n}:pos')
+    dmn = k * _rma(panel['_dm_neg'], n, carry, f'adx_{n}:neg')
+    dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return {
+        f'adx_{n}': _rma(dx, n, carry, f'adx_{n}:dx'),
+        f'+DI_{n}': dmp,  # +DI
+        f'-DI_{n}': dmn,  # -DI
+    }
+
+@indicator('bb_{n}_lb', 'bb_{n}_mb', 'bb_{n}_ub', 'bb_{n}_bw', 'bb_{n}_p', depends=('close',), stateful=True)
+def _bbands(panel, n, carry=None):
+    # indicator: Bollinger Bands (2 standard deviations, ddof=0)
+    close = panel['close']
+    mid = _rolling_mean(close, n)
+    deviation = 2.0 * np.sqrt(_rolling_apply(close, n, np.var))
+    lower = mid - deviation
+    upper = mid + deviation
+    band = _non_zero_range(upper, lower, carry, f'bb_{n}:band_zero')
+    return {
+        f'bb_{n}_lb': lower,
+        f'bb_{n}_mb': mid,
+        f'bb_{n}_ub': upper,
+        f'bb_{n}_bw': 100 * band / mid,
+        f'bb_{n}_p': _non_zero_range(close, lower, carry, f'bb_{n}:close_zero') / band,
+    }
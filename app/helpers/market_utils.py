@@ -6,15 +6,27 @@ Description:
 ------------
 This module provides functionality for fetching, processing, and analyzing stock market data. 
 It uses various technical indicators to support different trading strategies and visualizations. 
-The module includes functions to retrieve historical stock data, add technical indicators, and apply trading strategies such as Exponential Moving Average (EMA) crossover, EMA with Relative Strength Index (RSI), RSI with Average Directional Index (ADX), and a Machine Learning-enhanced indicator strategy.
+The module includes functions to retrieve historical stock data and add technical indicators for the trading strategies
+such as Exponential Moving Average (EMA) crossover, EMA with Relative Strength Index (RSI), RSI with Average Directional Index (ADX),
+and a Machine Learning-enhanced indicator strategy, which are declared and evaluated in strategy_utils.py.
 
 Functions:
 ----------
 1. `fetch_stock_data(TICKERS, START_DATE, END_DATE) -> None`:
-    Fetches historical stock data for the given tickers and saves it to CSV files for further processing.
+    Fetches historical stock data for the given tickers and saves it to the columnar store (see store_utils.py) for further processing.
+    Only the date ranges not already stored are downloaded (see `fetch_missing_bars`).
 
-2. `process_data() -> pd.DataFrame`:
+2. `process_data(tickers: Optional[List[str]], columns: Optional[List[str]], workers: Optional[int], dtype) -> pd.DataFrame`:
     Processes the raw data to generate technical indicators such as moving averages, RSI, ADX, and Bollinger Bands.
+    Only the requested `columns` (default: every indicator) are computed, through the registry in indicator_utils.py.
+    The result is cached per ticker in the 'indicators' store and only recomputed when the raw bars of that ticker change.
+    When the raw bars only grew (e.g. an end-of-day fetch), the new bars are appended from the carried state (see `update_indicators`).
+    The other tickers are built in shards of INDICATOR_CHUNK_SIZE tickers, on a pool of `workers` processes
+    (default: INDICATOR_WORKERS of the Flask config, 0 or 1 builds in the calling process).
+    The frame is compact: indicator columns are float32 (`INDICATOR_DTYPE`) and the ticker level is integer-coded;
+    the price columns and the daily log returns the metrics compound (`FULL_PRECISION_COLUMNS`) keep the stored float64.
+    The cross-sectional loads (batch backtest, portfolio) use it; precision-sensitive callers (e.g. the single-ticker
+    strategies and the ML feature rows) pass `dtype=np.float64`.
 
 3. `construct_indicators(group: pd.DataFrame) -> pd.DataFrame`:
     Constructs various technical indicators for the given data group, including simple moving averages, exponential moving averages, RSI, ADX, and Bollinger Bands.
@@ -22,30 +34,39 @@ Functions:
 4. `log_returns(group: pd.DataFrame, periods: List[int]) -> pd.DataFrame`:
     Calculates daily log returns for the given group.
 
-5. `ema_crossover_strategy(TICKER: str) -> List`:
-    Implements an EMA crossover strategy where a signal is generated when the 21-period EMA crosses above the 50-period EMA.
+5. `visualise_pricechart() -> None`:
+    Generates a price chart with optional indicators for a selected ticker.
 
-6. `ema_crossover_rsi_strategy(TICKER: str) -> List`:
-    Implements an EMA crossover with RSI filter strategy. An additional condition is included where the RSI must be below 50 to generate a buy signal.
+6. `download_bars(TICKERS, START_DATE, END_DATE) -> pd.DataFrame`:
+    Downloads daily bars from yfinance into a long frame with 'date' and 'ticker' columns.
 
-7. `rsi_adx_strategy(TICKER: str) -> List`:
-    Implements a strategy combining RSI and ADX indicators. A signal is generated when RSI is below 45 and ADX is above 30.
+7. `missing_ranges(entry: dict, START_DATE, END_DATE) -> List[tuple]`:
+    Returns the head/tail date ranges of a stored ticker that still have to be downloaded.
 
-8. `indicator_ml_strategy(TICKER: str) -> List`:
-    Uses a machine learning model (RandomForestClassifier) to enhance the EMA crossover strategy by filtering signals based on additional indicator features.
+8. `fetch_missing_bars(dataset: str, TICKERS, START_DATE, END_DATE) -> pd.DataFrame`:
+    Downloads only the missing ranges of every ticker and merges them into the store, returns the new bars.
 
-9. `visualise_pricechart() -> None`:
-    Generates a price chart with optional indicators for a selected ticker.
+9. `stale_tickers(tickers: List[str]) -> Tuple[List[str], dict]`:
+    Returns the tickers whose cached indicators are out of date with their raw bars, and the 'ohlcv' manifest entries.
+
+10. `update_indicators(tickers: List[str], source: dict) -> List[str]`:
+    Appends the indicators of the new bars of tickers whose stored history is unchanged, resuming every recursion
+    (EMA, RSI, ADX) from the state saved with the cache, so the cost depends on the new bars and not on the history.
+    Returns the updated tickers, the others need a full computation.
+
+11. `build_indicators(missing: dict, stale: List[str]) -> dict`:
+    Computes the missing columns {ticker: [columns]} of a shard of tickers and writes their column files and carried state.
+    Runs in a worker process: the results go through the store, only the manifest entries are returned to the parent.
 
 Dependencies:
 -------------
 - numpy: For mathematical calculations.
 - pandas: For data manipulation and time-series analysis.
-- matplotlib and seaborn: For visualizing strategy performance.
 - yfinance: For fetching stock data.
-- pandas_ta: For calculating technical indicators.
-- plotly: For generating interactive price charts.
-- sklearn: For implementing machine learning-based filtering of trading signals.
+- store_utils: For the columnar on-disk store of the fetched bars.
+- concurrent.futures: For the process pool of the indicator build.
+- indicator_utils: For the registry of technical indicators, computed on NumPy panels of all the tickers.
+- metric_utils: For the benchmark performance of the fetched SPY bars.
 """
 
 
@@ -53,21 +74,20 @@ Dependencies:
 # === Libraries ===
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import yfinance as yf
-import pandas_ta as ta
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score
 
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
 
 # Add the path to the folder containing utils.py
 sys.path.append(os.path.abspath('../app/helpers'))
 
 # Import utils and reload when necessary
 from . import metric_utils
+from . import store_utils
+from . import indicator_utils
 import importlib
 importlib.reload(metric_utils)
 
@@ -75,372 +95,226 @@ importlib.reload(metric_utils)
 
 # === Data Retrieval ===
 def fetch_stock_data(TICKERS, START_DATE, END_DATE):
-    df = yf.download(tickers=TICKERS, interval="1d", start=START_DATE, end=END_DATE, auto_adjust=True, group_by='ticker')
-    # reformat for easy read from store
-    df = df.stack(level='Ticker')
-    df.columns = [s.lower() for s in df.columns]
-    df.index.names = [s.lower() for s in df.index.names]
-    df.reset_index(inplace=True)
+    # only the missing head/tail ranges of every ticker are downloaded, see fetch_missing_bars
+    df = fetch_missing_bars('ohlcv', TICKERS, START_DATE, END_DATE)
 
     # download the benchmark data for reference later
-    spy = yf.download(tickers='SPY', interval="1d", start=START_DATE, end=END_DATE, auto_adjust=True)
-    spy.reset_index(inplace=True)
-    spy.columns = [c.lower() for c in spy.columns]
-    if not spy.isnull().sum().any():
-        spy.to_csv('./app/static/data/spy.csv', index=False)
-        print("Saved to data/spy.csv")
-    spy = pd.read_csv('./app/static/data/spy.csv', parse_dates=['date'])
-    spy.set_index('date', inplace=True)
+    fetch_missing_bars('benchmark', ['SPY'], START_DATE, END_DATE)
+    spy = store_utils.read_ticker('benchmark', 'SPY')
 
     # just a performance statistic of buying and holding the S&P 500 for the entire period
     metric_utils.benchmark_performance(spy, START_DATE, END_DATE)
     # === Data Cleaning ===
     df.info()
     df.isnull().sum()
-    # format is just a csv file with column names above
-    df.to_csv('./app/static/data/ohlcv.csv', index=False)
-    print("[helpers/market_utils.py]: Data Fetched! Should see both files downloaded")
+    print("[helpers/market_utils.py]: Data Fetched! Should see both datasets in the store")
+
+def download_bars(TICKERS, START_DATE, END_DATE):
+    df = yf.download(tickers=TICKERS, interval="1d", start=START_DATE, end=END_DATE, auto_adjust=True, group_by='ticker')
+    if df.empty:
+        return pd.DataFrame(columns=['date', 'ticker'])
+    if df.columns.nlevels == 1:
+        # a single ticker comes back without the ticker level
+        df.columns = pd.MultiIndex.from_product([TICKERS, df.columns], names=['Ticker', 'Price'])
+    # reformat for easy read from store
+    df = df.stack(level='Ticker')
+    df.columns = [s.lower() for s in df.columns]
+    df.index.names = [s.lower() for s in df.index.names]
+    df.reset_index(inplace=True)
+    return df
+
+def missing_ranges(entry, START_DATE, END_DATE):
+    # `fetched_start`/`fetched_end` is the range requested so far (END_DATE is exclusive, like yfinance's `end`),
+    # this way a ticker listed after START_DATE is not re-requested on every fetch.
+    # Every range overlaps the stored bars by one day so a re-adjusted history can be detected when merging.
+    ranges = []
+    if pd.Timestamp(START_DATE) < pd.Timestamp(entry['fetched_start']):
+        ranges.append((START_DATE, str((pd.Timestamp(entry['start']) + pd.Timedelta(days=1)).date())))
+    if pd.Timestamp(END_DATE) > pd.Timestamp(entry['fetched_end']):
+        ranges.append((entry['end'], END_DATE))
+    return ranges
+
+def fetch_missing_bars(dataset, TICKERS, START_DATE, END_DATE):
+    manifest = store_utils.read_manifest(dataset)
+    # group the tickers by the range they miss, so each range is still a single batched download
+    requests = {}
+    for ticker in TICKERS:
+        entry = manifest['tickers'].get(ticker)
+        if entry is None or 'fetched_start' not in entry or not entry['rows']:
+            requests.setdefault((START_DATE, END_DATE), []).append(ticker)
+            continue
+        for date_range in missing_ranges(entry, START_DATE, END_DATE):
+            requests.setdefault(date_range, []).append(ticker)
+
+    frames = [download_bars(tickers, start, end) for (start, end), tickers in requests.items()]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['date', 'ticker', 'close'])
+    df = df.drop_duplicates(subset=['date', 'ticker'], keep='last')
+
+    # auto_adjust=True rewrites the whole history after a split/dividend,
+    # a ticker whose overlapping bar no longer matches the store is downloaded again in full
+    readjusted = []
+    for ticker, new in df.groupby('ticker'):
+        entry = manifest['tickers'].get(ticker)
+        if entry is None or not entry['rows']:
+            continue
+        stored = store_utils.read_ticker(dataset, ticker, columns=['close'], manifest=manifest)
+        overlap = stored.close.reindex(pd.DatetimeIndex(new.date)).to_numpy()
+        known = ~np.isnan(overlap)
+        if not np.allclose(overlap[known], new.close.to_numpy()[known], rtol=1e-6):
+            readjusted.append(ticker)
+
+    meta = {}
+    for ticker in TICKERS:
+        entry = manifest['tickers'].get(ticker, {})
+        meta[ticker] = {
+            'fetched_start': min(START_DATE, entry.get('fetched_start', START_DATE)),
+            'fetched_end': max(END_DATE, entry.get('fetched_end', END_DATE)),
+        }
+    if readjusted:
+        print(f"[helpers/market_utils.py]: Adjusted history changed for {readjusted}, downloading in full")
+        full_start = min(meta[t]['fetched_start'] for t in readjusted)
+        full_end = max(meta[t]['fetched_end'] for t in readjusted)
+        store_utils.write_frame(dataset, download_bars(readjusted, full_start, full_end),
+                                meta={t: meta[t] for t in readjusted})
+        df = df[~df.ticker.isin(readjusted)]
+    store_utils.merge_frame(dataset, df, meta=meta)
+    print(f"[helpers/market_utils.py]: {len(df)} new bars merged into '{dataset}' from {len(requests)} download(s)")
+    return df
 
 # === Data Processing ===
-def process_data():
-    # load the data into proper format for processing
-    df = pd.read_csv('./app/static/data/ohlcv.csv', parse_dates=['date'])
-    df.set_index(['date', 'ticker'], inplace=True)
-    df.head()
-    df_returns = df.groupby('ticker', group_keys=False).apply(log_returns)
-    df_indicators = df_returns.groupby('ticker', group_keys=False).apply(contruct_indicators)  # Update the ohlcv.csv with technical indicator data
-    print(f"Hello World {df_indicators}")
-    return df_indicators
+# bump when the indicator definitions change, so the cached indicator frames are rebuilt
+INDICATOR_VERSION = 3
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# dtype of the indicator columns handed out by process_data, the store itself keeps float64
+INDICATOR_DTYPE = np.float32
+# indicator columns that are metric inputs, read in float64 whatever the dtype of the other indicators
+FULL_PRECISION_COLUMNS = ['log_return']
+
+def stale_tickers(tickers):
+    # a cached ticker is reused as long as its raw bars (content version) and the indicator definitions are unchanged
+    source = store_utils.read_manifest('ohlcv')['tickers']
+    cache = store_utils.read_manifest('indicators')['tickers']
+    stale = []
+    for ticker in tickers:
+        if ticker not in source:
+            raise KeyError(f"'{ticker}' not found in 'ohlcv' store, fetch the data first")
+        entry = cache.get(ticker, {})
+        if entry.get('source_version') != source[ticker]['version'] or entry.get('indicator_version') != INDICATOR_VERSION:
+            stale.append(ticker)
+    return stale, source
+
+def update_indicators(tickers, source):
+    cache = store_utils.read_manifest('indicators')['tickers']
+    groups = {}
+    for ticker in tickers:
+        entry = cache.get(ticker)
+        if entry is None or entry.get('indicator_version') != INDICATOR_VERSION:
+            continue
+        added = source[ticker]['rows'] - entry['rows']
+        raw_columns = source[ticker]['columns']
+        columns = tuple(c for c in entry['columns'] if c not in raw_columns)
+        rows = indicator_utils.warmup_rows(columns, raw_columns)
+        if added <= 0 or entry['rows'] < rows:
+            continue
+        state = store_utils.read_state('indicators', ticker)
+        if state is None:
+            continue
+        bars = store_utils.read_ticker('ohlcv', ticker, columns=raw_columns, tail=rows + added)
+        tail = store_utils.read_ticker('indicators', ticker, columns=raw_columns, tail=rows)
+        # the stored history must end with the same bars (a re-adjusted download rewrites all of them),
+        # and the recursions resume on bars without gaps only
+        unchanged = bars.index[:rows].equals(tail.index) and np.array_equal(bars.to_numpy()[:rows], tail.to_numpy(), equal_nan=True)
+        if not unchanged or bars.isnull().to_numpy().any():
+            continue
+        group = groups.setdefault((columns, rows), {'tails': {}, 'frames': {}, 'states': {}})
+        group['tails'][ticker] = tail
+        group['frames'][ticker] = bars.iloc[rows:]
+        group['states'][ticker] = state
+
+    updated = []
+    for (columns, rows), group in groups.items():
+        frames = indicator_utils.update_frames(group['tails'], group['frames'], group['states'], list(columns))
+        frames = {t: data[cache[t]['columns']] for t, data in frames.items()}
+        meta = {t: {'source_version': source[t]['version']} for t in frames}
+        store_utils.append_tickers('indicators', frames, meta=meta)
+        manifest = store_utils.read_manifest('indicators')
+        for ticker in frames:
+            store_utils.write_state('indicators', ticker, group['states'][ticker], manifest=manifest)
+        updated.extend(frames)
+    if updated:
+        print(f"[helpers/market_utils.py]: Indicators appended for {updated}")
+    return updated
+
+def indicator_settings():
+    # (worker processes, tickers per shard) from the Flask config when called inside the app
+    try:
+        config = current_app.config
+    except RuntimeError:
+        config = {}
+    return config.get('INDICATOR_WORKERS', 0), config.get('INDICATOR_CHUNK_SIZE', 200)
+
+def build_indicators(missing, stale):
+    # load the data into proper format for processing, the cached columns of the fresh tickers are kept
+    manifests = {dataset: store_utils.read_manifest(dataset) for dataset in ['ohlcv', 'indicators']}
+    frames = {}
+    for ticker in missing:
+        dataset = 'ohlcv' if ticker in stale else 'indicators'
+        frames[ticker] = store_utils.read_ticker(dataset, ticker, manifest=manifests[dataset])
+    needed = list(dict.fromkeys(c for todo in missing.values() for c in todo))
+    # the state of the cached columns is kept, a ticker without one gets none (its next update is a full computation)
+    kept = {t: {} if t in stale else store_utils.read_state('indicators', t, manifest=manifests['indicators']) for t in frames}
+    states = {}
+    frames = indicator_utils.compute_frames(frames, needed, states)  # Add the technical indicator data to the ohlcv bars, one panel pass for the shard
+    # the manifest is committed by the caller, the state is tied to the version of the new column files
+    entries = store_utils.write_arrays('indicators', frames)
+    for ticker in frames:
+        if kept[ticker] is not None:
+            store_utils.write_state('indicators', ticker, {**kept[ticker], **states[ticker]}, version=entries[ticker]['version'])
+    return entries
+
+def process_data(tickers=None, columns=None, workers=None, dtype=INDICATOR_DTYPE):
+    # only the requested indicator columns (and their dependencies) are computed, see indicator_utils.py,
+    # and only for tickers whose raw bars changed or that miss a column, the others are read from the indicator cache
+    tickers = store_utils.list_tickers('ohlcv') if tickers is None else list(tickers)
+    columns = ['log_return'] + indicator_utils.DEFAULT_INDICATORS if columns is None else list(columns)
+    stale, source = stale_tickers(tickers)
+    # tickers with only new bars resume from their carried state
+    updated = update_indicators(stale, source)
+    stale = set(stale) - set(updated)
+    cache = store_utils.read_manifest('indicators')['tickers']
+    missing = {}
+    for ticker in tickers:
+        cached = [] if ticker in stale else cache[ticker]['columns']
+        todo = [c for c in columns if c not in cached]
+        if todo:
+            missing[ticker] = todo
+    if missing:
+        default_workers, chunk_size = indicator_settings()
+        workers = default_workers if workers is None else workers
+        items = list(missing.items())
+        shards = [dict(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+        stale_shards = [[t for t in shard if t in stale] for shard in shards]
+        if workers > 1 and len(shards) > 1:
+            # every worker writes the column files of its shard, only the manifest entries come back
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+                results = list(pool.map(build_indicators, shards, stale_shards))
+        else:
+            results = [build_indicators(shard, shard_stale) for shard, shard_stale in zip(shards, stale_shards)]
+        entries = {ticker: entry for result in results for ticker, entry in result.items()}
+        meta = {t: {'source_version': source[t]['version'], 'indicator_version': INDICATOR_VERSION} for t in entries}
+        store_utils.commit_entries('indicators', entries, meta=meta)
+        print(f"[helpers/market_utils.py]: Indicators computed for {list(entries)} in {len(shards)} shard(s)")
+    indicators = [c for c in columns if c not in PRICE_COLUMNS]
+    dtypes = {c: dtype for c in indicators if c not in FULL_PRECISION_COLUMNS}
+    return store_utils.read_frame('indicators', tickers=tickers, columns=PRICE_COLUMNS + indicators, dtypes=dtypes)
 
 # === Calculate Indicators ===
 def contruct_indicators(group):
-    # indicator: Simple Moving Averages
-    group['sma_5'] = ta.sma(group['close'], length=5)
-    group['sma_10'] = ta.sma(group['close'], length=10)
-    group['sma_21'] = ta.sma(group['close'], length=21)
-    group['sma_50'] = ta.sma(group['close'], length=50)
-    group['sma_100'] = ta.sma(group['close'], length=100)
-    group['sma_200'] = ta.sma(group['close'], length=200)
-
-    # indicator: Exponential Moving Averages
-    group['ema_5'] = ta.ema(group['close'], length=5)
-    group['ema_10'] = ta.ema(group['close'], length=10)
-    group['ema_21'] = ta.ema(group['close'], length=21)
-    group['ema_50'] = ta.ema(group['close'], length=50)
-    group['ema_100'] = ta.ema(group['close'], length=100)
-    group['ema_200'] = ta.ema(group['close'], length=200)
-
-    # indicator: normalized volume
-    group['norm_volume_3'] = group['volume'] / group['volume'].rolling(3).median()
-    group['norm_volume_5'] = group['volume'] / group['volume'].rolling(5).median()
-    group['norm_volume_10'] = group['volume'] / group['volume'].rolling(10).median()
-    group['norm_volume_21'] = group['volume'] / group['volume'].rolling(21).median()
-    group['norm_volume_50'] = group['volume'] / group['volume'].rolling(50).median()
-
-    # indicator: Relative Strength Index
-    group['rsi_7'] = ta.rsi(group['close'], length=7)
-    group['rsi_9'] = ta.rsi(group['close'], length=9)
-    group['rsi_10'] = ta.rsi(group['close'], length=10)
-    group['rsi_14'] = ta.rsi(group['close'], length=14)
-    
-
-    # indicator: Average Directional Index
-    adx_result = ta.adx(group['high'], group['low'], group['close'], length=3)
-    group['adx_3'] = adx_result['ADX_3']
-    group['+DI_3'] = adx_result['DMP_3']  # +DI
-    group['-DI_3'] = adx_result['DMN_3']  # -DI
-
-    adx_result = ta.adx(group['high'], group['low'], group['close'], length=5)
-    group['adx_5'] = adx_result['ADX_5']
-    group['+DI_5'] = adx_result['DMP_5']  # +DI
-    group['-DI_5'] = adx_result['DMN_5']  # -DI
-
-    adx_result = ta.adx(group['high'], group['low'], group['close'], length=7)
-    group['adx_7'] = adx_result['ADX_7']
-    group['+DI_7'] = adx_result['DMP_7']  # +DI
-    group['-DI_7'] = adx_result['DMN_7']  # -DI
-
-    adx_result = ta.adx(group['high'], group['low'], group['close'], length=14)
-    group['adx_14'] = adx_result['ADX_14']
-    group['+DI_14'] = adx_result['DMP_14']  # +DI
-    group['-DI_14'] = adx_result['DMN_14']  # -DI
-
-    # indicator: Bollinger Bands
-    bband_result = ta.bbands(group['close'])
-    group['bb_5_lb'] = bband_result['BBL_5_2.0']
-    group['bb_5_mb'] = bband_result['BBM_5_2.0']
-    group['bb_5_ub'] = bband_result['BBU_5_2.0']
-    group['bb_5_bw'] = bband_result['BBB_5_2.0']
-    group['bb_5_p'] = bband_result['BBP_5_2.0']
-
-    return group
+    # every indicator column, the strategies request only the ones they need through process_data(columns=...)
+    return indicator_utils.compute_indicators(group, indicator_utils.DEFAULT_INDICATORS)
 
 def log_returns(group, periods=[1]):
     # daily log return
-    group['log_return'] = np.log(group['close']) -  np.log(group['close'].shift(1))
-    return group
+    return indicator_utils.compute_indicators(group, ['log_return'])
 
 # === ===
-
-# === Data Analysis / Visualisation ===
-# Strategy One
-# def ema_crossover_strategy(TICKER,DEFAULT_COLUMNS,K):
-def ema_crossover_strategy(TICKER):
-    df_indicators = process_data()
-    data = df_indicators.xs(level='ticker', key=TICKER)
-    DEFAULT_COLUMNS = ['open', 'high', 'low', 'close']
-    # required indicators
-    strategy = data[DEFAULT_COLUMNS + ['rsi_14', 'log_return','ema_21', 'ema_50']].dropna().copy()
-    # strategy signal
-    strategy['signal'] = (strategy ['ema_21'] > strategy['ema_50']).astype(np.int32)
-    strategy['2d_log_return'] = strategy['log_return'].rolling(2).sum()
-    strategy['3d_log_return'] = strategy['log_return'].rolling(3).sum()
-    strategy['4d_log_return'] = strategy['log_return'].rolling(4).sum()
-    strategy['5d_log_return'] = strategy['log_return'].rolling(5).sum()
-    strategy['7d_log_return'] = strategy['log_return'].rolling(7).sum()
-    strategy['10d_log_return'] = strategy['log_return'].rolling(10).sum()
-    strategy.dropna(inplace=True)
-    K = 7 # can change the number here as desired
-    strategy['target'] = strategy[f'{K}d_log_return'].shift(-K)  
-    strategy.dropna(inplace=True)
-    strategy['log_returns'] = (strategy['signal'] * strategy['target'])
-    strategy['returns'] = np.exp(strategy.log_returns) - 1
-    # print the performance statistic of the strategy and the buy-and-hold
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    # start_date = '2013-12-31'
-    # end_date = '2024-07-31'
-    benchmark_performance_stat = metric_utils.benchmark_performance(data, start_date, end_date)
-    strategy_performance_stat = metric_utils.strategy_peformance(strategy.loc[start_date:end_date])
-    
-    # visualize the performance of the strategy
-    plt.switch_backend('Agg')  # Use non-interactive backend
-    ax = (strategy.loc[start_date:end_date].returns + 1).cumprod().plot(kind='line', label='EMA Crossover', title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
-    (np.exp(strategy.loc[start_date:end_date].log_return.cumsum())).plot(kind='line', label='Buy and Hold', grid=True, ax=ax)
-    ax.xaxis.set_major_locator(mdates.YearLocator())  # set ticks for each year
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y')) # format of the year label
-    plt.legend(loc='upper left');
-    plt.savefig(os.path.join('./app/static/data', 'plot_strategy_ema.png'))
-    plt.close()
-
-    # Price Chart
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    price_chart = metric_utils.visualise_pricechart(strategy, start=start_date, end=end_date, indicators=['EMA'], signal_marker=True)
-
-    return [benchmark_performance_stat, strategy_performance_stat, price_chart]
-
-# Strategy Two
-# def ema_crossover_strategy(TICKER,DEFAULT_COLUMNS,K, RSI_K):
-def ema_crossover_rsi_strategy(TICKER):
-    df_indicators = process_data()
-    data = df_indicators.xs(level='ticker', key=TICKER)
-    
-    DEFAULT_COLUMNS = ['open', 'high', 'low', 'close']
-    # required indicators
-    strategy = data[DEFAULT_COLUMNS + 
-        [
-            'volume', 'log_return',
-            'ema_5', 'ema_10','ema_21', 'ema_50',
-            'rsi_7', 'rsi_9', 'rsi_10', 'rsi_14',
-        ]
-    ].dropna()
-
-    K = 7 # using the same K=7 as before
-    RSI_K = 14
-
-    # strategy idea
-    # by adding more indicators as a filters, we should expect lesser trades and perhaps less volatility than previous strategy
-    strategy['signal'] = (
-        (strategy['ema_21'] > strategy['ema_50']) & 
-        (strategy[f'rsi_{RSI_K}'] < 50)
-    ).astype(np.int32)
-
-    strategy['target'] = strategy['log_return'].rolling(K).sum().shift(-K)
-    strategy.dropna(inplace=True)
-    strategy['log_returns'] = (strategy['signal'] * strategy['target'])
-    strategy['returns'] = np.exp(strategy.log_returns) - 1
-    # print the performance statistic of the strategy and the buy-and-hold
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    # start_date = '2013-12-31'
-    # end_date = '2024-07-31'
-    benchmark_performance_stat = metric_utils.benchmark_performance(data, start_date, end_date)
-    strategy_performance_stat = metric_utils.strategy_peformance(strategy.loc[start_date:end_date])
-    # visualize the performance of the strategy
-    plt.switch_backend('Agg')  # Use non-interactive backend
-    ax = (strategy.loc[start_date:end_date].returns + 1).cumprod().plot(kind='line', label='EMA Crossover + RSI', title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
-    (np.exp(strategy.loc[start_date:end_date].log_return.cumsum())).plot(kind='line', label='Buy and Hold', grid=True, ax=ax)
-    ax.xaxis.set_major_locator(mdates.YearLocator())  # set ticks for each year
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y')) # format of the year label
-    plt.legend(loc='upper left');
-    plt.savefig(os.path.join('./app/static/data', 'plot_strategy_ema_rsi.png'))
-    plt.close()
-
-    # Price Chart
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    price_chart = metric_utils.visualise_pricechart(strategy, start=start_date, end=end_date, indicators=['EMA'], signal_marker=True)
-
-    return [benchmark_performance_stat, strategy_performance_stat, price_chart]
-
-
-    
-# def rsi_adx_strategy(TICKER,DEFAULT_COLUMNS,K, RSI_K, ADX_K)):
-def rsi_adx_strategy(TICKER):
-    df_indicators = process_data()
-    data = df_indicators.xs(level='ticker', key=TICKER)
-    DEFAULT_COLUMNS = ['open', 'high', 'low', 'close']
-    # required indicators
-    strategy = data[DEFAULT_COLUMNS + 
-        [
-            'volume', 'log_return',
-            'rsi_7', 'rsi_9', 'rsi_10', 'rsi_14',
-            'adx_3', 'adx_5', 'adx_7', 'adx_14', 
-            'ema_10', 'ema_21', 'ema_50'
-
-        ]
-    ].dropna()
-
-    K = 7 # using the same K=7 as before
-    RSI_K = 14
-    ADX_K = 14
-
-    # strategy idea
-    # by adding more indicators as a filters, we should expect lesser trades and perhaps less volatility
-    strategy['signal'] = (
-        (strategy[f'rsi_{RSI_K}'] < 45) &
-        (strategy[f'adx_{ADX_K}'] > 30)
-    ).astype(np.int32)
-
-    strategy['target'] = strategy['log_return'].rolling(K).sum().shift(-K)
-    strategy.dropna(inplace=True)
-    strategy['log_returns'] = (strategy['signal'] * strategy['target'])
-    strategy['returns'] = np.exp(strategy.log_returns) - 1
-    # print the performance statistic of the strategy and the buy-and-hold
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    # start_date = '2013-12-31'
-    # end_date = '2024-07-31'
-    benchmark_performance_stat = metric_utils.benchmark_performance(data, start_date, end_date)
-    strategy_performance_stat = metric_utils.strategy_peformance(strategy.loc[start_date:end_date])
-    # visualize the performance of the strategy
-    plt.switch_backend('Agg')  # Use non-interactive backend
-    ax = (strategy.loc[start_date:end_date].returns + 1).cumprod().plot(kind='line', label='EMA Crossover', title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
-    (np.exp(strategy.loc[start_date:end_date].log_return.cumsum())).plot(kind='line', label='Buy and Hold', grid=True, ax=ax)
-    ax.xaxis.set_major_locator(mdates.YearLocator())  # set ticks for each year
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y')) # format of the year label
-    plt.legend(loc='upper left');
-    plt.savefig(os.path.join('./app/static/data', 'plot_strategy_rsi_adx.png'))
-    plt.close()
-
-    # Price Chart
-    start_date = '2010-01-01'
-    end_date = '2022-12-31'
-    chart_url = metric_utils.visualise_pricechart(strategy, start=start_date, end=end_date, indicators=['EMA'], signal_marker=True)
-
-    return [benchmark_performance_stat, strategy_performance_stat, chart_url]
-
-
-# === Analysis + Prediction Strategy ===
-# def indicator_ml_strategy(TICKER, K, RSI_K, TRAIN_END, TEST_PERIOD_WEEKS, TEST_START, FEATURES):
-def indicator_ml_strategy(TICKER):
-    df_indicators = process_data()
-    data = df_indicators.xs(level='ticker', key=TICKER)
-    DEFAULT_COLUMNS = ['open', 'high', 'low', 'close']
-    strategy = data[DEFAULT_COLUMNS +
-        [
-            'log_return',
-            'ema_5', 'ema_10', 'ema_21','ema_50',
-            'rsi_14',
-            'adx_14',
-            'norm_volume_5','norm_volume_10','norm_volume_21',
-            'bb_5_lb', 'bb_5_ub', 'bb_5_mb', 'bb_5_bw', 'bb_5_p'
-        ]
-    ].dropna()
-
-    strategy['x1'] = strategy['bb_5_ub'] - strategy['close']
-    strategy['x2'] = strategy['close'] - strategy['bb_5_mb']
-    strategy['x3'] = strategy['close'] - strategy['bb_5_lb'] 
-    strategy['x4'] = strategy['close'] - strategy['ema_10']
-    strategy['x5'] = strategy['ema_10'] - strategy['ema_21']
-    strategy['x6'] = strategy['ema_21'] - strategy['ema_50']
-
-    # create target variable to predict - idea is that since the default strategy would not be 100% accurate
-    # we will use the machine learning model to learn and filter out the signals using information from other indicators
-    K = 7 # using the same K=7 as before
-    RSI_K = 14
-
-    strategy['signal'] = (
-        strategy['ema_21'] > strategy['ema_50']
-    ).astype(np.int32)
-    strategy['returns'] = np.exp(strategy['signal'] * strategy['log_return'].rolling(K).sum().shift(-K)) - 1
-    strategy.dropna(inplace=True)
-
-    dataset = strategy[strategy.signal == 1].copy()
-    dataset['target'] = (dataset.returns > 0).astype(np.int32)
-
-    # train-test split
-
-    # We will use data from January 2010 to December 2022 as the training period (12 years of training data).
-    # After the training period, we will apply a buffer period of 3 months (12 weeks) between training and testing sets.
-    # This waiting period is suitable for our shorter-term strategies, which have a 7-day holding period.
-    # Finally, the test period will start after the waiting period, i.e., from March 2023 onwards, until the current date.
-    TRAIN_END = '2022-12-31' # define last period of training date
-    TEST_PERIOD_WEEKS = 12 # Buffer Period
-    TEST_START = str((pd.to_datetime(TRAIN_END) + pd.Timedelta(value=TEST_PERIOD_WEEKS, unit='W')).date())
-    train = dataset.loc[:TRAIN_END] # Data from the start until the end of the training period
-    test = dataset.loc[TEST_START:] # Data from the beginning of the test period (after the buffer) until the current date
-
-    # train the model 
-    FEATURES = ['rsi_14', 'adx_14', 'bb_5_bw', 'bb_5_p','norm_volume_5', 'norm_volume_10','x1', 'x2', 'x3', 'x4', 'x5', 'x6']
-    train_X, train_y = train[FEATURES], train['target']
-    model = RandomForestClassifier() # instantiate the model 
-    model.fit(train_X, train_y) # this api call trains the model
-
-    # evaluate the model accuracy
-    test_X, test_y = test[FEATURES], test['target']
-    y_pred = model.predict(test_X)
-    acc = accuracy_score(test_y, y_pred)
-    f1 = f1_score(test_y, y_pred)
-
-    print(f"Model Accuracy: {acc*100:.2f}%")
-    # print(f"Model F1-Score: {f1:.2f}")
-
-    # strategy performance using the model
-    # notice the large decrease in maximum drawdown, the model was able to filter our drastic false signals
-    # winning rate has also improved a lot
-    out_of_sample_with_model = strategy[strategy.signal == 1].loc[TEST_START:].copy()
-    out_of_sample_with_model['signal'] = y_pred
-    out_of_sample_with_model = out_of_sample_with_model[out_of_sample_with_model.signal == 1]
-    strategy_peformance_stat = metric_utils.strategy_peformance(out_of_sample_with_model)
-    # without using model
-    out_of_sample_without_model = strategy[strategy.signal == 1].loc[TEST_START:]
-
-
-    spy = pd.read_csv('./app/static/data/spy.csv', parse_dates=['date'])
-    spy.set_index('date', inplace=True)
-
-    benchmark_performance_stat = metric_utils.benchmark_performance(spy, '2023-03-25', '2024-07-25') # and we kind of beat the index as well
-    # visualize the performance of the strategy using model - notice the fewer sharp drops throughout the period
-    plt.switch_backend('Agg')  # Use non-interactive backend
-    (out_of_sample_with_model.returns + 1).cumprod().plot(kind='line', grid=True, title='Strategy Performance', figsize=(10,6));
-    plt.savefig(os.path.join('./app/static/data', 'plot_strategy_ml_indicator.png'))
-    plt.close()
-    # Strategy comparison
-    ax = (out_of_sample_without_model.returns + 1).cumprod().plot(kind='line', label='Strategy 1: EMA Crossover', title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
-    (out_of_sample_with_model.returns + 1).cumprod().plot(kind='line', label='Strategy 4: Strategy 1 + ML Filter', grid=True, ax=ax)
-    # ax.xaxis.set_major_locator(mdates.YearLocator())  # set ticks for each year
-    # ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y')) # format of the year label
-    plt.legend(loc='upper left');
-    plt.savefig(os.path.join('./app/static/data', 'plot_strategy_ml_indicator_comparison.png'))
-    plt.close()
-
-     # Price Chart
-    strategy['signal'] = 0
-    for datetime in out_of_sample_with_model.index:
-        strategy.at[datetime, 'signal'] = 1
-    chart_url = metric_utils.visualise_pricechart(strategy, start=str(test.index[0].date()), end=str(test.index[-1].date()), indicators=[], signal_marker=True)
-
-
-    return [benchmark_performance_stat, strategy_peformance_stat, chart_url]
\ No newline at end of file
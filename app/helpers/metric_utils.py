@@ -7,19 +7,43 @@ Description:
 This module contains functions for analyzing and visualizing stock performance. It provides utilities 
 for calculating benchmark buy-and-hold performance, strategy performance metrics, and generating 
 interactive price charts using Plotly.
+Every metric comes from one batched kernel (`performance_grid`) over a returns matrix with one column per
+strategy / ticker / parameter set, and is returned as a number: the display format is left to the routes.
 
 Functions:
 ----------
 1. `benchmark_performance(data: pd.DataFrame, start: str, end: str) -> dict`:
-    Computes performance metrics for a buy-and-hold strategy over a given date range.
+    Computes performance metrics for a buy-and-hold strategy over a given date range, as numbers.
 
 2. `strategy_performance(data: pd.DataFrame) -> dict`:
-    Calculates strategy-specific performance metrics based on trade signals.
+    Calculates strategy-specific performance metrics based on trade signals, as numbers.
 
 3. `visualise_pricechart(df: pd.DataFrame, start: Optional[str], end: Optional[str], 
    ticker: Optional[str], indicators: List[str], signal_marker: bool) -> go.Figure`:
     Generates an interactive price chart with optional indicators and trade signals.
 
+4. `strategy_performance_grid(signals: np.ndarray, log_returns: np.ndarray, days: Optional[np.ndarray]) -> dict`:
+    Computes the metrics of `strategy_performance` for many strategies at once (one row per strategy), as numbers.
+
+5. `trade_runs(signals: np.ndarray, daily_log_returns: np.ndarray, holding_period: int, days: Optional[np.ndarray]) -> Tuple[np.ndarray, ...]`:
+    Run-length encoding of the positions held by signals with a holding period, one trade per run of held days.
+
+6. `trade_ledger(data: pd.DataFrame, holding_period: int) -> pd.DataFrame`:
+    The trades of a strategy frame: entry, exit, holding days and return per trade.
+
+7. `trade_performance_grid(rows: np.ndarray, log_returns: np.ndarray, holding_days: np.ndarray, n_rows: int) -> dict`:
+    Per-trade metrics of many strategies (or tickers) at once, as numbers.
+
+8. `trade_performance(ledger: pd.DataFrame) -> dict`:
+    Per-trade metrics of a trade ledger, as numbers.
+
+9. `held_days(signals: np.ndarray, holding_period: int) -> np.ndarray`:
+    The days held by the signals (days on the last axis): a signal holds a position for the `holding_period` next days.
+
+10. `performance_grid(returns: np.ndarray, log_returns: bool) -> dict`:
+    The batched metric kernel: total return, volatility, Sharpe ratio, maximum drawdown, profit factor and average
+    win/loss of every column of a (days x columns) returns matrix in one pass.
+
 benchmark_performance(data: pd.DataFrame, start: str, end: str) -> dict:
 -------------------------------------------------------------------------
 Computes various benchmark performance metrics for a buy-and-hold strategy over a specified date range, 
@@ -32,7 +56,7 @@ Parameters:
 
 Returns:
     dict: A dictionary containing the calculated performance metrics like total return, 
-    annualized volatility, maximum drawdown, profit factor, etc.
+    annualized volatility, Sharpe ratio, maximum drawdown, profit factor, etc. as numbers (percentages in percent).
 
 Example Usage:
     performance_dict = benchmark_performance(stock_data, '2023-01-01', '2023-12-31')
@@ -48,7 +72,7 @@ Parameters:
 
 Returns:
     dict: A dictionary with performance metrics, including total trades, profit factor, 
-    average profit, average loss, maximum drawdown, etc.
+    average profit, average loss, maximum drawdown, Sharpe ratio, etc. as numbers (percentages in percent).
 
 Example Usage:
     strategy_perf_dict = strategy_performance(strategy_data)
@@ -74,6 +98,90 @@ Example Usage:
     fig = visualise_pricechart(stock_data, '2023-01-01', '2023-12-31', 'AAPL', ['SMA', 'EMA'], signal_marker=True)
     fig.show()
 
+strategy_performance_grid(signals: np.ndarray, log_returns: np.ndarray, days: Optional[np.ndarray]) -> dict:
+-------------------------------------------------------------------------------------------------------------
+Vectorized `strategy_performance` over a matrix of strategies, e.g. the parameter combinations of a sweep:
+`performance_grid` on the transposed rows, with the up/down days as a percentage of the trades.
+
+Parameters:
+    signals (np.ndarray): (strategies x days) 1 where a trade is taken, 0 otherwise.
+    log_returns (np.ndarray): (strategies x days) log return of the trade of each day, 0 without a trade.
+    days (Optional[np.ndarray]): number of days of each strategy when the rows have different lengths (e.g. one row per ticker),
+    the days of a row come first and the rest of the row is padded with 0.
+
+Returns:
+    dict: {metric: np.ndarray of one value per strategy}, with the keys of `strategy_performance`
+    and percentages in percent (e.g. 'total_return': 12.5 for 12.5%).
+
+Example Usage:
+    metrics = strategy_performance_grid(signals, signals * target)
+
+trade_runs(signals: np.ndarray, daily_log_returns: np.ndarray, holding_period: int, days: Optional[np.ndarray]) -> Tuple[np.ndarray, ...]:
+----------------------------------------------------------------------------------------------------------------------------------------
+`strategy_performance` counts every signal day as a trade, but consecutive signals overlap the same holding period.
+Here a day is held when a signal was given on one of the `holding_period` previous days (the trade is entered at the close
+of the signal day), and every run of consecutive held days is one trade. The runs are found with cumulative sums and the
+edges of the held mask, without a loop over the days or the strategies.
+
+Parameters:
+    signals (np.ndarray): (strategies x days) 1 on the signal days, 0 otherwise (a 1-D series is one strategy).
+    daily_log_returns (np.ndarray): (strategies x days) daily log return of the asset.
+    holding_period (int): number of days a position is held after a signal.
+    days (Optional[np.ndarray]): number of days of each row when the rows are padded (see `strategy_performance_grid`).
+
+Returns:
+    Tuple[np.ndarray, ...]: (row, start, end, log_return) of every trade in row order: the held days are [start, end),
+    the entry is the close of day start - 1. A trade still held on the last day is cut there.
+
+Example Usage:
+    row, start, end, log_return = trade_runs(signals, daily_log_returns, 7)
+
+trade_ledger(data: pd.DataFrame, holding_period: int) -> pd.DataFrame:
+------------------------------------------------------------------------
+Parameters:
+    data (pd.DataFrame): The strategy data with 'signal' and the daily 'log_return' columns and a DateTime index.
+    holding_period (int): number of days a position is held after a signal.
+
+Returns:
+    pd.DataFrame: one row per trade with 'entry' and 'exit' dates, 'holding_days', 'log_return' and 'return' (simple return).
+
+Example Usage:
+    ledger = trade_ledger(strategy_data, 7)
+
+trade_performance_grid(rows: np.ndarray, log_returns: np.ndarray, holding_days: np.ndarray, n_rows: int) -> dict:
+--------------------------------------------------------------------------------------------------------------------
+Computes the per-trade metrics of every row from the trades of `trade_runs` with weighted counts (np.bincount).
+
+Returns:
+    dict: {metric: np.ndarray of one value per row}: 'trades', 'winning_trades', 'win_rate', 'total_return',
+    'average_trade_return', 'average_holding_days', 'profit_factor', percentages in percent.
+
+trade_performance(ledger: pd.DataFrame) -> dict:
+-----------------------------------------------
+Returns:
+    dict: The metrics of `trade_performance_grid` for the trades of a ledger, as numbers.
+
+Example Usage:
+    trade_perf_dict = trade_performance(trade_ledger(strategy_data, 7))
+
+performance_grid(returns: np.ndarray, log_returns: bool) -> dict:
+-----------------------------------------------------------------
+Every metric is computed along the days axis with broadcast array operations, without a loop over the columns:
+the cumulative returns, peaks and drawdowns work on the cumulative log returns (cumulative_rets = exp(equity)).
+
+Parameters:
+    returns (np.ndarray): (days x columns) daily simple returns, one column per strategy / ticker / parameter set
+    (a 1-D series is one column). nan marks a day without data for the column, left out of every metric.
+    log_returns (bool): True when `returns` holds log returns (e.g. signals * target), saves the conversion.
+
+Returns:
+    dict: {metric: np.ndarray of one value per column}: 'days', 'up_days', 'down_days', 'total_return',
+    'annualised_volatility', 'sharpe_ratio', 'maximum_drawdown', 'profit_factor', 'average_profit',
+    'average_loss_display' (percentages in percent, nan when undefined, e.g. a profit factor without a down day).
+
+Example Usage:
+    metrics = performance_grid(prices.pct_change().to_numpy())
+
 Dependencies:
 -------------
 - pandas: Used for data manipulation and indexing.
@@ -93,70 +201,23 @@ from plotly.subplots import make_subplots
 # import warnings
 # warnings.filterwarnings("ignore")
 
+# Metrics of `performance_grid` shared by the benchmark and the strategy dicts (after the up/down days)
+PERFORMANCE_METRICS = ['total_return', 'annualised_volatility', 'sharpe_ratio', 'maximum_drawdown', 'profit_factor', 'average_profit', 'average_loss_display']
+
 def benchmark_performance(data: pd.DataFrame, start: str, end: str):
 
     df = data.loc[start:end].copy()
     returns = df.close.pct_change().dropna()
 
-    days = len(returns)
-    up = (returns > 0).sum()
-    down = (returns < 0).sum()
-
-    # returns
-    cumulative_rets = (1 + returns).cumprod()
-    total_ret = cumulative_rets.iloc[-1] - 1
-
-    # volatility
-    daily_vol = returns.std()
-    annual_vol = daily_vol * np.sqrt(252)
-
-    # maximum drawdown
-    cumulative_peaks = cumulative_rets.cummax()
-    drawdowns = (cumulative_rets - cumulative_peaks) / cumulative_peaks
-    mdd = drawdowns.min()
-
-    # average P/L
-    log_returns = (np.log(df.close) - np.log(df.close.shift(1))).dropna()
-    gross_profit = log_returns[log_returns > 0].sum()
-    gross_loss = -log_returns[log_returns < 0].sum()
-    avg_profit = gross_profit / up
-    avg_loss = gross_loss / down
-
-    # profit factor
-    pf = gross_profit / gross_loss
-    print("======================= BENCHMARK BUY-N-HOLD PERFORMANCE =======================")
-    print(f"Trading Days: {days}")
-    print(f"'Up' days: {up} ({up/days * 100:.2f}%)")
-    print(f"'Down' days: {down} ({down/days * 100:.2f}%)")
-    print(f"Total Return: {total_ret * 100:.2f}%")
-    print(f"Annualised Volatility: {annual_vol * 100:.2f}%")
-    print(f"Maximum Drawdown: {mdd * 100:.2f}%")
-    print(f"Profit Factor: {pf:.3f}")
-    print(f"Average Profit: {avg_profit:.3f}")
-    print(f"Average Loss: {avg_loss:.3f}")
-
-
-    up_days_percentage = f"{up/days * 100:.2f}"
-    down_days_percentage = f"{down/days * 100:.2f}"
-    total_return_display = f"{total_ret * 100:.2f}"
-    annualised_volatility_display = f"{annual_vol * 100:.2f}"
-    maximum_drawdown_display = f"{mdd * 100:.2f}"
-    profit_factor_display = f"{pf:.3f}"
-    average_profit_display = f"{avg_profit:.3f}"
-    average_loss_display = f"{avg_loss:.3f}"
-
+    metrics = performance_grid(returns.to_numpy())
+    days = metrics['days'][0]
     benchmark_performance_dict = {
-        "trade_days": str(days),
-        "up_days": str(up),
-        "up_days_percentage":up_days_percentage, 
-        "down_days":str(down),
-        "down_days_percentage":down_days_percentage,
-        "total_return": total_return_display,
-        "annualised_volatility": annualised_volatility_display,
-        "maximum_drawdown": maximum_drawdown_display,
-        "profit_factor":profit_factor_display,
-        "average_profit":average_profit_display,
-        "average_loss_display":average_loss_display
+        "trade_days": days.item(),
+        "up_days": metrics['up_days'][0].item(),
+        "up_days_percentage": (metrics['up_days'][0] / days * 100).item(),
+        "down_days": metrics['down_days'][0].item(),
+        "down_days_percentage": (metrics['down_days'][0] / days * 100).item(),
+        **{name: metrics[name][0].item() for name in PERFORMANCE_METRICS},
     }
 
     print(f"Benchmark performance dict = {benchmark_performance_dict}")
@@ -167,76 +228,136 @@ def strategy_peformance(data: pd.DataFrame):
     columns in `data` should contain 'signal' and 'returns'
     'returns': simple return for taking a trade (signal != 0)
     """
-    signals = data.signal
-    returns = data.returns
-
-    days = len(returns)
-    trades = signals.sum()
-    up = (returns > 0).sum()
-    down = (returns < 0).sum()
-
-    # returns
-    cumulative_rets = (1 + returns).cumprod()
-    total_ret = cumulative_rets.iloc[-1] - 1
-
-    # volatility
-    daily_vol = returns.std()
-    annual_vol = daily_vol * np.sqrt(252)
-
-    # maximum drawdown
-    cumulative_peaks = cumulative_rets.cummax()
-    drawdowns = (cumulative_rets - cumulative_peaks) / cumulative_peaks
-    mdd = drawdowns.min()
-
-    # average P/L
-    log_returns = np.log(1 + returns)
-    gross_profit = log_returns[log_returns > 0].sum()
-    gross_loss = -log_returns[log_returns < 0].sum()
-    avg_profit = gross_profit / up
-    avg_loss = gross_loss / down
-
-    # profit factor
-    pf = gross_profit / gross_loss   
-    print("=========================== STRATEGY PERFORMANCE ===========================")
-    print(f"Trades: {trades}")
-    print(f"'Up' days: {up} ({up/trades * 100:.2f}%)")
-    print(f"'Down' days: {down} ({down/trades * 100:.2f}%)")
-    print(f"Total Return: {total_ret * 100:.2f}%")
-    print(f"Annualised Volatility: {annual_vol * 100:.2f}%")
-    print(f"Maximum Drawdown: {mdd * 100:.2f}%")
-    print(f"Profit Factor: {pf:.3f}")
-    print(f"Average Profit: {avg_profit:.3f}")
-    print(f"Average Loss: {avg_loss:.3f}")
-
-
-    up_days_percentage = f"{up/trades * 100:.2f}"
-    down_days_percentage = f"{down/trades * 100:.2f}"
-    total_return_display = f"{total_ret * 100:.2f}"
-    annualised_volatility_display = f"{annual_vol * 100:.2f}"
-    maximum_drawdown_display = f"{mdd * 100:.2f}"
-    profit_factor_display = f"{pf:.3f}"
-    average_profit_display = f"{avg_profit:.3f}"
-    average_loss_display = f"{avg_loss:.3f}"
-
-    strat_performance_dict = {
-        "trades":str(trades), 
-        "up_days":str(up), 
-        "up_days_percentage":up_days_percentage, 
-        "down_days": str(down),
-        "down_days_percentage":down_days_percentage,
-        "total_return": total_return_display,
-        "annualised_volatility": annualised_volatility_display,
-        "maximum_drawdown": maximum_drawdown_display,
-        "profit_factor":profit_factor_display,
-        "average_profit":average_profit_display,
-        "average_loss_display":average_loss_display
-    }
+    signals = data.signal.to_numpy()
+    log_returns = np.log1p(data.returns.to_numpy(dtype=np.float64))
+
+    # one strategy of the batched kernel
+    metrics = strategy_performance_grid(signals[None, :], log_returns[None, :])
+    strat_performance_dict = {name: values[0].item() for name, values in metrics.items()}
 
-    
     print(f"Strategy performance dict = {strat_performance_dict}")
 
     return strat_performance_dict
 
+def performance_grid(returns: np.ndarray, log_returns: bool = False):
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    # days without data (nan, e.g. before the listing of a ticker) are left out of every metric
+    valid = ~np.isnan(returns)
+    days = valid.sum(axis=0)
+    if log_returns:
+        log_rets = np.where(valid, returns, 0)
+        simple_rets = np.expm1(log_rets)
+    else:
+        simple_rets = np.where(valid, returns, 0)
+        log_rets = np.log1p(simple_rets)
+    up = (log_rets > 0).sum(axis=0)
+    down = (log_rets < 0).sum(axis=0)
+
+    # returns: cumulative_rets = exp(equity), so every metric of the cumulative returns works on the log equity
+    # (a day without data keeps the equity flat, it changes neither the total return nor the drawdown)
+    equity = np.cumsum(log_rets, axis=0)
+    total_ret = np.expm1(log_rets.sum(axis=0))
+
+    # maximum drawdown: (cumulative_rets - peaks) / peaks = exp(equity - peak equity) - 1
+    mdd = np.expm1((equity - np.maximum.accumulate(equity, axis=0)).min(axis=0, initial=0))
+
+    # average P/L and profit factor
+    gross_profit = np.where(log_rets > 0, log_rets, 0).sum(axis=0)
+    gross_loss = -np.where(log_rets < 0, log_rets, 0).sum(axis=0)
+
+    # volatility and Sharpe ratio over the days with data, undefined (nan) without 2 days, an up or a down day
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = simple_rets.sum(axis=0) / days
+        daily_vol = np.sqrt((np.where(valid, simple_rets - mean, 0) ** 2).sum(axis=0) / (days - 1))
+        return {
+            "days": days,
+            "up_days": up,
+            "down_days": down,
+            "total_return": total_ret * 100,
+            "annualised_volatility": daily_vol * np.sqrt(252) * 100,
+            "sharpe_ratio": mean / daily_vol * np.sqrt(252),
+            "maximum_drawdown": mdd * 100,
+            "profit_factor": np.where(gross_loss > 0, gross_profit / gross_loss, np.nan),  # no down day: nan, not a signed inf
+            "average_profit": gross_profit / up,
+            "average_loss_display": gross_loss / down,
+        }
+
+def strategy_performance_grid(signals: np.ndarray, log_returns: np.ndarray, days: Optional[np.ndarray] = None):
+    if days is not None:
+        # the 0 padding after the days of a row is no data
+        log_returns = np.where(np.arange(log_returns.shape[1]) < days[:, None], log_returns, np.nan)
+    # one column per strategy
+    metrics = performance_grid(log_returns.T, log_returns=True)
+    trades = signals.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "trades": trades,
+            "up_days": metrics['up_days'],
+            "up_days_percentage": metrics['up_days'] / trades * 100,
+            "down_days": metrics['down_days'],
+            "down_days_percentage": metrics['down_days'] / trades * 100,
+            **{name: metrics[name] for name in PERFORMANCE_METRICS},
+        }
+
+def held_days(signals: np.ndarray, holding_period: int):
+    # signals[..., :t] counted by cumsum along the days (last axis), day t is held when a signal was given on days t-K..t-1
+    n = signals.shape[-1]
+    counts = np.zeros(signals.shape[:-1] + (n + 1,))
+    np.cumsum(signals, axis=-1, out=counts[..., 1:])
+    t = np.arange(n)
+    return (counts[..., t] - counts[..., np.maximum(t - holding_period, 0)]) > 0
+
+def trade_runs(signals: np.ndarray, daily_log_returns: np.ndarray, holding_period: int, days: Optional[np.ndarray] = None):
+    signals = np.atleast_2d(signals)
+    daily_log_returns = np.atleast_2d(daily_log_returns)
+    rows, n = signals.shape
+    held = held_days(signals, holding_period)
+    t = np.arange(n)
+    if days is not None:
+        held &= t < days[:, None]
+    # +1 at the first held day of a run, -1 after the last one; np.nonzero is in row order, so the starts and ends pair up
+    edges = np.diff(held.astype(np.int8), axis=1, prepend=0, append=0)
+    row, start = np.nonzero(edges == 1)
+    end = np.nonzero(edges == -1)[1]
+    equity = np.zeros((rows, n + 1))
+    np.cumsum(np.nan_to_num(daily_log_returns), axis=1, out=equity[:, 1:])
+    return row, start, end, equity[row, end] - equity[row, start]
+
+def trade_ledger(data: pd.DataFrame, holding_period: int):
+    _, start, end, log_return = trade_runs(data['signal'].to_numpy(), data['log_return'].to_numpy(), holding_period)
+    return pd.DataFrame({
+        'entry': data.index[start - 1],  # close of the signal day
+        'exit': data.index[end - 1],
+        'holding_days': end - start,
+        'log_return': log_return,
+        'return': np.expm1(log_return),
+    })
+
+def trade_performance_grid(rows: np.ndarray, log_returns: np.ndarray, holding_days: np.ndarray, n_rows: int):
+    trades = np.bincount(rows, minlength=n_rows)
+    winners = np.bincount(rows, weights=log_returns > 0, minlength=n_rows)
+    total = np.bincount(rows, weights=log_returns, minlength=n_rows)
+    gross_profit = np.bincount(rows, weights=np.where(log_returns > 0, log_returns, 0), minlength=n_rows)
+    gross_loss = -np.bincount(rows, weights=np.where(log_returns < 0, log_returns, 0), minlength=n_rows)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "trades": trades,
+            "winning_trades": winners.astype(np.int64),
+            "win_rate": winners / trades * 100,
+            "total_return": np.expm1(total) * 100,
+            "average_trade_return": np.expm1(total / trades) * 100,  # geometric mean return per trade
+            "average_holding_days": np.bincount(rows, weights=holding_days, minlength=n_rows) / trades,
+            "profit_factor": np.where(gross_loss > 0, gross_profit / gross_loss, np.nan),  # no losing trade: nan, like `performance_grid`
+        }
+
+def trade_performance(ledger: pd.DataFrame):
+    metrics = trade_performance_grid(np.zeros(len(ledger), dtype=np.int64), ledger['log_return'].to_numpy(), ledger['holding_days'].to_numpy(), 1)
+    trade_performance_dict = {name: values[0].item() for name, values in metrics.items()}
+    print(f"Trade performance dict = {trade_performance_dict}")
+    return trade_performance_dict
+
 def visualise_pricechart(
         df: pd.DataFrame,
         start: Optional[str] = None,
@@ -0,0 +1,193 @@
+"""
+Module Name: model_utils.py
+===========================
+
+Description:
+------------
+This module is the registry of the trained models of the ML strategies. Fitting a model is by far the slowest step of a
+request, while its inputs rarely change, so a fitted model is saved to disk under a key of everything the fit depends on:
+    - the ticker, the feature list and the training window,
+    - the settings of the estimator (`get_params`),
+    - the data version: a hash of the training matrix and the labels themselves, so new bars after the training window
+      keep the model, and any change of the training rows (revised bars, indicator definitions, signal) refits it.
+A request with the same inputs only loads the model and predicts. The registry keeps at most `MODEL_CACHE_SIZE` models
+(Flask config) fitted by the requests and evicts the least recently used ones. The models of the offline batch trainer are
+pinned instead: they are never evicted, so a warm-up of a universe larger than the capacity keeps every model, and a pinned
+model only goes back to the LRU when a newer batch model of the same ticker and features replaces it.
+
+Layout:
+-------
+    app/static/data/models/models.json      index of the models: key -> file, ticker, features, training window, last use, pinned
+    app/static/data/models/<key>.joblib     one fitted model per key
+
+Functions:
+----------
+1. `data_version(X: pd.DataFrame, y: pd.Series) -> str`:
+    Content hash of the training data (values, dates and column names).
+
+2. `model_key(ticker: str, features: List[str], train_window: Tuple[str, str], version: str, settings: dict) -> str`:
+    Key of a model in the registry.
+
+3. `read_model_index() -> dict`:
+    Returns the index of the registry, i.e. {'models': {key: entry}}.
+
+4. `load_model(key: str) -> Optional[object]`:
+    Loads a model and marks it as used, None when it is not in the registry.
+
+5. `model_entry(ticker: str, features: List[str], train_window: Tuple[str, str], X: pd.DataFrame, y: pd.Series, model: object) -> Tuple[str, dict]`:
+    Key and index entry of a model (before or after its fit). The execution settings (`EXECUTION_PARAMS`, e.g. n_jobs)
+    are not part of the key.
+
+6. `write_model(key: str, model: object) -> str` / `commit_models(entries: dict, pinned: bool)`:
+    The two halves of `save_model`: the model file, then the index entries of {key: meta} in one write, evicting the least
+    recently used unpinned models over the capacity. Worker processes write the model files of their tickers, the parent process
+    commits the returned entries, so only one process ever writes the index (like `store_utils.write_arrays`).
+    `pinned=True` (batch trainer) exempts the entries from the eviction.
+
+7. `save_model(key: str, model: object, meta: dict)`:
+    Saves a model and its entry.
+
+8. `cached_fit(ticker: str, features: List[str], train_window: Tuple[str, str], X: pd.DataFrame, y: pd.Series, make_model: Callable) -> Tuple[object, bool]`:
+    Returns the model fitted on (X, y), loaded from the registry when the same inputs were fitted before, and whether it was.
+
+9. `latest_model(**fields) -> Tuple[Optional[object], Optional[dict]]`:
+    Loads the most recently created model whose entry matches `fields` (e.g. ticker='*' for a pooled model), and its entry.
+
+Example Usage:
+    model, cached = cached_fit('AAPL', FEATURES, (None, '2022-12-31'), train[FEATURES], train['target'], RandomForestClassifier)
+
+Dependencies:
+-------------
+- joblib: For the model files (installed with scikit-learn).
+- numpy: For the hash of the training data.
+- flask: For the capacity of the registry in the app config.
+"""
+
+
+
+import hashlib
+import json
+import os
+import time
+import joblib
+import numpy as np
+from flask import current_app
+
+MODEL_DIR = './app/static/data/models'
+MODEL_INDEX_FILE = 'models.json'
+DEFAULT_MODEL_CACHE_SIZE = 32
+EXECUTION_PARAMS = ['n_jobs', 'verbose']
+
+# === Keys ===
+def data_version(X, y):
+    digest = hashlib.sha1(json.dumps(list(map(str, X.columns))).encode())
+    digest.update(np.ascontiguousarray(X.index.values).tobytes())
+    digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def model_key(ticker, features, train_window, version, settings):
+    key = json.dumps([ticker, list(features), list(train_window), version, settings], sort_keys=True, default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def model_settings(model):
+    # the settings that change the fit, not how it runs (e.g. n_jobs), so a model trained in parallel serves the requests
+    params = {name: value for name, value in model.get_params().items() if name not in EXECUTION_PARAMS}
+    return {type(model).__name__: params}
+
+def model_cache_size():
+    # capacity of the registry from the Flask config when called inside the app
+    try:
+        return current_app.config.get('MODEL_CACHE_SIZE', DEFAULT_MODEL_CACHE_SIZE)
+    except RuntimeError:
+        return DEFAULT_MODEL_CACHE_SIZE
+
+# === Index ===
+def read_model_index():
+    path = os.path.join(MODEL_DIR, MODEL_INDEX_FILE)
+    if not os.path.exists(path):
+        return {'models': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_model_index(index):
+    # write to a temporary file first so a reader never sees a half written index
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = os.path.join(MODEL_DIR, MODEL_INDEX_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
+
+# === Load / Save ===
+def load_model(key):
+    index = read_model_index()
+    entry = index['models'].get(key)
+    path = os.path.join(MODEL_DIR, entry['file']) if entry else None
+    if entry is None or not os.path.exists(path):
+        return None
+    model = joblib.load(path)
+    entry['last_used'] = time.time()
+    _write_model_index(index)
+    return model
+
+def model_entry(ticker, features, train_window, X, y, model):
+    version = data_version(X, y)
+    key = model_key(ticker, features, train_window, version, model_settings(model))
+    return key, {'ticker': ticker, 'features': list(features), 'train_window': list(train_window), 'data_version': version, 'rows': len(X)}
+
+def write_model(key, model):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    file = f'{key}.joblib'
+    tmp_path = os.path.join(MODEL_DIR, file + '.tmp')
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, os.path.join(MODEL_DIR, file))
+    return file
+
+def commit_models(entries, pinned=False):
+    index = read_model_index()
+    now = time.time()
+    for key, meta in entries.items():
+        previous = index['models'].get(key, {})
+        if pinned:
+            # a newer batch model of the same ticker and features replaces the pinned one, which goes back to the LRU
+            for other_key, other in index['models'].items():
+                if other_key != key and other.get('pinned') and other['ticker'] == meta['ticker'] and other['features'] == meta['features']:
+                    other['pinned'] = False
+        index['models'][key] = {**meta, 'file': f'{key}.joblib', 'created': previous.get('created', now), 'last_used': now,
+                                'pinned': pinned or previous.get('pinned', False)}
+    # least recently used models over the capacity are evicted, the pinned models of the batch trainer are kept
+    unpinned = [key for key, entry in index['models'].items() if not entry.get('pinned')]
+    by_use = sorted(unpinned, key=lambda k: index['models'][k]['last_used'], reverse=True)
+    for evicted in by_use[max(model_cache_size(), 1):]:
+        entry = index['models'].pop(evicted)
+        print(f"[helpers/model_utils.py]: Evicting model of '{entry.get('ticker')}' ({evicted[:10]})")
+        if os.path.exists(os.path.join(MODEL_DIR, entry['file'])):
+            os.remove(os.path.join(MODEL_DIR, entry['file']))
+    _write_model_index(index)
+
+def save_model(key, model, meta):
+    write_model(key, model)
+    commit_models({key: meta})
+
+def cached_fit(ticker, features, train_window, X, y, make_model):
+    model = make_model()
+    key, meta = model_entry(ticker, features, train_window, X, y, model)
+    cached = load_model(key)
+    if cached is not None:
+        print(f"[helpers/model_utils.py]: Using the cached model of '{ticker}' ({key[:10]})")
+        return cached, True
+    print(f"[helpers/model_utils.py]: Fitting the model of '{ticker}' ({key[:10]})")
+    model.fit(X, y)
+    save_model(key, model, meta)
+    return model, False
+
+def latest_model(**fields):
+    # the most recent model whose entry matches every field, e.g. a pooled model that has no single training set to hash
+    index = read_model_index()
+    matches = [key for key, entry in index['models'].items() if all(entry.get(name) == value for name, value in fields.items())]
+    for key in sorted(matches, key=lambda k: index['models'][k]['created'], reverse=True):
+        model = load_model(key)
+        if model is not None:
+            return model, index['models'][key]
+    return None, None
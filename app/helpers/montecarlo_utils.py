@@ -0,0 +1,118 @@
+"""
+Module Name: montecarlo_utils.py
+================================
+
+Description:
+------------
+This module puts confidence intervals on the metrics of a backtest with a block bootstrap: the daily returns of the strategy
+are resampled thousands of times as blocks of consecutive days (drawn with replacement, wrapping around the end of the series),
+so the resampled paths keep the dependence between the days of a trade, and the spread of the metrics over the paths
+says how much of the single backtest result is luck.
+
+The paths are never materialised as a (days x resamples) matrix. A path is a sequence of blocks, and the metrics only need
+a few statistics of every block: its log return, the highest and the lowest point of its log equity, its largest drop
+(peak before trough) and its gross profit and loss. These are computed once for every possible block start, then every
+path is combined block by block (like the nodes of `window_utils.window_drawdown`), for all the resamples at once:
+O(resamples x days / block_size) instead of O(resamples x days).
+
+Functions:
+----------
+1. `block_starts(days: int, resamples: int, block_size: int, seed: Optional[int]) -> np.ndarray`:
+    Random first day of every block of every resampled path, (resamples x blocks).
+
+2. `block_statistics(log_returns: np.ndarray, block_size: int) -> dict`:
+    Statistics of the block of `block_size` days starting at every day of the series (wrapping around the end).
+
+3. `bootstrap_metrics(returns: np.ndarray, resamples: int, block_size: int, seed: Optional[int]) -> dict`:
+    Total return, maximum drawdown and profit factor of every resampled path, {metric: np.ndarray (resamples,)}.
+    The profit factor of a path without a losing day is nan.
+
+4. `confidence_intervals(returns: np.ndarray, resamples: int, block_size: int, confidence: float, seed: Optional[int]) -> dict`:
+    [low, median, high] of every metric of `bootstrap_metrics`, with the settings of the bootstrap.
+    Fewer than `MIN_BOOTSTRAP_DAYS` days of returns (e.g. an ML filter that kept no signal) give nan intervals.
+
+Example Usage:
+    intervals = confidence_intervals(strategy_data['returns'], resamples=10_000, block_size=7)
+
+Dependencies:
+-------------
+- numpy: For the random blocks and the vectorized combination of the paths.
+"""
+
+
+
+import numpy as np
+
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_METRICS = ['total_return', 'maximum_drawdown', 'profit_factor']
+MIN_BOOTSTRAP_DAYS = 2  # a single day resamples to the same path every time
+
+def block_starts(days, resamples=BOOTSTRAP_RESAMPLES, block_size=10, seed=0):
+    rng = np.random.default_rng(seed)
+    blocks = -(-days // block_size)
+    return rng.integers(0, days, size=(resamples, blocks), dtype=np.int32)
+
+def block_statistics(log_returns, block_size):
+    # (days x block_size) days of the block starting at every day, wrapping around the end of the series
+    days = len(log_returns)
+    window = log_returns[(np.arange(days)[:, None] + np.arange(block_size)) % days]
+    equity = np.cumsum(window, axis=1)
+    return {
+        'log_return': equity[:, -1],
+        'peak': equity.max(axis=1),
+        'trough': equity.min(axis=1),
+        'drop': (np.maximum.accumulate(equity, axis=1) - equity).max(axis=1),
+        'gross_profit': np.where(window > 0, window, 0).sum(axis=1),
+        'gross_loss': -np.where(window < 0, window, 0).sum(axis=1),
+    }
+
+def bootstrap_metrics(returns, resamples=BOOTSTRAP_RESAMPLES, block_size=10, seed=0):
+    returns = np.asarray(returns, dtype=np.float64)
+    log_returns = np.log1p(returns[~np.isnan(returns)])
+    days = len(log_returns)
+    if days == 0:
+        raise ValueError("No returns to resample")
+    block_size = max(1, min(block_size, days))
+    # (blocks x resamples), so the starts of one block of every path are contiguous
+    starts = np.ascontiguousarray(block_starts(days, resamples, block_size, seed).T)
+    # every path has `days` days: the last block is cut to the days left
+    last_size = days - (len(starts) - 1) * block_size
+    full, last = block_statistics(log_returns, block_size), block_statistics(log_returns, last_size)
+
+    equity = np.zeros(resamples)
+    peak = np.full(resamples, -np.inf)
+    drop = np.zeros(resamples)
+    gross_profit = np.zeros(resamples)
+    gross_loss = np.zeros(resamples)
+    for k, s in enumerate(starts):
+        block = last if k == len(starts) - 1 else full
+        # the largest drop is inside a block, or from the peak of the earlier blocks to the trough of this one
+        drop = np.maximum(np.maximum(drop, block['drop'][s]), peak - (equity + block['trough'][s]))
+        peak = np.maximum(peak, equity + block['peak'][s])
+        equity += block['log_return'][s]
+        gross_profit += block['gross_profit'][s]
+        gross_loss += block['gross_loss'][s]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'total_return': np.expm1(equity) * 100,
+            'maximum_drawdown': np.expm1(-drop) * 100,
+            # a path without a losing day has no profit factor
+            'profit_factor': np.where(gross_loss > 0, gross_profit / gross_loss, np.nan),
+        }
+
+def confidence_intervals(returns, resamples=BOOTSTRAP_RESAMPLES, block_size=10, confidence=0.95, seed=0):
+    returns = np.asarray(returns, dtype=np.float64)
+    days = np.count_nonzero(~np.isnan(returns))
+    if days < MIN_BOOTSTRAP_DAYS:
+        print(f"[helpers/montecarlo_utils.py]: {days} day(s) of returns, no confidence interval")
+        intervals = {name: [np.nan] * 3 for name in BOOTSTRAP_METRICS}
+        return {**intervals, 'resamples': resamples, 'block_size': block_size, 'confidence': confidence}
+    metrics = bootstrap_metrics(returns, resamples, block_size, seed)
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for name, values in metrics.items():
+        # the paths without a profit factor (nan) are left out of its interval, nan when no path has one
+        values = values[~np.isnan(values)]
+        intervals[name] = np.percentile(values, [tail, 50, 100 - tail]).tolist() if len(values) else [np.nan] * 3
+    print(f"[helpers/montecarlo_utils.py]: {resamples} resamples of blocks of {block_size} days, {confidence:.0%} intervals = {intervals}")
+    return {**intervals, 'resamples': resamples, 'block_size': block_size, 'confidence': confidence}
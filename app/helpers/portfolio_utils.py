@@ -0,0 +1,123 @@
+"""
+Module Name: portfolio_utils.py
+===============================
+
+Description:
+------------
+This module simulates a portfolio over a universe of tickers from the signal panels of a strategy.
+The strategies of strategy_utils.py are evaluated one ticker at a time (`signal * target`, compounded per ticker),
+here the capital is allocated across every ticker held on a day, with a sizing rule and transaction costs.
+Every step works on (dates x tickers) arrays of the whole universe, without a loop over the dates or the tickers.
+
+A signal on day t holds a position for the `holding_period` next days (like `metric_utils.held_days`): the weights of
+day t are known at the close of day t-1 and earn the close-to-close return of day t. Changing the weights costs
+the slippage and the commission (in basis points of the traded value) on the day they take effect.
+
+Functions:
+----------
+1. `rolling_volatility(returns: np.ndarray, window: int) -> np.ndarray`:
+    Trailing standard deviation of the daily returns of the `window` days before every day, from cumulative sums.
+
+2. `position_weights(held: np.ndarray, returns: np.ndarray, sizing: str, target_volatility: float, vol_window: int, max_leverage: float) -> np.ndarray`:
+    Weights of the held positions of every day:
+        - 'equal': the capital is split equally between the positions of the day.
+        - 'vol_target': every position gets an equal share of the `target_volatility` (annualised), i.e. a weight inversely
+          proportional to its trailing volatility.
+    The gross exposure of a day is capped at `max_leverage`, the rest stays in cash.
+
+3. `simulate_portfolio(signals: pd.DataFrame, returns: pd.DataFrame, holding_period: int, sizing: str, target_volatility: float,
+   vol_window: int, slippage_bps: float, commission_bps: float, max_leverage: float, initial_capital: float) -> pd.DataFrame`:
+    Simulates the portfolio, returns a frame on the dates of the panels with the daily 'returns' (net of costs), the 'equity',
+    the gross 'exposure', the number of 'positions', the 'turnover' and the 'costs'.
+
+4. `portfolio_performance(portfolio: pd.DataFrame) -> dict`:
+    Computes the performance metrics of a simulated portfolio (total return, CAGR, volatility, Sharpe ratio, maximum drawdown,
+    exposure, turnover and costs) as numbers, percentages in percent like the other performance dicts.
+
+Dependencies:
+-------------
+- numpy: For the array operations over the universe.
+- pandas: For the date index of the panels and the result frame.
+- metric_utils: For the days held by the signals (`held_days`) and the performance metrics (`performance_grid`).
+"""
+
+
+
+import numpy as np
+import pandas as pd
+from . import metric_utils
+
+SIZING_RULES = ['equal', 'vol_target']
+
+def rolling_volatility(returns, window=21):
+    # std (ddof=1) of the returns of days t-window..t-1, known at the close of day t-1; nan without `window` returns
+    missing = np.isnan(returns)
+    values = np.where(missing, 0, returns)
+    sums = np.zeros((len(returns) + 1,) + returns.shape[1:])
+    squares = np.zeros(sums.shape)
+    counts = np.zeros(sums.shape)
+    np.cumsum(values, axis=0, out=sums[1:])
+    np.cumsum(values ** 2, axis=0, out=squares[1:])
+    np.cumsum(~missing, axis=0, out=counts[1:])
+    t = np.arange(len(returns))
+    before = np.maximum(t - window, 0)
+    n = counts[t] - counts[before]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (sums[t] - sums[before]) / n
+        variance = ((squares[t] - squares[before]) - n * mean ** 2) / (n - 1)
+    return np.where(n >= window, np.sqrt(np.maximum(variance, 0)), np.nan)
+
+def position_weights(held, returns, sizing='equal', target_volatility=0.15, vol_window=21, max_leverage=1.0):
+    if sizing not in SIZING_RULES:
+        raise ValueError(f"Unknown sizing rule '{sizing}', options: {SIZING_RULES}")
+    positions = held.sum(axis=1, keepdims=True)
+    if sizing == 'equal':
+        weights = held / np.maximum(positions, 1)
+    else:
+        # annualised trailing volatility of every ticker, a position without enough history is not taken
+        volatility = rolling_volatility(returns, vol_window) * np.sqrt(252)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = np.where(held & (volatility > 0), target_volatility / volatility, 0) / np.maximum(positions, 1)
+    gross = weights.sum(axis=1, keepdims=True)
+    return weights * np.minimum(1, max_leverage / np.where(gross > 0, gross, 1))
+
+def simulate_portfolio(signals, returns, holding_period=7, sizing='equal', target_volatility=0.15, vol_window=21,
+                       slippage_bps=5.0, commission_bps=1.0, max_leverage=1.0, initial_capital=100_000.0):
+    returns = returns.reindex(index=signals.index, columns=signals.columns)
+    daily = returns.to_numpy(dtype=np.float64)
+    # positions of day t from the signals of days t-K..t-1, only on days the ticker trades
+    held = metric_utils.held_days(signals.to_numpy().T, holding_period).T & ~np.isnan(daily)
+    weights = position_weights(held, daily, sizing, target_volatility, vol_window, max_leverage)
+
+    # every change of weight is traded at the close before the day it takes effect
+    turnover = np.abs(np.diff(weights, axis=0, prepend=0)).sum(axis=1)
+    costs = turnover * (slippage_bps + commission_bps) / 10_000
+    portfolio_returns = (weights * np.nan_to_num(daily)).sum(axis=1) - costs
+    return pd.DataFrame({
+        'returns': portfolio_returns,
+        'equity': initial_capital * np.cumprod(1 + portfolio_returns),
+        'exposure': weights.sum(axis=1),
+        'positions': held.sum(axis=1),
+        'turnover': turnover,
+        'costs': costs,
+    }, index=signals.index)
+
+def portfolio_performance(portfolio):
+    returns = portfolio['returns'].to_numpy()
+    years = len(returns) / 252
+    metrics = metric_utils.performance_grid(returns)
+
+    portfolio_performance_dict = {
+        "trade_days": metrics['days'][0].item(),
+        "total_return": metrics['total_return'][0].item(),
+        "cagr": (((1 + metrics['total_return'][0] / 100) ** (1 / years) - 1) * 100).item(),
+        "annualised_volatility": metrics['annualised_volatility'][0].item(),
+        "sharpe_ratio": metrics['sharpe_ratio'][0].item(),
+        "maximum_drawdown": metrics['maximum_drawdown'][0].item(),
+        # allocation and costs
+        "average_exposure": portfolio['exposure'].mean() * 100,
+        "annual_turnover": portfolio['turnover'].sum() / years,
+        "total_costs": portfolio['costs'].sum() * 100,
+    }
+    print(f"Portfolio performance dict = {portfolio_performance_dict}")
+    return portfolio_performance_dict
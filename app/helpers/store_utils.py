@@ -0,0 +1,357 @@
+"""
+Module Name: store_utils.py
+===========================
+
+Description:
+------------
+This module provides a small columnar on-disk store for daily bar data, replacing the `ohlcv.csv` / `spy.csv` round-trips.
+Every dataset (e.g. 'ohlcv', 'benchmark') is partitioned per ticker, and every column of a ticker is saved as its own
+NumPy `.npy` file. Reads use memory-mapping, so loading a single ticker and a subset of its columns only touches those files,
+and a date range slice only touches the matching rows.
+
+Layout:
+-------
+    app/static/data/store/<dataset>/manifest.json        index of tickers: rows, first/last date, columns, content version
+    app/static/data/store/<dataset>/<TICKER>/date.npy    trading dates of the ticker (sorted ascending)
+    app/static/data/store/<dataset>/<TICKER>/<col>.npy   one array per column, aligned with date.npy
+    app/static/data/store/<dataset>/<TICKER>/_state.npz  optional carried state of the ticker (e.g. indicator recursions)
+
+Functions:
+----------
+1. `read_manifest(dataset: str) -> dict`:
+    Returns the index of a dataset, i.e. {'tickers': {ticker: {'rows', 'start', 'end', 'columns', 'version'}}}.
+
+2. `list_tickers(dataset: str) -> List[str]`:
+    Returns the tickers stored in a dataset.
+
+3. `write_ticker(dataset: str, ticker: str, data: pd.DataFrame, meta: Optional[dict]) -> str`:
+    Writes the bars of one ticker (DateTime index, one column per field) and returns its content version.
+    `meta` holds extra fields kept in the manifest entry of the ticker (e.g. the date range that was requested).
+
+4. `write_frame(dataset: str, df: pd.DataFrame, meta: Optional[dict]) -> dict`:
+    Writes a long frame with 'date' and 'ticker' columns (or a (date, ticker) MultiIndex), partitioned per ticker.
+    `meta` maps a ticker to the extra manifest fields of that ticker.
+
+5. `merge_frame(dataset: str, df: pd.DataFrame, meta: Optional[dict]) -> dict`:
+    Same as `write_frame`, but merges the bars into the stored ones instead of replacing them (new bars win on equal dates).
+
+6. `write_tickers(dataset: str, frames: dict, meta: Optional[dict]) -> dict`:
+    Writes {ticker: bars} where every ticker may have its own set of columns.
+
+7. `read_ticker(dataset: str, ticker: str, columns: Optional[List[str]], start: Optional[str], end: Optional[str], tail: Optional[int]) -> pd.DataFrame`:
+    Reads one ticker, optionally a subset of columns and a date range, indexed by 'date'.
+    `tail` keeps only the last rows of the range, without touching the earlier ones.
+
+8. `read_frame(dataset: str, tickers: Optional[List[str]], columns: Optional[List[str]], start: Optional[str], end: Optional[str], dtypes: Optional[dict]) -> pd.DataFrame`:
+    Reads several tickers into a (date, ticker) MultiIndex frame, the same shape `process_data` used to build from `ohlcv.csv`.
+    The columns are filled in place from the memory-mapped files and the index is built from integer codes,
+    so no per-ticker frame, string ticker column or sorted copy is ever materialised.
+    `dtypes` casts columns while reading (e.g. {'ema_21': np.float32}).
+
+9. `append_tickers(dataset: str, frames: dict, meta: Optional[dict]) -> dict`:
+    Appends bars after the last stored date of every ticker in {ticker: bars}, growing the column files in place,
+    so the cost depends on the appended rows only. The version chains the previous version with the appended rows.
+
+10. `write_state(dataset: str, ticker: str, state: dict)` / `read_state(dataset: str, ticker: str) -> Optional[dict]`:
+    Saves / loads {key: array} kept beside the bars of a ticker. The state is tied to the version of the bars it was saved with:
+    `read_state` returns None when nothing was saved or the bars were written again since.
+
+11. `write_arrays(dataset: str, frames: dict) -> dict` / `commit_entries(dataset: str, entries: dict, meta: Optional[dict])`:
+    The two halves of `write_tickers`: the column files of every ticker, then the manifest entries in one write.
+    Worker processes write the column files of their tickers, the parent process commits the returned entries,
+    so only one process ever writes the manifest.
+
+Example Usage:
+    store_utils.write_frame('ohlcv', df)
+    aapl = store_utils.read_ticker('ohlcv', 'AAPL', columns=['close'], start='2010-01-01', end='2022-12-31')
+
+Dependencies:
+-------------
+- numpy: For the column files and memory-mapped reads.
+- pandas: For the frames handed back to the callers.
+"""
+
+
+
+import hashlib
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = './app/static/data'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+MANIFEST_FILE = 'manifest.json'
+DATE_COLUMN = 'date'
+STATE_FILE = '_state.npz'
+STATE_VERSION_KEY = '__version__'
+
+# === Paths / Manifest ===
+def _dataset_dir(dataset):
+    return os.path.join(STORE_DIR, dataset)
+
+def _ticker_dir(dataset, ticker):
+    return os.path.join(_dataset_dir(dataset), ticker)
+
+def read_manifest(dataset):
+    path = os.path.join(_dataset_dir(dataset), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'tickers': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(dataset, manifest):
+    # write to a temporary file first so a reader never sees a half written index
+    os.makedirs(_dataset_dir(dataset), exist_ok=True)
+    path = os.path.join(_dataset_dir(dataset), MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def list_tickers(dataset):
+    return sorted(read_manifest(dataset)['tickers'])
+
+def _ticker_entry(dataset, ticker, manifest=None):
+    manifest = manifest if manifest is not None else read_manifest(dataset)
+    entry = manifest['tickers'].get(ticker)
+    if entry is None:
+        raise KeyError(f"'{ticker}' not found in '{dataset}' store")
+    return entry
+
+# === Write ===
+def _save_array(path, values):
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, values)
+    os.replace(tmp_path, path)
+
+def _write_ticker_arrays(dataset, ticker, data):
+    data = data.sort_index()
+    dates = data.index.values.astype('datetime64[D]')
+    folder = _ticker_dir(dataset, ticker)
+    os.makedirs(folder, exist_ok=True)
+    # content version: changes whenever a date or a value of this ticker changes
+    digest = hashlib.sha1(dates.tobytes())
+    _save_array(os.path.join(folder, f'{DATE_COLUMN}.npy'), dates)
+    for column in data.columns:
+        values = np.ascontiguousarray(data[column].to_numpy())
+        digest.update(column.encode())
+        digest.update(values.tobytes())
+        _save_array(os.path.join(folder, f'{column}.npy'), values)
+    return {
+        'rows': len(dates),
+        'start': str(dates[0]) if len(dates) else None,
+        'end': str(dates[-1]) if len(dates) else None,
+        'columns': list(data.columns),
+        'version': digest.hexdigest(),
+    }
+
+def write_ticker(dataset, ticker, data, meta=None):
+    manifest = read_manifest(dataset)
+    entry = _write_ticker_arrays(dataset, ticker, data)
+    manifest['tickers'][ticker] = {**manifest['tickers'].get(ticker, {}), **entry, **(meta or {})}
+    _write_manifest(dataset, manifest)
+    return entry['version']
+
+def write_arrays(dataset, frames):
+    # column files only, returns {ticker: manifest entry} for `commit_entries`
+    return {ticker: _write_ticker_arrays(dataset, ticker, data) for ticker, data in frames.items()}
+
+def commit_entries(dataset, entries, meta=None):
+    meta = meta or {}
+    manifest = read_manifest(dataset)
+    for ticker, entry in entries.items():
+        manifest['tickers'][ticker] = {**manifest['tickers'].get(ticker, {}), **entry}
+    for ticker, extra in meta.items():
+        if ticker in manifest['tickers']:
+            manifest['tickers'][ticker].update(extra)
+    _write_manifest(dataset, manifest)
+    return {ticker: entry['version'] for ticker, entry in entries.items()}
+
+def write_tickers(dataset, frames, meta=None):
+    # frames: {ticker: bars with a DateTime index}, the manifest is written once for all of them
+    return commit_entries(dataset, write_arrays(dataset, frames), meta)
+
+def _append_array(path, values):
+    # grows a 1-D .npy file in place: numpy pads the header so a longer shape fits, the rows are added at the end
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (shape[0] + len(values),),
+        })
+        if version == (1, 0) and len(shape) == 1 and header.tell() == offset and values.dtype == dtype:
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(values).tobytes())
+            f.seek(0)
+            f.write(header.getvalue())
+            return
+    # no room left in the header (or another dtype): rewrite the whole file
+    _save_array(path, np.concatenate([np.load(path), values]))
+
+def append_tickers(dataset, frames, meta=None):
+    # frames: {ticker: bars dated after the last stored bar, with the stored columns}, rows are appended in place
+    meta = meta or {}
+    manifest = read_manifest(dataset)
+    versions = {}
+    for ticker, data in frames.items():
+        entry = _ticker_entry(dataset, ticker, manifest)
+        data = data.sort_index()
+        dates = data.index.values.astype('datetime64[D]')
+        if not len(dates):
+            versions[ticker] = entry['version']
+            continue
+        if entry['end'] and dates[0] <= np.datetime64(entry['end'], 'D'):
+            raise ValueError(f"Appended bars of '{ticker}' start on {dates[0]}, not after the stored end {entry['end']}")
+        if set(data.columns) != set(entry['columns']):
+            raise ValueError(f"Appended bars of '{ticker}' have columns {list(data.columns)}, stored {entry['columns']}")
+        folder = _ticker_dir(dataset, ticker)
+        # chained version: the previous version stands for the rows already stored
+        digest = hashlib.sha1(entry['version'].encode())
+        digest.update(dates.tobytes())
+        for column in entry['columns']:
+            values = np.ascontiguousarray(data[column].to_numpy())
+            digest.update(column.encode())
+            digest.update(values.tobytes())
+            _append_array(os.path.join(folder, f'{column}.npy'), values)
+        # the dates go last, they bound what a reader slices out of the column files
+        _append_array(os.path.join(folder, f'{DATE_COLUMN}.npy'), dates)
+        entry.update({
+            'rows': entry['rows'] + len(dates),
+            'start': entry['start'] or str(dates[0]),
+            'end': str(dates[-1]),
+            'version': digest.hexdigest(),
+        })
+        versions[ticker] = entry['version']
+    for ticker, extra in meta.items():
+        if ticker in manifest['tickers']:
+            manifest['tickers'][ticker].update(extra)
+    _write_manifest(dataset, manifest)
+    return versions
+
+def _write_groups(dataset, df, meta, merge):
+    if isinstance(df.index, pd.MultiIndex):
+        df = df.reset_index()
+    manifest = read_manifest(dataset)
+    frames = {}
+    for ticker, group in df.groupby('ticker'):
+        data = group.drop(columns='ticker').set_index(DATE_COLUMN)
+        if merge and ticker in manifest['tickers']:
+            stored = read_ticker(dataset, ticker, manifest=manifest)
+            # new bars replace the stored bars of the same date
+            data = pd.concat([stored[~stored.index.isin(data.index)], data])
+        frames[ticker] = data
+    return write_tickers(dataset, frames, meta)
+
+def write_frame(dataset, df, meta=None):
+    return _write_groups(dataset, df, meta, merge=False)
+
+def merge_frame(dataset, df, meta=None):
+    return _write_groups(dataset, df, meta, merge=True)
+
+# === State ===
+def write_state(dataset, ticker, state, manifest=None, version=None):
+    # saved after the bars, together with the version of the bars it belongs to
+    # (`version` is given by a worker whose bars are not in the manifest yet)
+    version = version or _ticker_entry(dataset, ticker, manifest)['version']
+    path = os.path.join(_ticker_dir(dataset, ticker), STATE_FILE)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **state, **{STATE_VERSION_KEY: np.array(version)})
+    os.replace(tmp_path, path)
+
+def read_state(dataset, ticker, manifest=None):
+    path = os.path.join(_ticker_dir(dataset, ticker), STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as state:
+        if str(state[STATE_VERSION_KEY]) != _ticker_entry(dataset, ticker, manifest)['version']:
+            return None
+        return {key: state[key] for key in state.files if key != STATE_VERSION_KEY}
+
+# === Read ===
+def _date_bounds(dates, start, end):
+    # inclusive on both ends, the same as .loc[start:end] on a DateTime index
+    i = np.searchsorted(dates, np.datetime64(start, 'D'), side='left') if start else 0
+    j = np.searchsorted(dates, np.datetime64(end, 'D'), side='right') if end else len(dates)
+    return i, j
+
+def read_ticker(dataset, ticker, columns=None, start=None, end=None, manifest=None, tail=None):
+    entry = _ticker_entry(dataset, ticker, manifest)
+    columns = entry['columns'] if columns is None else list(columns)
+    missing = [c for c in columns if c not in entry['columns']]
+    if missing:
+        raise KeyError(f"Columns {missing} not stored for '{ticker}' in '{dataset}' store")
+    folder = _ticker_dir(dataset, ticker)
+    dates = np.load(os.path.join(folder, f'{DATE_COLUMN}.npy'), mmap_mode='r')
+    i, j = _date_bounds(dates, start, end)
+    if tail is not None:
+        i = max(i, j - tail)
+    data = {c: np.array(np.load(os.path.join(folder, f'{c}.npy'), mmap_mode='r')[i:j]) for c in columns}
+    index = pd.DatetimeIndex(np.array(dates[i:j]).astype('datetime64[ns]'), name=DATE_COLUMN)
+    return pd.DataFrame(data, index=index, columns=columns)
+
+def to_days(dates):
+    # datetime64 -> int32 day offsets since 1970-01-01
+    return np.asarray(dates).astype('datetime64[D]').astype(np.int64).astype(np.int32)
+
+def from_days(days):
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[ns]'), name=DATE_COLUMN)
+
+def read_frame(dataset, tickers=None, columns=None, start=None, end=None, dtypes=None):
+    manifest = read_manifest(dataset)
+    # the ticker level is sorted, like the sort_index of the old layout
+    tickers = sorted(manifest['tickers'] if tickers is None else set(tickers))
+    dtypes = dtypes or {}
+    entries = [_ticker_entry(dataset, t, manifest) for t in tickers]
+    if columns is None:
+        columns = list(dict.fromkeys(c for entry in entries for c in entry['columns']))
+        required = False
+    else:
+        columns = list(columns)
+        required = True
+    # the date rows of every ticker first, then each column is scattered straight into its place in (date, ticker) order
+    bounds, ticker_days = [], []
+    for ticker in tickers:
+        dates = np.load(os.path.join(_ticker_dir(dataset, ticker), f'{DATE_COLUMN}.npy'), mmap_mode='r')
+        i, j = _date_bounds(dates, start, end)
+        bounds.append((i, j))
+        ticker_days.append(to_days(dates[i:j]))
+    lengths = [len(d) for d in ticker_days]
+    day = np.concatenate(ticker_days) if ticker_days else np.empty(0, dtype=np.int32)
+    code = np.repeat(np.arange(len(tickers), dtype=np.int32), lengths)
+    order = np.lexsort((code, day))
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    data = {}
+    for column in columns:
+        values = None
+        for k, (ticker, entry) in enumerate(zip(tickers, entries)):
+            rows = position[offsets[k]:offsets[k + 1]]
+            if column not in entry['columns']:
+                if required:
+                    raise KeyError(f"Columns {[column]} not stored for '{ticker}' in '{dataset}' store")
+                if values is None:
+                    values = np.empty(len(order), dtype=dtypes.get(column, np.float64))
+                values[rows] = np.nan
+                continue
+            stored = np.load(os.path.join(_ticker_dir(dataset, ticker), f'{column}.npy'), mmap_mode='r')
+            if values is None:
+                values = np.empty(len(order), dtype=dtypes.get(column, stored.dtype))
+            values[rows] = stored[bounds[k][0]:bounds[k][1]]
+        data[column] = values if values is not None else np.empty(0, dtype=dtypes.get(column, np.float64))
+
+    sorted_day = day[order]
+    new_day = np.concatenate([[True], sorted_day[1:] != sorted_day[:-1]]) if len(order) else np.empty(0, dtype=bool)
+    day_level = sorted_day[new_day]
+    day_codes = np.cumsum(new_day) - 1
+    levels = [from_days(day_level), pd.Index(tickers, name='ticker')]
+    index = pd.MultiIndex(levels=levels, codes=[day_codes, code[order]], names=[DATE_COLUMN, 'ticker'], verify_integrity=False)
+    return pd.DataFrame(data, index=index, columns=columns)
@@ -0,0 +1,951 @@
+"""
+Module Name: strategy_utils.py
+==============================
+
+Description:
+------------
+This module provides the strategy engine of the stock analyzer. A strategy is a declarative spec in `STRATEGIES`:
+the indicators it needs, the signal expression over those columns, the holding period K of a trade and the evaluation window.
+The engine runs the pipeline shared by every strategy (load, valid rows, signal, K-day target, metrics, plots) from the spec,
+and the indicators of several strategies are loaded in a single `process_data` call, so one request can evaluate
+several strategies on the same loaded data (see `run_strategies`).
+
+Signal and feature expressions are evaluated with `pd.DataFrame.eval` on the columns of the strategy frame,
+e.g. 'ema_21 > ema_50 and rsi_14 < 50'.
+
+Functions:
+----------
+1. `load_strategy_data(TICKER: str, specs: List[dict]) -> pd.DataFrame`:
+    Loads the price columns and the union of the indicators of the specs for one ticker, in full precision.
+
+2. `strategy_frame(data: pd.DataFrame, spec: dict, targets: Optional[pd.DataFrame]) -> pd.DataFrame`:
+    Builds the frame of a strategy: the rows where its indicators are defined, its features, the 'signal',
+    the K-day forward log return 'target' (read from the `targets` of `forward_return_frame`) and the trade returns 'log_returns' and 'returns'.
+
+3. `plot_performance(strategy: pd.DataFrame, spec: dict) -> None`:
+    Saves the cumulative return of the strategy against buy-and-hold to the plot file of the spec.
+
+4. `evaluate_strategy(data: pd.DataFrame, spec: dict, benchmarks: Optional[dict], targets: Optional[pd.DataFrame], ticker: Optional[str]) -> List`:
+    Evaluates a strategy over its window and returns [benchmark_performance, strategy_performance, price_chart].
+    The benchmark performance is memoized per window in `benchmarks`. The strategy performance also holds the metrics
+    of its trade ledger under 'per_trade' (see `metric_utils.trade_ledger`) and the block-bootstrap confidence intervals of
+    its total return, maximum drawdown and profit factor under 'bootstrap' (see `montecarlo_utils.confidence_intervals`).
+
+5. `evaluate_ml_strategy(data: pd.DataFrame, spec: dict, targets: Optional[pd.DataFrame], ticker: Optional[str]) -> List`:
+    Trains a RandomForestClassifier on the signals of the spec to filter them, evaluated out-of-sample after the training period.
+    The training and test rows of the ticker are read from the feature store (see `ml_ticker_split`), `data` only rebuilds them when they are stale.
+    The fitted model is reused from the model registry while its training data is unchanged (see `model_utils.cached_fit`).
+    A spec with 'pooled_features' uses the pooled model of the universe instead (see `train_pooled_model`).
+
+6. `run_strategies(TICKER: str, names: List[str]) -> dict`:
+    Evaluates the strategies `names` of `STRATEGIES` on one load of the data and one forward-return matrix of their holding periods,
+    returns {name: [benchmark, performance, price_chart]}.
+
+7. `ema_crossover_strategy(TICKER: str) -> List`:
+    Strategy 1: a signal is generated when the 21-period EMA is above the 50-period EMA.
+
+8. `ema_crossover_rsi_strategy(TICKER: str) -> List`:
+    Strategy 2: the EMA crossover, with the additional condition that the RSI must be below 50.
+
+9. `rsi_adx_strategy(TICKER: str) -> List`:
+    Strategy 3: a signal is generated when RSI is below 45 and ADX is above 30.
+
+10. `indicator_ml_strategy(TICKER: str) -> List`:
+    Strategy 4: a machine learning model (RandomForestClassifier) filters the signals of the EMA crossover using additional indicator features.
+
+11. `signal_expression(spec: dict, params: Optional[dict]) -> str` / `signal_columns(expression: str, values) -> List[str]`:
+    Formats the signal template of a spec with its parameters / returns the indicator columns of a signal expression.
+
+12. `with_params(spec: dict, params: dict) -> dict`:
+    Returns the spec with other parameter values (and holding period), e.g. the best combination of a sweep.
+
+13. `sweep_grid(spec: dict, grid: dict) -> Tuple[dict, List[str], List[str], dict]` / `sweep_columns(expressions: dict, value_params) -> List[str]`:
+    Completes a grid {param: [values]} with the defaults of the spec, returns it with the column and the value parameters
+    and the signal expression of every combination of the column parameters / returns the indicator columns of a sweep.
+
+14. `sweep_strategy(TICKER: str, name: str, grid: dict, rank_by: str, ascending: bool, data: Optional[pd.DataFrame]) -> pd.DataFrame`:
+    Evaluates every combination of the parameter grid of a strategy over its window, ranked by the `rank_by` metric.
+    The indicator columns of one combination of the column parameters are broadcast against all the combinations of the
+    value parameters (thresholds) at once, and the metrics come from the vectorized `strategy_performance_grid`.
+
+15. `walk_forward_windows(index: pd.DatetimeIndex, train_years: int, test_years: int, start, end) -> List[tuple]`:
+    Returns the rolling (train_start, train_end, test_start, test_end) windows, the test windows follow each other.
+
+16. `walk_forward_window(TICKER: str, data: pd.DataFrame, name: str, grid: dict, window: tuple, rank_by: str, ascending: bool) -> dict`:
+    Selects the best parameters of the grid on the training window (`sweep_strategy`) and evaluates them on the test window.
+
+17. `walk_forward(TICKER: str, name: str, grid: dict, train_years: int, test_years: int, rank_by: str, ascending: bool, start, end, workers) -> dict`:
+    Walk-forward optimization: the windows run on a pool of `workers` processes (default: STRATEGY_WORKERS of the Flask config),
+    the out-of-sample test windows are stitched and evaluated with `strategy_peformance`.
+    Returns {'windows': parameters per window, 'strategy': stitched frame, 'benchmark': ..., 'performance': ...}.
+
+18. `batch_strategy(name: str, tickers: Optional[List[str]], rank_by: str, ascending: bool, plot_tickers: List[str], data) -> Tuple[pd.DataFrame, dict]`:
+    Backtests a strategy on every ticker of the store (default) in one load and one vectorized pass: the signal is evaluated
+    on the rows of all the tickers at once, the K-day targets come from `forward_returns` of the (bars x tickers) panel and the metrics from
+    `strategy_performance_grid` with one row per ticker (per trade: `trade_runs` on the same rows). Returns the leaderboard (metrics and buy-and-hold return per ticker)
+    and {ticker: price_chart} with the performance plot 'plot_batch_<name>_<ticker>.png' of the `plot_tickers` only.
+
+19. `forward_returns(log_returns: np.ndarray, horizons: List[int]) -> np.ndarray`:
+    The forward-return matrix (horizons x bars x tickers): the log return of the K next bars of every bar for every horizon K,
+    derived in O(n) per horizon from one cumulative sum of the (bars x tickers) log returns. Every strategy, sweep and batch reads
+    its targets from it instead of rolling sums.
+
+20. `forward_return_frame(data: pd.DataFrame, horizons: List[int]) -> pd.DataFrame`:
+    The forward-return matrix of one ticker as a frame {K: forward log return} on the dates of `data`.
+
+21. `signal_panels(name: str, tickers: Optional[List[str]], data) -> Tuple[pd.DataFrame, pd.DataFrame]`:
+    The (dates x tickers) signal panel of a strategy and the daily returns panel of the tickers, over the window of the strategy.
+
+22. `portfolio_strategy(name: str, tickers: Optional[List[str]], sizing: str, data, **settings) -> List`:
+    Simulates a portfolio of the signals of a strategy over the universe (see portfolio_utils.py) and saves its equity curve
+    against SPY to 'plot_portfolio_<name>.png'. Returns [benchmark_performance, portfolio_performance, portfolio frame].
+
+23. `ml_training_set(data: pd.DataFrame, spec: dict, targets: Optional[pd.DataFrame]) -> Tuple`:
+    The signal rows of an ML spec split in training and test periods: (strategy, train, test, test_start, train_window).
+    Built from `ml_feature_rows(data, spec, targets) -> (strategy, rows)` and `ml_split(rows, spec) -> (train, test, test_start, train_window)`,
+    the test period starts at `ml_test_start(spec)`.
+
+24. `train_ml_model(TICKER: str, name: str, n_jobs: int) -> dict`:
+    Fits the model of one ticker on its feature rows from the feature store (unless the registry has it) and writes its file,
+    returns its registry entry with the training metrics (fit time, in-sample accuracy, out-of-sample accuracy and F1-score).
+
+25. `train_models(name: str, tickers: Optional[List[str]], workers: Optional[int], n_jobs: Optional[int]) -> pd.DataFrame`:
+    Offline batch training of the models of an ML strategy for every ticker of the store (or `tickers`): the feature rows
+    of the tickers are materialized (`materialize_features`), then the tickers are spread over `workers` processes and every estimator fits its trees with `n_jobs` (by default every core is used).
+    The models land in the registry the requests read, pinned so the LRU capacity never evicts them (see model_utils.py),
+    returns the training report per ticker.
+    An ML spec with 'pooled_features' trains its single pooled model instead (`train_pooled_model`).
+
+26. `pooled_model_features(spec: dict) -> List[str]` / `pooled_columns(rows: pd.DataFrame, spec: dict, categories: dict, sectors: dict) -> pd.DataFrame`:
+    The features of a pooled model: the model features of the spec and the integer codes of the ticker and / or sector of every row.
+
+27. `pooled_training_set(features: pd.DataFrame, spec: dict, sectors: Optional[dict]) -> Tuple`:
+    The training and test rows of every ticker of a (date, ticker) frame of feature rows stacked into one panel, with their codes:
+    (train, test, categories, sectors). `sectors` completes or overrides `SECTORS`.
+
+28. `train_pooled_model(name: str, tickers: Optional[List[str]], n_jobs: Optional[int], sectors: Optional[dict], data) -> pd.DataFrame`:
+    Trains the pooled model of a spec on the stacked panel of the universe (feature rows of the feature store, or built from
+    the indicators in `data`), unless the registry has it, and commits it to the registry with its training metrics, returns the training report.
+
+29. `pooled_model(spec: dict) -> Tuple[object, dict]`:
+    The latest pooled model of a spec from the registry and its entry: a request for any ticker is a single predict call.
+
+30. `walk_forward_ml_windows(index: pd.DatetimeIndex, train_years: int, retrain_weeks: int, buffer_weeks: int) -> List[tuple]`:
+    Returns the (train_end, test_start, test_end) of every retrain of the walk-forward ML mode, every `retrain_weeks` weeks
+    after a first training period of `train_years` years; every test window starts after the buffer of the spec.
+
+31. `walk_forward_ml(TICKER: str, name: str, train_years: int, retrain_weeks: int, n_estimators: int, trees_per_step: int, max_trees: Optional[int], warm_start: bool, n_jobs, data) -> dict`:
+    Walk-forward mode of an ML strategy: the model is retrained on an expanding window at every retrain date and filters the
+    signals of the next test window. With `warm_start` a retrain keeps the fitted trees and only adds `trees_per_step` trees
+    (the oldest are dropped past `max_trees`), instead of refitting the whole forest, so retraining over the full history is cheap.
+    Returns {'windows': retrains, 'strategy': stitched out-of-sample frame, 'benchmark': ..., 'performance': ...}.
+
+32. `ml_feature_frames(data: pd.DataFrame, spec: dict) -> dict`:
+    The feature rows {ticker: rows} of every ticker of a (date, ticker) indicator frame: the model features, 'log_returns' and 'target'.
+
+33. `materialize_features(spec: dict, tickers: Optional[List[str]]) -> List[str]`:
+    Builds and stores the feature rows of the tickers whose rows are missing or out of date with their bars (see feature_utils.py),
+    in one load of their indicators; the rows of the other tickers are kept. Returns the tickers.
+
+34. `ml_ticker_split(spec: dict, TICKER: Optional[str], data: Optional[pd.DataFrame], targets: Optional[pd.DataFrame]) -> Tuple`:
+    The (train, test, test_start, train_window) of `ml_split` for one ticker, read from the feature store as two date slices.
+    Stale or missing rows are rebuilt and stored first, from the indicators in `data` when given (no second load);
+    without a ticker the rows are built in memory from `data`.
+
+35. `ml_features(spec: dict, tickers: Optional[List[str]], start, end, data) -> pd.DataFrame`:
+    The feature rows of the tickers over a date slice as a (date, ticker) frame, read from the feature store
+    (or built in memory from the indicators in `data`).
+
+Dependencies:
+-------------
+- numpy: For mathematical calculations.
+- pandas: For data manipulation and the evaluation of the signal expressions.
+- itertools / re: For the parameter grids of the sweep and the parameters of the signal templates.
+- concurrent.futures: For the process pool of the walk-forward windows and of the batch model training.
+- time: For the fit time of the batch model training.
+- matplotlib: For visualizing strategy performance.
+- sklearn: For implementing machine learning-based filtering of trading signals.
+- market_utils: For loading the indicators of the strategies (`process_data`).
+- metric_utils: For the performance metrics and the price charts.
+- store_utils: For the benchmark (SPY) bars.
+- portfolio_utils: For the portfolio simulation of a strategy over the universe.
+- montecarlo_utils: For the bootstrap confidence intervals of the strategy metrics.
+- model_utils: For the registry of the trained models.
+- feature_utils: For the feature store of the ML strategies.
+"""
+
+
+
+# === Libraries ===
+import os
+import re
+import time
+import itertools
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+from . import metric_utils
+from . import store_utils
+from . import portfolio_utils
+from . import montecarlo_utils
+from . import model_utils
+from . import feature_utils
+from .market_utils import process_data
+
+# === Strategy Specs ===
+DEFAULT_COLUMNS = ['open', 'high', 'low', 'close']
+PLOT_DIR = './app/static/data'
+
+# Every strategy drops the rows where one of its `indicators` is undefined, so a spec lists the
+# indicators it needs even when they are not used by the signal (they define the valid rows).
+# The signal is a template over `params`: a parameter inside a column name (e.g. 'rsi_{rsi_k}') selects
+# the indicator, the others are values (e.g. '{rsi_level}'). Parameters and the holding period can be swept (see `sweep_strategy`).
+STRATEGIES = {
+    # Strategy One
+    'ema_crossover': {
+        'label': 'EMA Crossover',
+        'indicators': ['rsi_14', 'log_return', 'ema_21', 'ema_50'],
+        'signal': 'ema_{fast} > ema_{slow}',
+        'params': {'fast': 21, 'slow': 50},
+        'holding_period': 7,
+        'window': ('2010-01-01', '2022-12-31'),
+        'plot': 'plot_strategy_ema.png',
+        'chart': ['EMA'],
+    },
+    # Strategy Two
+    # by adding more indicators as a filters, we should expect lesser trades and perhaps less volatility than previous strategy
+    'ema_crossover_rsi': {
+        'label': 'EMA Crossover + RSI',
+        'indicators': [
+            'volume', 'log_return',
+            'ema_5', 'ema_10', 'ema_21', 'ema_50',
+            'rsi_7', 'rsi_9', 'rsi_10', 'rsi_14',
+        ],
+        'signal': 'ema_{fast} > ema_{slow} and rsi_{rsi_k} < {rsi_level}',
+        'params': {'fast': 21, 'slow': 50, 'rsi_k': 14, 'rsi_level': 50},
+        'holding_period': 7,
+        'window': ('2010-01-01', '2022-12-31'),
+        'plot': 'plot_strategy_ema_rsi.png',
+        'chart': ['EMA'],
+    },
+    # Strategy Three
+    'rsi_adx': {
+        'label': 'RSI + ADX',
+        'indicators': [
+            'volume', 'log_return',
+            'rsi_7', 'rsi_9', 'rsi_10', 'rsi_14',
+            'adx_3', 'adx_5', 'adx_7', 'adx_14',
+            'ema_10', 'ema_21', 'ema_50'
+        ],
+        'signal': 'rsi_{rsi_k} < {rsi_level} and adx_{adx_k} > {adx_level}',
+        'params': {'rsi_k': 14, 'rsi_level': 45, 'adx_k': 14, 'adx_level': 30},
+        'holding_period': 7,
+        'window': ('2010-01-01', '2022-12-31'),
+        'plot': 'plot_strategy_rsi_adx.png',
+        'chart': ['EMA'],
+    },
+    # Strategy Four: Analysis + Prediction
+    # the default strategy would not be 100% accurate, the model learns to filter out the signals using information from other indicators
+    'indicator_ml': {
+        'label': 'Strategy 4: Strategy 1 + ML Filter',
+        'indicators': [
+            'log_return',
+            'ema_5', 'ema_10', 'ema_21', 'ema_50',
+            'rsi_14',
+            'adx_14',
+            'norm_volume_5', 'norm_volume_10', 'norm_volume_21',
+            'bb_5_lb', 'bb_5_ub', 'bb_5_mb', 'bb_5_bw', 'bb_5_p'
+        ],
+        'features': {
+            'x1': 'bb_5_ub - close',
+            'x2': 'close - bb_5_mb',
+            'x3': 'close - bb_5_lb',
+            'x4': 'close - ema_10',
+            'x5': 'ema_10 - ema_21',
+            'x6': 'ema_21 - ema_50',
+        },
+        'signal': 'ema_{fast} > ema_{slow}',
+        'params': {'fast': 21, 'slow': 50},
+        'holding_period': 7,
+        # We will use data from January 2010 to December 2022 as the training period (12 years of training data).
+        # After the training period, we will apply a buffer period of 3 months (12 weeks) between training and testing sets.
+        # This waiting period is suitable for our shorter-term strategies, which have a 7-day holding period.
+        # Finally, the test period will start after the waiting period, i.e., from March 2023 onwards, until the current date.
+        'train_end': '2022-12-31',
+        'buffer_weeks': 12,
+        'model_features': ['rsi_14', 'adx_14', 'bb_5_bw', 'bb_5_p', 'norm_volume_5', 'norm_volume_10', 'x1', 'x2', 'x3', 'x4', 'x5', 'x6'],
+        'benchmark': 'SPY',
+        'window': ('2023-03-25', '2024-07-25'),  # window of the benchmark
+        'plot': 'plot_strategy_ml_indicator.png',
+        'comparison_plot': 'plot_strategy_ml_indicator_comparison.png',
+        'comparison_label': 'Strategy 1: EMA Crossover',
+        'chart': [],
+    },
+}
+# Strategy Four, pooled: one model trained on the signals of every ticker instead of one model per ticker,
+# with the sector of a row as an extra feature ('pooled_features' may also list 'ticker'), see `train_pooled_model`
+STRATEGIES['indicator_ml_pooled'] = {
+    **STRATEGIES['indicator_ml'],
+    'label': 'Strategy 4 (pooled): Strategy 1 + ML Filter',
+    'pooled_features': ['sector'],
+    'plot': 'plot_strategy_ml_pooled.png',
+    'comparison_plot': 'plot_strategy_ml_pooled_comparison.png',
+}
+
+# GICS sectors of the sample universe (see the fetch request in routes/stock.py), for the 'sector' feature of the pooled models;
+# a ticker missing here is in the 'Unknown' sector unless the caller gives its sector
+SECTORS = {
+    'KO': 'Consumer Staples', 'PEP': 'Consumer Staples', 'WMT': 'Consumer Staples',
+    'SBUX': 'Consumer Discretionary', 'MCD': 'Consumer Discretionary', 'F': 'Consumer Discretionary',
+    'AAL': 'Industrials', 'DAL': 'Industrials',
+    'VZ': 'Communication Services', 'T': 'Communication Services', 'DIS': 'Communication Services',
+    'BAC': 'Financials', 'JPM': 'Financials', 'MA': 'Financials', 'V': 'Financials',
+    'ORCL': 'Information Technology', 'AMD': 'Information Technology', 'NVDA': 'Information Technology',
+    'AAPL': 'Information Technology', 'MSFT': 'Information Technology',
+}
+POOLED_TICKER = '*'  # ticker of the pooled models in the model registry
+
+# leaderboard columns of the per-trade metrics that share their name with a per-day metric
+TRADE_COLUMNS = {'trades': 'trade_count', 'total_return': 'trade_total_return', 'profit_factor': 'trade_profit_factor'}
+SWEEP_CHUNK = 256  # parameter combinations per block of the metric kernel, bounds the (combinations x days) matrices
+
+# === Strategy Engine ===
+def signal_expression(spec, params=None):
+    return spec['signal'].format(**{**spec.get('params', {}), **(params or {})})
+
+def signal_columns(expression, values=()):
+    # the indicator columns of a signal expression, every name except the value parameters and the boolean operators
+    names = dict.fromkeys(re.findall(r'[A-Za-z_]\w*', expression))
+    return [name for name in names if name not in values and name not in ('and', 'or', 'not')]
+
+def with_params(spec, params):
+    # the spec with other parameter values, e.g. the best combination of a sweep
+    params = dict(params)
+    holding_period = int(params.pop('holding_period', spec['holding_period']))
+    spec = {**spec, 'params': {**spec.get('params', {}), **params}, 'holding_period': holding_period}
+    spec['indicators'] = list(dict.fromkeys(spec['indicators'] + signal_columns(signal_expression(spec))))
+    return spec
+
+def load_strategy_data(TICKER, specs, columns=()):
+    # one load for every strategy, only the union of their indicators (and of the extra `columns`) is computed
+    columns = list(dict.fromkeys([c for spec in specs for c in spec['indicators']] + list(columns)))
+    df_indicators = process_data([TICKER], columns=columns, dtype=np.float64)  # full precision for the metrics
+    return df_indicators.xs(level='ticker', key=TICKER)
+
+def forward_returns(log_returns, horizons):
+    # (horizons x bars x tickers) log return of the K next bars of every bar, for every horizon K, from one cumulative sum:
+    # bars i+1..i+K sum to equity[i+K+1] - equity[i+1]. Undefined (nan) when one of the K next bars is missing
+    # (after the last bar of a ticker, or a nan return), counted by the cumulative sum of the gaps.
+    rows = log_returns.shape[0]
+    missing = np.isnan(log_returns)
+    equity = np.zeros((rows + 1,) + log_returns.shape[1:])
+    np.cumsum(np.where(missing, 0, log_returns), axis=0, out=equity[1:])
+    gaps = np.zeros(equity.shape, dtype=np.int64)
+    np.cumsum(missing, axis=0, out=gaps[1:])
+    result = np.full((len(horizons),) + log_returns.shape, np.nan)
+    for h, K in enumerate(horizons):
+        if K < rows:
+            complete = gaps[K + 1:] == gaps[1:rows - K + 1]
+            result[h, :rows - K] = np.where(complete, equity[K + 1:] - equity[1:rows - K + 1], np.nan)
+    return result
+
+def forward_return_frame(data, horizons):
+    # the forward returns of one ticker, {K: log return of the K next bars} on the dates of `data`
+    horizons = list(dict.fromkeys(horizons))
+    matrix = forward_returns(data['log_return'].to_numpy(dtype=np.float64)[:, None], horizons)[:, :, 0]
+    return pd.DataFrame(matrix.T, index=data.index, columns=horizons)
+
+def strategy_frame(data, spec, targets=None):
+    strategy = data[DEFAULT_COLUMNS + spec['indicators']].dropna()
+    for name, expression in spec.get('features', {}).items():
+        strategy[name] = strategy.eval(expression)
+    K = spec['holding_period']
+    strategy['signal'] = strategy.eval(signal_expression(spec)).astype(np.int32)
+    # K-day forward log return of a trade taken at the close of the signal day, undefined for the last K days
+    if targets is None or K not in targets:
+        targets = forward_return_frame(data, [K])
+    strategy['target'] = targets[K].reindex(strategy.index)
+    strategy.dropna(subset=['target'], inplace=True)
+    strategy['log_returns'] = strategy['signal'] * strategy['target']
+    strategy['returns'] = np.exp(strategy['log_returns']) - 1
+    return strategy
+
+def plot_performance(strategy, spec):
+    plt.switch_backend('Agg')  # Use non-interactive backend
+    ax = (strategy.returns + 1).cumprod().plot(kind='line', label=spec['label'], title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
+    (np.exp(strategy.log_return.cumsum())).plot(kind='line', label='Buy and Hold', grid=True, ax=ax)
+    ax.xaxis.set_major_locator(mdates.YearLocator())  # set ticks for each year
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y')) # format of the year label
+    plt.legend(loc='upper left')
+    plt.savefig(os.path.join(PLOT_DIR, spec['plot']))
+    plt.close()
+
+def evaluate_strategy(data, spec, benchmarks=None, targets=None, ticker=None):
+    if 'model_features' in spec:
+        return evaluate_ml_strategy(data, spec, targets, ticker)
+    start_date, end_date = spec['window']
+    strategy = strategy_frame(data, spec, targets).loc[start_date:end_date]
+    # print the performance statistic of the strategy and the buy-and-hold
+    benchmarks = {} if benchmarks is None else benchmarks
+    if spec['window'] not in benchmarks:
+        benchmarks[spec['window']] = metric_utils.benchmark_performance(data, start_date, end_date)
+    strategy_performance_stat = metric_utils.strategy_peformance(strategy)
+    # the same performance per trade, consecutive signal days share one position
+    strategy_performance_stat['per_trade'] = metric_utils.trade_performance(metric_utils.trade_ledger(strategy, spec['holding_period']))
+    # confidence intervals of the metrics, blocks of one holding period keep the overlap of consecutive trades
+    strategy_performance_stat['bootstrap'] = montecarlo_utils.confidence_intervals(strategy['returns'], block_size=spec['holding_period'])
+    # visualize the performance of the strategy
+    plot_performance(strategy, spec)
+    # Price Chart
+    price_chart = metric_utils.visualise_pricechart(strategy, indicators=spec['chart'], signal_marker=True)
+    return [benchmarks[spec['window']], strategy_performance_stat, price_chart]
+
+def ml_feature_rows(data, spec, targets=None):
+    # the rows the model of an ML spec trains on and predicts: the signal days, with their features and the label
+    strategy = strategy_frame(data, spec, targets)
+    dataset = strategy[strategy.signal == 1].copy()
+    dataset['target'] = (dataset.returns > 0).astype(np.int32)
+    return strategy, dataset
+
+def ml_test_start(spec):
+    # first day of the test period, after the buffer that follows the training period
+    return str((pd.to_datetime(spec['train_end']) + pd.Timedelta(value=spec['buffer_weeks'], unit='W')).date())
+
+def ml_split(dataset, spec):
+    # train-test split
+    TRAIN_END = spec['train_end'] # define last period of training date
+    TEST_START = ml_test_start(spec)
+    train = dataset.loc[:TRAIN_END] # Data from the start until the end of the training period
+    test = dataset.loc[TEST_START:] # Data from the beginning of the test period (after the buffer) until the current date
+    train_window = (str(train.index[0].date()), TRAIN_END) if len(train) else None
+    return train, test, TEST_START, train_window
+
+def ml_training_set(data, spec, targets=None):
+    strategy, dataset = ml_feature_rows(data, spec, targets)
+    return (strategy,) + ml_split(dataset, spec)
+
+def evaluate_ml_strategy(data, spec, targets=None, ticker=None):
+    # the signal rows of the ticker are read from the feature store, the indicators in `data` only rebuild them when they are stale
+    train, test, TEST_START, train_window = ml_ticker_split(spec, ticker, data, targets)
+    # every stored row is a signal day, its trade return is the K-day log return 'log_returns'
+    out_of_sample_without_model = test.assign(signal=1, returns=np.exp(test['log_returns']) - 1)
+
+    if 'pooled_features' in spec:
+        # one model for the whole universe (see `train_pooled_model`), the rows of the ticker only need their codes
+        model, entry = pooled_model(spec)
+        FEATURES = pooled_model_features(spec)
+        test = pooled_columns(test.assign(ticker=ticker), spec, entry['categories'], entry['sectors'])
+    else:
+        # train the model, or load it from the model registry when it was trained on the same data before
+        if train_window is None:
+            raise ValueError(f"No signal to train on before {spec['train_end']}")
+        FEATURES = spec['model_features']
+        model, _ = model_utils.cached_fit(ticker, FEATURES, train_window, train[FEATURES], train['target'], RandomForestClassifier)
+
+    # evaluate the model accuracy
+    y_pred = model.predict(test[FEATURES])
+    acc = accuracy_score(test['target'], y_pred)
+    f1 = f1_score(test['target'], y_pred)
+    print(f"Model Accuracy: {acc*100:.2f}%")
+    # print(f"Model F1-Score: {f1:.2f}")
+
+    # strategy performance using the model
+    # notice the large decrease in maximum drawdown, the model was able to filter our drastic false signals
+    # winning rate has also improved a lot
+    out_of_sample_with_model = out_of_sample_without_model[y_pred == 1]
+    strategy_peformance_stat = metric_utils.strategy_peformance(out_of_sample_with_model)
+
+    spy = store_utils.read_ticker('benchmark', spec['benchmark'])
+    benchmark_performance_stat = metric_utils.benchmark_performance(spy, *spec['window']) # and we kind of beat the index as well
+
+    # visualize the performance of the strategy using model - notice the fewer sharp drops throughout the period
+    plt.switch_backend('Agg')  # Use non-interactive backend
+    (out_of_sample_with_model.returns + 1).cumprod().plot(kind='line', grid=True, title='Strategy Performance', figsize=(10,6))
+    plt.savefig(os.path.join(PLOT_DIR, spec['plot']))
+    plt.close()
+    # Strategy comparison
+    ax = (out_of_sample_without_model.returns + 1).cumprod().plot(kind='line', label=spec['comparison_label'], title='Strategy Performances', ylabel='Total Return (multiples)', figsize=(10,6))
+    (out_of_sample_with_model.returns + 1).cumprod().plot(kind='line', label=spec['label'], grid=True, ax=ax)
+    plt.legend(loc='upper left')
+    plt.savefig(os.path.join(PLOT_DIR, spec['comparison_plot']))
+    plt.close()
+
+    # Price Chart: the trades kept by the model over the test period, on the rows of `strategy_frame` (the features are not needed)
+    K = spec['holding_period']
+    if targets is None or K not in targets:
+        targets = forward_return_frame(data, [K])
+    strategy = data.loc[TEST_START:, DEFAULT_COLUMNS + spec['indicators']].dropna()
+    strategy = strategy[targets[K].reindex(strategy.index).notna()]
+    strategy = strategy.assign(signal=strategy.index.isin(out_of_sample_with_model.index).astype(np.int32))
+    strategy_peformance_stat['per_trade'] = metric_utils.trade_performance(metric_utils.trade_ledger(strategy, K))
+    strategy_peformance_stat['bootstrap'] = montecarlo_utils.confidence_intervals(out_of_sample_with_model['returns'], block_size=spec['holding_period'])
+    price_chart = metric_utils.visualise_pricechart(strategy, start=str(test.index[0].date()), end=str(test.index[-1].date()), indicators=spec['chart'], signal_marker=True)
+
+    return [benchmark_performance_stat, strategy_peformance_stat, price_chart]
+
+def run_strategies(TICKER, names):
+    specs = [STRATEGIES[name] for name in names]
+    data = load_strategy_data(TICKER, specs)
+    benchmarks = {}  # strategies evaluated over the same window share the buy-and-hold performance
+    targets = forward_return_frame(data, [spec['holding_period'] for spec in specs])  # and the forward returns of their holding periods
+    return {name: evaluate_strategy(data, spec, benchmarks, targets, TICKER) for name, spec in zip(names, specs)}
+
+# === Parameter Sweep ===
+def sweep_grid(spec, grid):
+    # every parameter of the spec with its grid values (default: the value of the spec), split in column and value parameters
+    params = {**spec.get('params', {}), 'holding_period': spec['holding_period']}
+    unknown = [name for name in grid if name not in params]
+    if unknown:
+        raise ValueError(f"Unknown parameters {unknown}, options: {list(params)}")
+    grid = {name: list(grid.get(name, [default])) for name, default in params.items()}
+    column_params = [name for name in spec.get('params', {}) if re.search(r'\w\{%s\}' % name, spec['signal'])]
+    for name in column_params + ['holding_period']:
+        grid[name] = [int(value) for value in grid[name]]
+    value_params = [name for name in spec.get('params', {}) if name not in column_params]
+    # one expression per combination of the column parameters, the value parameters stay names bound to arrays
+    expressions = {}
+    for columns in itertools.product(*(grid[p] for p in column_params)):
+        expressions[columns] = signal_expression(spec, {**dict(zip(column_params, columns)), **{p: p for p in value_params}})
+    return grid, column_params, value_params, expressions
+
+def sweep_columns(expressions, value_params):
+    return list(dict.fromkeys(c for e in expressions.values() for c in signal_columns(e, value_params)))
+
+def sweep_strategy(TICKER, name, grid, rank_by='total_return', ascending=False, data=None, window=None):
+    spec = STRATEGIES[name]
+    if 'model_features' in spec:
+        raise ValueError(f"{name} trains a model on its signals, only rule-based strategies can be swept")
+    grid, column_params, value_params, expressions = sweep_grid(spec, grid)
+    columns = sweep_columns(expressions, value_params)
+    if data is None:
+        data = load_strategy_data(TICKER, [spec], columns)
+
+    # the rows of `strategy_frame`, with every swept indicator defined
+    frame = data[DEFAULT_COLUMNS + list(dict.fromkeys(spec['indicators'] + columns))].dropna()
+    start_date, end_date = window or spec['window']
+    window = frame.loc[start_date:end_date]
+    arrays = {c: window[c].to_numpy() for c in columns}
+    targets = forward_return_frame(data, grid['holding_period']).reindex(window.index)
+    combinations = list(itertools.product(*(grid[p] for p in value_params)))
+    values = np.array(combinations, dtype=np.float64).reshape(len(combinations), len(value_params))
+
+    tables = []
+    for K in grid['holding_period']:
+        # K-day forward log return, the last K days of the data have no target
+        target = targets[K].to_numpy()
+        valid = ~np.isnan(target)
+        target = target[valid]
+        for columns, expression in expressions.items():
+            # (1 x days) indicator columns broadcast against (combinations x 1) parameter values
+            local_dict = {c: arrays[c][valid][None, :] for c in signal_columns(expression, value_params)}
+            for offset in range(0, len(values), SWEEP_CHUNK):
+                block = values[offset:offset + SWEEP_CHUNK]
+                local_dict.update({p: block[:, [i]] for i, p in enumerate(value_params)})
+                signals = np.broadcast_to(pd.eval(expression, local_dict=local_dict), (len(block), len(target)))
+                params = {'holding_period': K, **dict(zip(column_params, columns)), **{p: block[:, i] for i, p in enumerate(value_params)}}
+                tables.append(pd.DataFrame({**params, **metric_utils.strategy_performance_grid(signals, signals * target)}))
+
+    print(f"[helpers/strategy_utils.py]: Swept {sum(map(len, tables))} parameter combinations of {name} for {TICKER}")
+    # best first, combinations without trades (undefined metrics) last
+    return pd.concat(tables, ignore_index=True).sort_values(rank_by, ascending=ascending, kind='stable', ignore_index=True)
+
+# === Walk-Forward Optimization ===
+def strategy_workers():
+    # worker processes of the walk-forward windows from the Flask config when called inside the app
+    try:
+        return current_app.config.get('STRATEGY_WORKERS', 0)
+    except RuntimeError:
+        return 0
+
+def walk_forward_windows(index, train_years, test_years, start=None, end=None):
+    # rolling (train_start, train_end, test_start, test_end), the test windows follow each other without a gap
+    start = index[0] if start is None else max(pd.Timestamp(start), index[0])
+    end = index[-1] if end is None else min(pd.Timestamp(end), index[-1])
+    windows = []
+    train_start = start
+    while train_start + pd.DateOffset(years=train_years) <= end:
+        test_start = train_start + pd.DateOffset(years=train_years)
+        test_end = min(test_start + pd.DateOffset(years=test_years) - pd.Timedelta(days=1), end)
+        windows.append(tuple(str(d.date()) for d in (train_start, test_start - pd.Timedelta(days=1), test_start, test_end)))
+        train_start += pd.DateOffset(years=test_years)
+    return windows
+
+def walk_forward_window(TICKER, data, name, grid, window, rank_by='total_return', ascending=False):
+    train_start, train_end, test_start, test_end = window
+    # the sweep only sees the bars up to the end of training: the K-day targets of the last training days are dropped, not read from the test window
+    ranking = sweep_strategy(TICKER, name, grid, rank_by, ascending, data=data.loc[:train_end], window=(train_start, train_end))
+    # the best combination, column by column to keep the integer parameters (lengths, holding period) integers
+    params = {p: ranking[p].iloc[0].item() for p in ranking.columns[:ranking.columns.get_loc('trades')]}
+    # out-of-sample: the same signal logic with the selected parameters, trades opened in the test window
+    spec = with_params(STRATEGIES[name], params)
+    test = strategy_frame(data, spec).loc[test_start:test_end, ['log_return', 'signal', 'log_returns', 'returns']]
+    return {'train_start': train_start, 'train_end': train_end, 'test_start': test_start, 'test_end': test_end,
+            **params, f'in_sample_{rank_by}': ranking[rank_by].iloc[0], 'test': test}
+
+def walk_forward(TICKER, name, grid, train_years=4, test_years=1, rank_by='total_return', ascending=False, start=None, end=None, workers=None):
+    spec = STRATEGIES[name]
+    start = spec['window'][0] if start is None else start
+    grid, _, value_params, expressions = sweep_grid(spec, grid)
+    data = load_strategy_data(TICKER, [spec], sweep_columns(expressions, value_params))
+    windows = walk_forward_windows(data.index, train_years, test_years, start, end)
+    if not windows:
+        raise ValueError(f"Not enough data for a {train_years} year(s) training window from {start}")
+
+    workers = strategy_workers() if workers is None else workers
+    args = [[TICKER] * len(windows), [data] * len(windows), [name] * len(windows), [grid] * len(windows), windows, [rank_by] * len(windows), [ascending] * len(windows)]
+    if workers > 1 and len(windows) > 1:
+        # the windows are independent: every worker sweeps the training window and evaluates the test window of its task
+        with ProcessPoolExecutor(max_workers=min(workers, len(windows))) as pool:
+            results = list(pool.map(walk_forward_window, *args))
+    else:
+        results = list(map(walk_forward_window, *args))
+
+    # out-of-sample stitching: the test windows in order form one track record
+    strategy = pd.concat([result.pop('test') for result in results])
+    print(f"[helpers/strategy_utils.py]: Walk-forward of {name} for {TICKER} over {len(windows)} window(s)")
+    benchmark_performance_stat = metric_utils.benchmark_performance(data, results[0]['test_start'], results[-1]['test_end'])
+    strategy_performance_stat = metric_utils.strategy_peformance(strategy)
+    return {'windows': pd.DataFrame(results), 'strategy': strategy,
+            'benchmark': benchmark_performance_stat, 'performance': strategy_performance_stat}
+
+# === Walk-Forward ML Retraining ===
+def walk_forward_ml_windows(index, train_years, retrain_weeks, buffer_weeks):
+    # (train_end, test_start, test_end) of every retrain: the model trained up to train_end predicts from the end of the buffer
+    # until the buffer after the next retrain, so the test windows follow each other without a gap
+    train_end = index[0] + pd.DateOffset(years=train_years)
+    cadence, buffer = pd.Timedelta(weeks=retrain_weeks), pd.Timedelta(weeks=buffer_weeks)
+    windows = []
+    while train_end + buffer <= index[-1]:
+        test_end = min(train_end + cadence + buffer - pd.Timedelta(days=1), index[-1])
+        windows.append(tuple(str(d.date()) for d in (train_end, train_end + buffer, test_end)))
+        train_end += cadence
+    return windows
+
+def walk_forward_ml(TICKER, name='indicator_ml', train_years=4, retrain_weeks=13, n_estimators=100, trees_per_step=10,
+                    max_trees=300, warm_start=True, n_jobs=None, data=None):
+    spec = STRATEGIES[name]
+    if 'model_features' not in spec:
+        raise ValueError(f"'{name}' has no model to retrain, options: {[n for n, s in STRATEGIES.items() if 'model_features' in s]}")
+    data = load_strategy_data(TICKER, [spec]) if data is None else data
+    strategy, dataset = ml_feature_rows(data, spec)
+    if dataset.empty:
+        raise ValueError(f"No signal of {name} for {TICKER}")
+    windows = walk_forward_ml_windows(dataset.index, train_years, retrain_weeks, spec['buffer_weeks'])
+    if not windows:
+        raise ValueError(f"Not enough data for a {train_years} year(s) training window and a {spec['buffer_weeks']} week(s) buffer")
+
+    FEATURES = spec['model_features']
+    model, results, kept = None, [], []
+    for train_end, test_start, test_end in windows:
+        train = dataset.loc[:train_end]  # expanding window
+        test = dataset.loc[test_start:test_end]
+        if model is None and train['target'].nunique() < 2:
+            continue  # the trees of a warm start must all see both classes, wait for a winning and a losing signal
+        start = time.perf_counter()
+        if model is None or not warm_start:
+            model = RandomForestClassifier(n_estimators=n_estimators, warm_start=warm_start, n_jobs=n_jobs)
+        else:
+            # warm start: the trees of the previous fits are kept and only `trees_per_step` new trees are fitted on the
+            # expanded window; the oldest trees are dropped past `max_trees`, so the forest follows the recent data
+            if max_trees:
+                model.estimators_ = model.estimators_[-max(max_trees - trees_per_step, 0):]
+            model.n_estimators = len(model.estimators_) + trees_per_step
+        model.fit(train[FEATURES], train['target'])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(test[FEATURES]) if len(test) else np.zeros(0, dtype=np.int32)
+        kept.append(test.index[y_pred == 1])
+        results.append({'train_end': train_end, 'test_start': test_start, 'test_end': test_end, 'train_rows': len(train),
+                        'trees': len(model.estimators_), 'fit_seconds': fit_seconds, 'test_rows': len(test),
+                        'test_accuracy': accuracy_score(test['target'], y_pred) if len(test) else np.nan, 'kept_signals': int(y_pred.sum())})
+    if not results:
+        raise ValueError(f"No winning and losing signals of {name} to train on for {TICKER}")
+
+    # out-of-sample stitching: the signals kept by the model of their window, over the test windows in order
+    first_test, last_test = results[0]['test_start'], results[-1]['test_end']
+    strategy = strategy.loc[first_test:last_test].copy()
+    strategy['signal'] = strategy.index.isin(np.concatenate(kept)).astype(np.int32)
+    strategy['log_returns'] = strategy['signal'] * strategy['target']
+    strategy['returns'] = np.exp(strategy['log_returns']) - 1
+    print(f"[helpers/strategy_utils.py]: Walk-forward {name} for {TICKER}: {len(results)} {'warm-started' if warm_start else 'full'} retrain(s) every {retrain_weeks} week(s), "
+          f"{sum(r['fit_seconds'] for r in results):.2f}s of fitting")
+    # the metrics of the kept trades only, like `evaluate_ml_strategy`
+    strategy_performance_stat = metric_utils.strategy_peformance(strategy[strategy.signal == 1])
+    benchmark_performance_stat = metric_utils.benchmark_performance(data, first_test, last_test)
+    return {'windows': pd.DataFrame(results), 'strategy': strategy,
+            'benchmark': benchmark_performance_stat, 'performance': strategy_performance_stat}
+
+# === Cross-Sectional Backtest ===
+def batch_strategy(name, tickers=None, rank_by='total_return', ascending=False, plot_tickers=(), data=None):
+    spec = STRATEGIES[name]
+    if 'model_features' in spec:
+        raise ValueError(f"{name} trains a model per ticker, only rule-based strategies run in a batch")
+    if data is None:
+        # every ticker in one load, in the compact frame: float32 signal indicators, float64 prices and log returns for the metrics
+        data = process_data(tickers, columns=spec['indicators'])
+    names = data.index.levels[1]
+    day_codes, ticker_codes = data.index.codes
+    # ticker-major rows, the bars of every ticker follow each other in date order
+    order = np.lexsort((day_codes, ticker_codes))
+    ticker = ticker_codes[order]
+    bars = np.bincount(ticker, minlength=len(names))
+    bar = np.arange(len(order)) - (np.cumsum(bars) - bars)[ticker]  # bars since the first bar of the ticker
+
+    # K-day forward log returns of the left-aligned (bars x tickers) panel of log returns
+    K = spec['holding_period']
+    panel = np.full((bars.max(initial=0), len(names)), np.nan)
+    panel[bar, ticker] = data['log_return'].to_numpy(dtype=np.float64)[order]
+    target = forward_returns(panel, [K])[0][bar, ticker]
+
+    frame = data[DEFAULT_COLUMNS + spec['indicators']].take(order)
+    valid = frame.notna().all(axis=1).to_numpy()  # the rows of `strategy_frame`, for every ticker at once
+    frame, ticker, target = frame[valid], ticker[valid], target[valid]
+    dates = data.index.levels[0][day_codes[order][valid]]
+    signal = frame.eval(signal_expression(spec)).to_numpy().astype(np.int32)
+
+    start_date, end_date = spec['window']
+    selected = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date)) & ~np.isnan(target)
+    ticker, signal, target = ticker[selected], signal[selected], target[selected]
+    log_return = frame['log_return'].to_numpy()[selected]
+    # one left-aligned row per ticker, padded with no trade after its last day
+    days = np.bincount(ticker, minlength=len(names))
+    first = np.cumsum(days) - days
+    position = np.arange(len(ticker)) - first[ticker]
+    signals = np.zeros((len(names), days.max(initial=0)), dtype=np.int32)
+    log_returns = np.zeros(signals.shape)
+    signals[ticker, position] = signal
+    log_returns[ticker, position] = signal * target
+    metrics = metric_utils.strategy_performance_grid(signals, log_returns, days)
+    # the metrics per trade of the run-length trade ledger of every ticker
+    daily_log_returns = np.zeros(signals.shape)
+    daily_log_returns[ticker, position] = log_return
+    row, start, end, trade_log_returns = metric_utils.trade_runs(signals, daily_log_returns, K, days)
+    trade_metrics = metric_utils.trade_performance_grid(row, trade_log_returns, end - start, len(names))
+    metrics.update({TRADE_COLUMNS.get(name, name): values for name, values in trade_metrics.items()})
+    leaderboard = pd.DataFrame(metrics, index=pd.Index(names, name='ticker'))[days > 0]
+
+    # buy-and-hold total return of every ticker over the window, like `benchmark_performance`
+    close = data['close'].loc[start_date:end_date].groupby(level='ticker', observed=True)
+    leaderboard['buy_and_hold_return'] = (close.last() / close.first() - 1) * 100
+    leaderboard = leaderboard.sort_values(rank_by, ascending=ascending, kind='stable')
+    print(f"[helpers/strategy_utils.py]: Backtested {name} on {len(leaderboard)} tickers")
+
+    # the plots of the single-ticker evaluation, only for the selected tickers
+    plots = {}
+    for TICKER in plot_tickers:
+        plot_spec = {**spec, 'plot': f"plot_batch_{name}_{TICKER}.png"}
+        plots[TICKER] = evaluate_strategy(data.xs(level='ticker', key=TICKER), plot_spec, ticker=TICKER)[2]
+    return leaderboard, plots
+
+# === Portfolio ===
+def signal_panels(name, tickers=None, data=None):
+    # (dates x tickers) signals of a strategy and daily close-to-close returns over its window, for the portfolio simulator
+    spec = STRATEGIES[name]
+    if 'model_features' in spec:
+        raise ValueError(f"{name} trains a model per ticker, only rule-based strategies run in a portfolio")
+    if data is None:
+        data = process_data(tickers, columns=spec['indicators'])  # every ticker in one load, compact like `batch_strategy`
+    frame = data[DEFAULT_COLUMNS + spec['indicators']]
+    # no signal on the rows where an indicator of the strategy is undefined, like `strategy_frame`
+    signal = frame.eval(signal_expression(spec)) & frame.notna().all(axis=1)
+    start_date, end_date = spec['window']
+    signals = signal.astype(np.int8).unstack('ticker', fill_value=0).loc[start_date:end_date]
+    returns = data['close'].unstack('ticker').pct_change(fill_method=None).loc[start_date:end_date]
+    return signals, returns
+
+def portfolio_strategy(name, tickers=None, sizing='equal', data=None, **settings):
+    spec = STRATEGIES[name]
+    signals, returns = signal_panels(name, tickers, data)
+    portfolio = portfolio_utils.simulate_portfolio(signals, returns, spec['holding_period'], sizing, **settings)
+    print(f"[helpers/strategy_utils.py]: Simulated a {sizing} portfolio of {name} on {signals.shape[1]} tickers")
+    portfolio_performance_stat = portfolio_utils.portfolio_performance(portfolio)
+    start_date, end_date = str(portfolio.index[0].date()), str(portfolio.index[-1].date())
+    spy = store_utils.read_ticker('benchmark', 'SPY')
+    benchmark_performance_stat = metric_utils.benchmark_performance(spy, start_date, end_date)
+
+    # visualize the equity of the portfolio against the benchmark
+    plt.switch_backend('Agg')  # Use non-interactive backend
+    ax = (portfolio.equity / portfolio.equity.iloc[0]).plot(kind='line', label=f"{spec['label']} portfolio ({sizing})", title='Portfolio Performance', ylabel='Total Return (multiples)', figsize=(10,6))
+    benchmark = spy.close.loc[start_date:end_date]
+    (benchmark / benchmark.iloc[0]).plot(kind='line', label='SPY Buy and Hold', grid=True, ax=ax)
+    plt.legend(loc='upper left')
+    plt.savefig(os.path.join(PLOT_DIR, f"plot_portfolio_{name}.png"))
+    plt.close()
+    return [benchmark_performance_stat, portfolio_performance_stat, portfolio]
+
+# === Strategies ===
+def ema_crossover_strategy(TICKER):
+    return run_strategies(TICKER, ['ema_crossover'])['ema_crossover']
+
+def ema_crossover_rsi_strategy(TICKER):
+    return run_strategies(TICKER, ['ema_crossover_rsi'])['ema_crossover_rsi']
+
+def rsi_adx_strategy(TICKER):
+    return run_strategies(TICKER, ['rsi_adx'])['rsi_adx']
+
+def indicator_ml_strategy(TICKER):
+    return run_strategies(TICKER, ['indicator_ml'])['indicator_ml']
+
+# === Feature Store ===
+def ml_feature_frames(data, spec):
+    # {ticker: feature rows} of every ticker of a (date, ticker) indicator frame
+    frames = {}
+    for TICKER in data.index.remove_unused_levels().levels[1]:
+        ticker_data = data.xs(level='ticker', key=TICKER)
+        frames[TICKER] = ml_feature_rows(ticker_data, spec)[1][feature_utils.feature_columns(spec)]
+    return frames
+
+def materialize_features(spec, tickers=None):
+    # builds the feature rows of the tickers whose stored rows are missing or out of date, in one load of their indicators
+    tickers = store_utils.list_tickers('ohlcv') if tickers is None else list(tickers)
+    stale, source = feature_utils.stale_features(spec, tickers)
+    if stale:
+        # full precision: the rows are hashed into the model keys, and the request path builds them from its float64 frame
+        data = process_data(stale, columns=spec['indicators'], dtype=np.float64)
+        feature_utils.write_features(spec, ml_feature_frames(data, spec), source)
+    return tickers
+
+def ml_ticker_split(spec, TICKER, data=None, targets=None):
+    # the training and test rows of one ticker (`ml_split`), read as two date slices of the feature store;
+    # stale or missing rows are rebuilt first, from the indicators in `data` when the caller has loaded them
+    if TICKER is None:
+        return ml_split(ml_feature_rows(data, spec, targets)[1], spec)
+    stale, source = feature_utils.stale_features(spec, [TICKER])
+    if stale and data is not None:
+        feature_utils.write_features(spec, {TICKER: ml_feature_rows(data, spec, targets)[1]}, source)
+    elif stale:
+        materialize_features(spec, [TICKER])
+    TRAIN_END, TEST_START = spec['train_end'], ml_test_start(spec)
+    train = feature_utils.ticker_features(spec, TICKER, end=TRAIN_END)
+    test = feature_utils.ticker_features(spec, TICKER, start=TEST_START)
+    train_window = (str(train.index[0].date()), TRAIN_END) if len(train) else None
+    return train, test, TEST_START, train_window
+
+def ml_features(spec, tickers=None, start=None, end=None, data=None):
+    # the feature rows of the tickers as a (date, ticker) frame, from the feature store, or built from the indicators in `data`
+    if data is not None:
+        frames = ml_feature_frames(data, spec)
+        return pd.concat(frames, names=['ticker', 'date']).swaplevel().sort_index().loc[start:end]
+    return feature_utils.read_features(spec, materialize_features(spec, tickers), start, end)
+
+# === Batch Model Training ===
+def train_ml_model(TICKER, name, n_jobs=1):
+    # one ticker of `train_models`: the training set of the request path (same rows, same key) read from the feature store,
+    # fitted unless in the registry
+    spec = STRATEGIES[name]
+    train, test, _, train_window = ml_ticker_split(spec, TICKER)
+    if train_window is None:
+        return {'ticker': TICKER, 'status': f"skipped: no signal to train on before {spec['train_end']}"}
+    FEATURES = spec['model_features']
+    model = RandomForestClassifier(n_jobs=n_jobs)
+    key, meta = model_utils.model_entry(TICKER, FEATURES, train_window, train[FEATURES], train['target'], model)
+    entry = model_utils.read_model_index()['models'].get(key)
+    if entry is not None and os.path.exists(os.path.join(model_utils.MODEL_DIR, entry['file'])):
+        return {**entry, 'key': key, 'status': 'cached'}
+    start = time.perf_counter()
+    model.fit(train[FEATURES], train['target'])
+    fit_seconds = time.perf_counter() - start
+    model_utils.write_model(key, model)
+    # training metrics: in-sample accuracy and the out-of-sample accuracy / F1-score of the test period
+    metrics = {'fit_seconds': fit_seconds, 'train_accuracy': accuracy_score(train['target'], model.predict(train[FEATURES])), 'test_rows': len(test)}
+    if len(test):
+        y_pred = model.predict(test[FEATURES])
+        metrics.update(test_accuracy=accuracy_score(test['target'], y_pred), test_f1=f1_score(test['target'], y_pred, zero_division=0))
+    return {**meta, 'metrics': metrics, 'key': key, 'status': 'trained'}
+
+def train_models(name='indicator_ml', tickers=None, workers=None, n_jobs=None):
+    spec = STRATEGIES[name]
+    if 'model_features' not in spec:
+        raise ValueError(f"'{name}' has no model to train, options: {[n for n, s in STRATEGIES.items() if 'model_features' in s]}")
+    if 'pooled_features' in spec:
+        return train_pooled_model(name, tickers, n_jobs=n_jobs)
+    tickers = store_utils.list_tickers('ohlcv') if tickers is None else list(tickers)
+    # every core: ticker-level processes, and the cores left to every process for the trees of its estimator
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, max(len(tickers), 1))
+    n_jobs = n_jobs or max(cores // workers, 1)
+    print(f"[helpers/strategy_utils.py]: Training {name} models of {len(tickers)} ticker(s), {workers} worker(s) x {n_jobs} job(s)")
+
+    # the feature rows of the tickers are built once per data version, every worker reads the rows of its ticker from the store
+    present = materialize_features(spec, tickers)
+    args = [present, [name] * len(present), [n_jobs] * len(present)]
+    if workers > 1 and len(present) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(train_ml_model, *args))
+    else:
+        results = list(map(train_ml_model, *args))
+
+    # only this process writes the index of the registry, the batch models are pinned: the LRU capacity (MODEL_CACHE_SIZE)
+    # of the request fits does not evict the warm-up of a larger universe
+    model_utils.commit_models({result.pop('key'): {k: v for k, v in result.items() if k not in ('status', 'file', 'created', 'last_used', 'pinned')}
+                               for result in results if 'key' in result}, pinned=True)
+    report = pd.DataFrame([{'ticker': r['ticker'], 'status': r['status'], 'rows': r.get('rows'), **r.get('metrics', {})} for r in results])
+    return report.set_index('ticker')
+
+# === Pooled Model ===
+def pooled_model_features(spec):
+    return spec['model_features'] + [f'{feature}_code' for feature in spec['pooled_features']]
+
+def pooled_columns(rows, spec, categories, sectors):
+    # integer codes of the ticker / sector of every row ('ticker' column), -1 for a ticker or a sector unseen in training
+    rows = rows.copy()
+    if 'ticker' in spec['pooled_features']:
+        rows['ticker_code'] = pd.Categorical(rows['ticker'], categories=categories['ticker']).codes
+    if 'sector' in spec['pooled_features']:
+        sector = rows['ticker'].map(lambda TICKER: sectors.get(TICKER, SECTORS.get(TICKER, 'Unknown')))
+        rows['sector_code'] = pd.Categorical(sector, categories=categories['sector']).codes
+    return rows
+
+def pooled_training_set(features, spec, sectors=None):
+    # the training and test rows of every ticker of the (date, ticker) frame of feature rows (`ml_features`), stacked
+    trains, tests = [], []
+    for TICKER in features.index.remove_unused_levels().levels[1]:
+        train, test, _, _ = ml_split(features.xs(level='ticker', key=TICKER), spec)
+        trains.append(train.assign(ticker=TICKER))
+        tests.append(test.assign(ticker=TICKER))
+    train, test = pd.concat(trains), pd.concat(tests)
+    if train.empty:
+        raise ValueError(f"No signal to train on before {spec['train_end']}")
+    tickers = sorted(train['ticker'].unique())
+    sectors = {TICKER: (sectors or {}).get(TICKER, SECTORS.get(TICKER, 'Unknown')) for TICKER in tickers}
+    categories = {'ticker': tickers, 'sector': sorted(set(sectors.values()))}
+    return pooled_columns(train, spec, categories, sectors), pooled_columns(test, spec, categories, sectors), categories, sectors
+
+def train_pooled_model(name='indicator_ml_pooled', tickers=None, n_jobs=None, sectors=None, data=None):
+    spec = STRATEGIES[name]
+    train, test, categories, sectors = pooled_training_set(ml_features(spec, tickers, data=data), spec, sectors)
+    FEATURES = pooled_model_features(spec)
+    # one estimator over the stacked rows: the parallelism is at the level of its trees, on every core by default
+    model = RandomForestClassifier(n_jobs=n_jobs or os.cpu_count() or 1)
+    train_window = (str(train.index.min().date()), spec['train_end'])
+    key, meta = model_utils.model_entry(POOLED_TICKER, FEATURES, train_window, train[FEATURES], train['target'], model)
+    entry = model_utils.read_model_index()['models'].get(key)
+    if entry is not None and os.path.exists(os.path.join(model_utils.MODEL_DIR, entry['file'])):
+        status, meta = 'cached', {k: v for k, v in entry.items() if k not in ('file', 'created', 'last_used', 'pinned')}
+    else:
+        print(f"[helpers/strategy_utils.py]: Training the pooled {name} model on {len(train)} rows of {len(categories['ticker'])} ticker(s)")
+        start = time.perf_counter()
+        model.fit(train[FEATURES], train['target'])
+        fit_seconds = time.perf_counter() - start
+        model_utils.write_model(key, model)
+        metrics = {'fit_seconds': fit_seconds, 'train_accuracy': accuracy_score(train['target'], model.predict(train[FEATURES])), 'test_rows': len(test)}
+        if len(test):
+            y_pred = model.predict(test[FEATURES])
+            metrics.update(test_accuracy=accuracy_score(test['target'], y_pred), test_f1=f1_score(test['target'], y_pred, zero_division=0))
+        status, meta = 'trained', {**meta, 'strategy': name, 'train_end': spec['train_end'], 'tickers': len(categories['ticker']),
+                                   'categories': categories, 'sectors': sectors, 'metrics': metrics}
+    model_utils.commit_models({key: meta}, pinned=True)
+    return pd.DataFrame([{'ticker': POOLED_TICKER, 'status': status, 'rows': meta['rows'], **meta['metrics']}]).set_index('ticker')
+
+def pooled_model(spec):
+    # the latest pooled model of the spec: same features and training period
+    model, entry = model_utils.latest_model(ticker=POOLED_TICKER, features=pooled_model_features(spec), train_end=spec['train_end'])
+    if model is None:
+        raise ValueError("No pooled model trained yet, run `flask stock train-models --strategy <pooled strategy>` first")
+    print(f"[helpers/strategy_utils.py]: Using the pooled model of {entry['tickers']} ticker(s) trained on {entry['rows']} rows")
+    return model, entry
@@ -0,0 +1,172 @@
+"""
+Module Name: window_utils.py
+============================
+
+Description:
+------------
+This module answers the buy-and-hold metrics of `metric_utils.benchmark_performance` for any date window of a price series
+without touching the bars of the window. `benchmark_performance` slices the window, then runs `pct_change`, `cumprod` and
+`cummax` over it, so every change of the window costs O(window). Here every series gets an index built once:
+    - prefix sums of the daily returns (log and simple returns, squared returns, up/down days, gross profit and loss),
+      so every sum over a window is the difference of two entries: O(1).
+    - a segment tree over the log equity, every node holding the max, the min and the largest drop (peak before trough)
+      of its range, so the maximum drawdown of a window combines O(log n) nodes.
+The index is saved as the state of the ticker in the store (see `store_utils.write_state`), tied to the version of its bars:
+it is rebuilt only when the bars change, and a date-range slider can query any window of the series in one request.
+
+The returns of a window [start, end] are the returns of the bars after the first bar of the window, like
+`data.loc[start:end].close.pct_change().dropna()`.
+
+Functions:
+----------
+1. `build_window_index(dates: np.ndarray, close: np.ndarray) -> dict`:
+    Builds the prefix sums and the drawdown segment tree of a price series, as {name: np.ndarray}.
+
+2. `window_index(dataset: str, ticker: str) -> dict`:
+    The index of a stored ticker: read from the state of the ticker, or built from its 'close' bars and saved.
+
+3. `window_bounds(index: dict, start: Optional[str], end: Optional[str]) -> Tuple[int, int]`:
+    Positions (i, j) of the first and the last bar of the window (inclusive dates, like .loc[start:end]).
+
+4. `window_drawdown(index: dict, i: int, j: int) -> float`:
+    Largest drop of the log equity over the returns of bars i+1..j, from the segment tree.
+
+5. `window_performance(index: dict, start: Optional[str], end: Optional[str]) -> dict`:
+    The metrics of `benchmark_performance` (and the Sharpe ratio) of a window, as numbers.
+
+Example Usage:
+    index = window_index('ohlcv', 'AAPL')
+    performance_dict = window_performance(index, '2015-01-01', '2019-12-31')
+
+Dependencies:
+-------------
+- numpy: For the prefix sums and the segment tree.
+- store_utils: For the bars and the saved index of a ticker.
+"""
+
+
+
+import numpy as np
+from . import store_utils
+
+# prefix sums of the index, entry k covers the returns of bars 1..k (entry 0 is 0, the first bar has no return)
+PREFIX_SUMS = ['days', 'log_returns', 'returns', 'squared_returns', 'up_days', 'down_days', 'gross_profit', 'gross_loss']
+# segment tree over the log equity, node 1 is the root and node p has the children 2p and 2p+1
+TREE_NODES = ['tree_max', 'tree_min', 'tree_drop']
+INDEX_KEYS = ['dates'] + PREFIX_SUMS + TREE_NODES
+
+# === Build ===
+def build_window_index(dates, close):
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    # a return next to a missing close is no data, like the nan of pct_change
+    valid = np.zeros(len(close), dtype=bool)
+    valid[1:] = ~np.isnan(returns[1:])
+    returns = np.where(valid, returns, 0)
+    log_returns = np.log1p(returns)
+    daily = {
+        'days': valid,
+        'log_returns': log_returns,
+        'returns': returns,
+        'squared_returns': returns ** 2,
+        'up_days': log_returns > 0,
+        'down_days': log_returns < 0,
+        'gross_profit': np.where(log_returns > 0, log_returns, 0),
+        'gross_loss': -np.where(log_returns < 0, log_returns, 0),
+    }
+    index = {'dates': np.asarray(dates).astype('datetime64[D]')}
+    for name, values in daily.items():
+        index[name] = np.cumsum(values, dtype=np.float64)
+
+    # leaves: the log equity of every bar, padded to a power of two with empty ranges (max -inf, min +inf)
+    size = 1 << max(len(close) - 1, 0).bit_length()
+    tree_max = np.full(2 * size, -np.inf)
+    tree_min = np.full(2 * size, np.inf)
+    tree_drop = np.zeros(2 * size)
+    tree_max[size:size + len(close)] = index['log_returns']
+    tree_min[size:size + len(close)] = index['log_returns']
+    # one vectorized step per level, from the leaves up to the root
+    level = size // 2
+    while level >= 1:
+        p = np.arange(level, 2 * level)
+        left, right = 2 * p, 2 * p + 1
+        tree_max[p] = np.maximum(tree_max[left], tree_max[right])
+        tree_min[p] = np.minimum(tree_min[left], tree_min[right])
+        # the largest drop of a range is in one half, or from the peak of the left half to the trough of the right half
+        tree_drop[p] = np.maximum(np.maximum(tree_drop[left], tree_drop[right]), tree_max[left] - tree_min[right])
+        level //= 2
+    index.update(tree_max=tree_max, tree_min=tree_min, tree_drop=tree_drop)
+    return index
+
+def window_index(dataset, ticker):
+    state = store_utils.read_state(dataset, ticker) or {}
+    if all(key in state for key in INDEX_KEYS):
+        return {key: state[key] for key in INDEX_KEYS}
+    print(f"[helpers/window_utils.py]: Building the window index of '{ticker}' in '{dataset}'")
+    bars = store_utils.read_ticker(dataset, ticker, columns=['close'])
+    index = build_window_index(bars.index.values, bars['close'].to_numpy())
+    # other keys of the state (if any) are kept
+    store_utils.write_state(dataset, ticker, {**state, **index})
+    return index
+
+# === Query ===
+def window_bounds(index, start=None, end=None):
+    dates = index['dates']
+    i = np.searchsorted(dates, np.datetime64(start, 'D'), side='left') if start else 0
+    j = np.searchsorted(dates, np.datetime64(end, 'D'), side='right') - 1 if end else len(dates) - 1
+    return int(i), int(j)
+
+def _combine(a, b):
+    # (max, min, drop) of two adjacent ranges, a before b
+    return max(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2], a[0] - b[1])
+
+def window_drawdown(index, i, j):
+    # equity of the bars i+1..j, i.e. the leaves [i+1, j+1), walked up from both ends
+    size = len(index['tree_max']) // 2
+    lo, hi = i + 1 + size, j + 1 + size
+    left = right = (-np.inf, np.inf, 0.0)
+    node = lambda p: (index['tree_max'][p].item(), index['tree_min'][p].item(), index['tree_drop'][p].item())
+    while lo < hi:
+        if lo & 1:
+            left = _combine(left, node(lo))
+            lo += 1
+        if hi & 1:
+            hi -= 1
+            right = _combine(node(hi), right)
+        lo //= 2
+        hi //= 2
+    return _combine(left, right)[2]
+
+def window_performance(index, start=None, end=None):
+    i, j = window_bounds(index, start, end)
+    sums = {name: (index[name][j] - index[name][i]).item() if j > i else 0.0 for name in PREFIX_SUMS}
+    days = round(sums['days'])
+    if days == 0:
+        raise ValueError(f"No return between '{start}' and '{end}'")
+    up = round(sums['up_days'])
+    down = round(sums['down_days'])
+
+    # volatility from the sums of the returns and of their squares (ddof=1, like Series.std)
+    mean = sums['returns'] / days
+    variance = (sums['squared_returns'] - days * mean ** 2) / (days - 1) if days > 1 else np.nan
+    daily_vol = np.sqrt(max(variance, 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        window_performance_dict = {
+            "start": str(index['dates'][i]),
+            "end": str(index['dates'][j]),
+            "trade_days": days,
+            "up_days": up,
+            "up_days_percentage": up / days * 100,
+            "down_days": down,
+            "down_days_percentage": down / days * 100,
+            "total_return": np.expm1(sums['log_returns']) * 100,
+            "annualised_volatility": daily_vol * np.sqrt(252) * 100,
+            "sharpe_ratio": float(np.divide(mean, daily_vol) * np.sqrt(252)),
+            "maximum_drawdown": np.expm1(-window_drawdown(index, i, j)) * 100,
+            "profit_factor": float(np.divide(sums['gross_profit'], sums['gross_loss'])),
+            "average_profit": float(np.divide(sums['gross_profit'], up)),
+            "average_loss_display": float(np.divide(sums['gross_loss'], down)),
+        }
+    return window_performance_dict
@@ -1,14 +1,60 @@
 from flask import render_template, jsonify, request
 from flask import Blueprint
+import click
 import plotly
 import json
+import numpy as np
 # Data Collection, Processing, Analysis, Prediction module
-from app.helpers.market_utils import (ema_crossover_rsi_strategy, ema_crossover_strategy,
-    fetch_stock_data, indicator_ml_strategy, rsi_adx_strategy)
+from app.helpers.market_utils import fetch_stock_data
+# Strategy engine module: declarative strategy specs, see STRATEGIES
+from app.helpers.strategy_utils import (STRATEGIES, batch_strategy, ema_crossover_rsi_strategy, ema_crossover_strategy,
+    indicator_ml_strategy, plot_performance, portfolio_strategy, rsi_adx_strategy, run_strategies, sweep_strategy, train_models, walk_forward,
+    walk_forward_ml)
+from app.helpers.store_utils import list_tickers
+# Date-window index module: buy-and-hold metrics of any window from prefix sums, see window_utils
+from app.helpers.window_utils import window_index, window_performance
 # Input validation module
 from app.helpers.validation_utils import (validate_dates, validate_ticker_list)
 stock_bp = Blueprint('stock', __name__)
 
+# Tickers of the multi-ticker requests: a comma separated string or a list, None for every fetched ticker
+def fetched_ticker_list(tickers):
+    if isinstance(tickers, str):
+        tickers = [ticker.strip() for ticker in tickers.split(',')]
+    return tickers or None
+
+# These requests run on fetched data, so the tickers are checked against the store instead of yfinance
+def not_fetched_tickers(tickers):
+    return sorted(set(tickers) - set(list_tickers('ohlcv')))
+
+# Display format of the performance dicts: the helpers return numbers (percentages in percent), the page shows them as strings
+# with the decimals below, nested dicts (e.g. 'per_trade') and lists (e.g. the [low, median, high] of 'bootstrap') are
+# formatted too and other values are sent as is
+METRIC_DECIMALS = {
+    'trade_days': 0, 'trades': 0, 'up_days': 0, 'down_days': 0, 'winning_trades': 0,
+    'up_days_percentage': 2, 'down_days_percentage': 2, 'total_return': 2, 'annualised_volatility': 2, 'maximum_drawdown': 2,
+    'win_rate': 2, 'average_trade_return': 2, 'cagr': 2, 'average_exposure': 2, 'annual_turnover': 2, 'total_costs': 2,
+    'sharpe_ratio': 3, 'profit_factor': 3, 'average_profit': 3, 'average_loss_display': 3, 'average_holding_days': 1,
+}
+def format_metrics(metrics):
+    formatted = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            formatted[name] = format_metrics(value)
+        elif name in METRIC_DECIMALS and isinstance(value, list):
+            formatted[name] = [f"{v:.{METRIC_DECIMALS[name]}f}" for v in value]
+        elif name in METRIC_DECIMALS:
+            formatted[name] = f"{value:.{METRIC_DECIMALS[name]}f}"
+        else:
+            formatted[name] = value
+    return formatted
+
+# JSON records of a result table, metrics rounded and undefined values (e.g. no trade) sent as null, like an infinite value
+# that JSON has no literal for
+def table_records(table):
+    table = table.round(3).replace([np.inf, -np.inf], np.nan)
+    return table.astype(object).where(table.notna(), None).to_dict(orient='records')
+
 # Wilfred's Portion
 # Main Page
 @stock_bp.route('/stock-analyzer')
@@ -58,8 +104,8 @@ def fetch_stock_data_request():
     date_valid, date_msg = validate_dates(data.get('start_date'), data.get('end_date'))  # Validate if dates are logically correct
     if date_valid & ticker_valid: 
         tickers_list = [ticker.strip() for ticker in tickers.split(',')]     # Transform Tickers Input to proper list data type for yfinance api call
-        fetch_stock_data(tickers_list, start_date, end_date)  # yfinance API call to fetch data and store in .csv file in static/data, two files: ohlcv.csv, spy.csv
-        return jsonify(success=True, message="Data Fetched to CSV File!", tickers_list=tickers_list)
+        fetch_stock_data(tickers_list, start_date, end_date)  # yfinance API call to fetch data into the columnar store in static/data/store, two datasets: ohlcv, benchmark
+        return jsonify(success=True, message="Data Fetched to Store!", tickers_list=tickers_list)
     else:
         if ticker_valid == False:
             errors["ticker_msg"] = ticker_msg
@@ -77,7 +123,7 @@ def process_stock_data_request():
     if not strategy:
         return jsonify({"error": "Strategy not provided"}), 400  # Return error if no strategy
     # Control Flow for the various different strategies
-    # The data processing, analysis and predictions logic are handled in the market_utils.py helper file, this keeps the route file abstract and readable
+    # The data processing, analysis and predictions logic are handled in the market_utils.py and strategy_utils.py helper files, this keeps the route file abstract and readable
     # Note the similarities that each strategy has: 
     # for example in variables returned, one set of benchmark data, one set of strategy performance data, one plotly figure json encoded for frontend render (For Price Visualisation Chart)
     # lastly, image_url for the 'Strategy Performance Charts' image(s) that are already generated under the respective strategy functions
@@ -85,8 +131,8 @@ def process_stock_data_request():
         case "1":
             print("=== Using Strategy 1: EMA Crossover ===") 
             data_statistics = ema_crossover_strategy(ticker) 
-            benchmark_data = data_statistics[0]  
-            strat_perf_data = data_statistics[1]
+            benchmark_data = format_metrics(data_statistics[0])
+            strat_perf_data = format_metrics(data_statistics[1])
             fig = data_statistics[2]
             graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
@@ -94,8 +140,8 @@ def process_stock_data_request():
         case "2":
             print("=== Using Strategy 2: EMA Crossover with RSI filter ===")
             data_statistics = ema_crossover_rsi_strategy(ticker)
-            benchmark_data = data_statistics[0]
-            strat_perf_data = data_statistics[1]
+            benchmark_data = format_metrics(data_statistics[0])
+            strat_perf_data = format_metrics(data_statistics[1])
             fig = data_statistics[2]
             graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
@@ -103,16 +149,16 @@ def process_stock_data_request():
         case "3":
             print("=== Using Strategy 3: ADX with RSI ===")
             data_statistics = rsi_adx_strategy(ticker)
-            benchmark_data = data_statistics[0]
-            strat_perf_data = data_statistics[1]
+            benchmark_data = format_metrics(data_statistics[0])
+            strat_perf_data = format_metrics(data_statistics[1])
             fig = data_statistics[2]
             graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
             return jsonify(image_url='static/data/plot_strategy_rsi_adx.png', benchmark_data=benchmark_data, strat_perf_data=strat_perf_data, graphJSON=graphJSON)
         case "4":
             print("=== Using Strategy 4: ML ===")
             data_statistics = indicator_ml_strategy(ticker)
-            benchmark_data = data_statistics[0]
-            strat_perf_data = data_statistics[1]
+            benchmark_data = format_metrics(data_statistics[0])
+            strat_perf_data = format_metrics(data_statistics[1])
             fig = data_statistics[2]
             graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
             return jsonify(image_url='static/data/plot_strategy_ml_indicator.png', image_url_second='static/data/plot_strategy_ml_indicator_comparison.png', benchmark_data=benchmark_data, strat_perf_data=strat_perf_data, graphJSON=graphJSON)
@@ -122,5 +168,186 @@ def process_stock_data_request():
     # Respond with the default image path
     return jsonify(image_url='static/data/plot.png')
 
+# Evaluate Strategies Request
+# Several strategies on the same ticker, the data is loaded and processed once for all of them (see run_strategies)
+@stock_bp.route('/evaluate-strategies', methods=['POST'])
+def evaluate_strategies_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    ticker = data.get('ticker')
+    strategies = data.get('strategies') or []
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if not ticker or not strategies or unknown:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategies: {unknown}, options: {list(STRATEGIES)}"}), 400
+    try:
+        evaluated = run_strategies(ticker, strategies)
+    except ValueError as e:
+        return jsonify(success=False, errors={"strategy_msg": str(e)}), 400
+    results = {}
+    for name, (benchmark_data, strat_perf_data, fig) in evaluated.items():
+        results[name] = dict(
+            image_url=f"static/data/{STRATEGIES[name]['plot']}",
+            benchmark_data=format_metrics(benchmark_data),
+            strat_perf_data=format_metrics(strat_perf_data),
+            graphJSON=json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder),
+        )
+        if 'comparison_plot' in STRATEGIES[name]:
+            results[name]['image_url_second'] = f"static/data/{STRATEGIES[name]['comparison_plot']}"
+    return jsonify(success=True, results=results)
+
+# Parameter Sweep Request
+# Ranks a grid of parameter combinations of one strategy, e.g. {"holding_period": [5, 7, 10], "rsi_level": [30, 35, 40, 45]}
+# The parameters of a strategy are listed in the 'params' of its spec in STRATEGIES, the others keep their default value
+@stock_bp.route('/sweep-strategy', methods=['POST'])
+def sweep_strategy_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    ticker = data.get('ticker')
+    strategy = data.get('strategy')
+    grid = data.get('grid') or {}
+    rank_by = data.get('rank_by', 'total_return')
+    top = int(data.get('top', 50))
+    if not ticker or strategy not in STRATEGIES:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategy: {strategy}, options: {list(STRATEGIES)}"}), 400
+    try:
+        table = sweep_strategy(ticker, strategy, grid, rank_by=rank_by, ascending=bool(data.get('ascending', False)))
+    except (KeyError, ValueError) as e:
+        return jsonify(success=False, errors={"grid_msg": str(e)}), 400
+    return jsonify(success=True, combinations=len(table), ranking=table_records(table.head(top)))
+
+# Walk-Forward Request
+# Rolling train/test windows: the parameters of the grid are selected on every training window and the test windows are stitched
+@stock_bp.route('/walk-forward', methods=['POST'])
+def walk_forward_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    ticker = data.get('ticker')
+    strategy = data.get('strategy')
+    if not ticker or strategy not in STRATEGIES:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategy: {strategy}, options: {list(STRATEGIES)}"}), 400
+    try:
+        result = walk_forward(ticker, strategy, data.get('grid') or {},
+            train_years=int(data.get('train_years', 4)), test_years=int(data.get('test_years', 1)),
+            rank_by=data.get('rank_by', 'total_return'), ascending=bool(data.get('ascending', False)))
+    except (KeyError, ValueError) as e:
+        return jsonify(success=False, errors={"grid_msg": str(e)}), 400
+    # 'Strategy Performance Chart' of the stitched out-of-sample windows
+    spec = {**STRATEGIES[strategy], 'label': f"{STRATEGIES[strategy]['label']} (walk-forward)", 'plot': 'plot_walk_forward.png'}
+    plot_performance(result['strategy'], spec)
+    return jsonify(success=True, image_url='static/data/plot_walk_forward.png', benchmark_data=format_metrics(result['benchmark']),
+        strat_perf_data=format_metrics(result['performance']), windows=table_records(result['windows']))
+
+# Walk-Forward ML Request
+# The ML strategy retrained on an expanding window every 'retrain_weeks' weeks over the full history, every retrain adds
+# trees to the previous forest (warm start) unless "warm_start": false, and the test windows of the retrains are stitched
+@stock_bp.route('/walk-forward-ml', methods=['POST'])
+def walk_forward_ml_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    ticker = data.get('ticker')
+    strategy = data.get('strategy', 'indicator_ml')
+    if not ticker or strategy not in STRATEGIES:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategy: {strategy}, options: {list(STRATEGIES)}"}), 400
+    try:
+        result = walk_forward_ml(ticker, strategy, train_years=int(data.get('train_years', 4)),
+            retrain_weeks=int(data.get('retrain_weeks', 13)), trees_per_step=int(data.get('trees_per_step', 10)),
+            warm_start=bool(data.get('warm_start', True)))
+    except ValueError as e:
+        return jsonify(success=False, errors={"strategy_msg": str(e)}), 400
+    # 'Strategy Performance Chart' of the stitched out-of-sample windows
+    spec = {**STRATEGIES[strategy], 'label': f"{STRATEGIES[strategy]['label']} (walk-forward)", 'plot': 'plot_walk_forward_ml.png'}
+    plot_performance(result['strategy'], spec)
+    return jsonify(success=True, image_url='static/data/plot_walk_forward_ml.png', benchmark_data=format_metrics(result['benchmark']),
+        strat_perf_data=format_metrics(result['performance']), windows=table_records(result['windows']))
+
+# Batch Backtest Request
+# One strategy over every fetched ticker (or the given 'tickers') in a single pass, returns a leaderboard of the metrics
+# Plots are only rendered for the 'plot_tickers' the caller selects
+@stock_bp.route('/batch-strategy', methods=['POST'])
+def batch_strategy_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    strategy = data.get('strategy')
+    tickers = data.get('tickers')
+    plot_tickers = data.get('plot_tickers') or []
+    if strategy not in STRATEGIES:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategy: {strategy}, options: {list(STRATEGIES)}"}), 400
+    tickers = fetched_ticker_list(tickers)
+    not_fetched = not_fetched_tickers((tickers or []) + plot_tickers)
+    if not_fetched:
+        return jsonify(success=False, errors={"ticker_msg": f"Tickers not fetched yet: {not_fetched}"}), 400
+    try:
+        leaderboard, plots = batch_strategy(strategy, tickers, rank_by=data.get('rank_by', 'total_return'),
+            ascending=bool(data.get('ascending', False)), plot_tickers=plot_tickers)
+    except (KeyError, ValueError) as e:
+        return jsonify(success=False, errors={"strategy_msg": str(e)}), 400
+    charts = {
+        ticker: dict(image_url=f"static/data/plot_batch_{strategy}_{ticker}.png", graphJSON=json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+        for ticker, fig in plots.items()
+    }
+    return jsonify(success=True, leaderboard=table_records(leaderboard.reset_index()), charts=charts)
+
+# Portfolio Request
+# Allocates the capital across every ticker held by a strategy ('equal' or 'vol_target' sizing), net of slippage and commissions
+@stock_bp.route('/portfolio-strategy', methods=['POST'])
+def portfolio_strategy_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    strategy = data.get('strategy')
+    tickers = data.get('tickers')
+    if strategy not in STRATEGIES:
+        return jsonify(success=False, errors={"strategy_msg": f"Unknown or missing strategy: {strategy}, options: {list(STRATEGIES)}"}), 400
+    tickers = fetched_ticker_list(tickers)
+    not_fetched = not_fetched_tickers(tickers or [])
+    if not_fetched:
+        return jsonify(success=False, errors={"ticker_msg": f"Tickers not fetched yet: {not_fetched}"}), 400
+    # optional settings of the simulator, see portfolio_utils.simulate_portfolio
+    settings = {name: float(data[name]) for name in ['target_volatility', 'slippage_bps', 'commission_bps', 'max_leverage'] if name in data}
+    try:
+        benchmark_data, portfolio_data, _ = portfolio_strategy(strategy, tickers, sizing=data.get('sizing', 'equal'), **settings)
+    except ValueError as e:
+        return jsonify(success=False, errors={"strategy_msg": str(e)}), 400
+    return jsonify(success=True, image_url=f'static/data/plot_portfolio_{strategy}.png', benchmark_data=format_metrics(benchmark_data),
+        portfolio_data=format_metrics(portfolio_data))
 
+# Window Performance Request
+# Buy-and-hold metrics of any date window of a fetched ticker (or of the SPY benchmark with "benchmark": true), answered from
+# the window index of the series without slicing the bars, so the page can query it on every move of a date-range slider
+@stock_bp.route('/window-performance', methods=['POST'])
+def window_performance_request():
+    # Retrieve Input from Web App
+    data = request.get_json()
+    dataset, ticker = ('benchmark', 'SPY') if data.get('benchmark') else ('ohlcv', data.get('ticker'))
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    if ticker not in list_tickers(dataset):
+        return jsonify(success=False, errors={"ticker_msg": f"Ticker not fetched yet: {ticker}"}), 400
+    if start_date and end_date:
+        date_valid, date_msg = validate_dates(start_date, end_date)
+        if not date_valid:
+            return jsonify(success=False, errors={"date_msg": date_msg}), 400
+    try:
+        window_data = window_performance(window_index(dataset, ticker), start_date, end_date)
+    except ValueError as e:
+        return jsonify(success=False, errors={"date_msg": str(e)}), 400
+    return jsonify(success=True, window_data=format_metrics(window_data))
 
+# Batch Model Training Command
+# Offline trainer of the ML strategy models for every fetched ticker (e.g. a nightly job), so the requests only load and predict:
+#   flask stock train-models [--strategy indicator_ml] [--tickers AAPL,MSFT] [--workers 4] [--n-jobs 2]
+# A pooled strategy (e.g. --strategy indicator_ml_pooled) trains one model over the stacked tickers instead
+@stock_bp.cli.command('train-models')
+@click.option('--strategy', default='indicator_ml', help='ML strategy of STRATEGIES to train.')
+@click.option('--tickers', default=None, help='Comma separated tickers, every fetched ticker by default.')
+@click.option('--workers', type=int, default=None, help='Ticker-level worker processes, every core by default.')
+@click.option('--n-jobs', type=int, default=None, help='Jobs of every estimator, the cores left per worker by default.')
+def train_models_command(strategy, tickers, workers, n_jobs):
+    tickers = fetched_ticker_list(tickers)
+    not_fetched = not_fetched_tickers(tickers or [])
+    if not_fetched:
+        raise click.BadParameter(f"Tickers not fetched yet: {not_fetched}", param_hint='--tickers')
+    try:
+        report = train_models(strategy, tickers, workers=workers, n_jobs=n_jobs)
+    except (KeyError, ValueError) as e:
+        raise click.BadParameter(str(e), param_hint='--strategy')
+    click.echo(report.round(3).to_string())
@@ -0,0 +1 @@
+# Benchmarks of the analysis helpers, run from the root dir, e.g. `python -m benchmarks.indicator_benchmark`
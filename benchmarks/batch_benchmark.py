@@ -0,0 +1,56 @@
+"""
+Module Name: batch_benchmark.py
+===============================
+
+Description:
+------------
+Times the cross-sectional backtest of the RSI + ADX strategy on a universe of tickers:
+    - loop: `strategy_frame` + `strategy_peformance` per ticker (one request per ticker, without the indicator load)
+    - batch: `batch_strategy`, one vectorized pass over the rows of every ticker
+and checks that both give the same metrics.
+
+Usage:
+------
+    python -m benchmarks.batch_benchmark [n_tickers]
+"""
+
+
+
+import io
+import sys
+import contextlib
+import numpy as np
+import pandas as pd
+from app.helpers import indicator_utils, strategy_utils
+from benchmarks.common import synthetic_bars, best_of
+
+NAME = 'rsi_adx'
+
+def loop_metrics(data, spec):
+    metrics = {}
+    for ticker in data.index.levels[1]:
+        strategy = strategy_utils.strategy_frame(data.xs(level='ticker', key=ticker), spec).loc[spec['window'][0]:spec['window'][1]]
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics[ticker] = strategy_utils.metric_utils.strategy_peformance(strategy)
+    return metrics
+
+def main(n_tickers=300):
+    spec = strategy_utils.STRATEGIES[NAME]
+    frames = indicator_utils.compute_frames(synthetic_bars(n_tickers), spec['indicators'])
+    # the (date, ticker) layout of process_data
+    data = pd.concat(frames, names=['ticker', 'date']).swaplevel().sort_index()
+    print(f"[benchmarks/batch_benchmark.py]: {n_tickers} tickers, {len(data)} rows")
+    loop_time = best_of(lambda: loop_metrics(data, spec), repeat=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_time = best_of(lambda: strategy_utils.batch_strategy(NAME, data=data))
+        leaderboard, _ = strategy_utils.batch_strategy(NAME, data=data)
+    print(f"  loop over tickers : {loop_time:8.3f}s")
+    print(f"  batch             : {batch_time:8.3f}s ({loop_time / batch_time:.0f}x)")
+
+    for ticker, metrics in loop_metrics(data, spec).items():
+        for name, value in metrics.items():
+            np.testing.assert_allclose(leaderboard.loc[ticker, name], value, rtol=1e-9)
+    print("  same metrics as strategy_peformance")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,49 @@
+"""
+Module Name: bootstrap_benchmark.py
+===================================
+
+Description:
+------------
+Times `confidence_intervals` (10k block-bootstrap resamples by default) on 20 years of daily strategy returns
+(a position on 30% of the days, 0 otherwise), for a few block sizes, and checks `bootstrap_metrics` against
+the resampled paths materialised as a (days x resamples) matrix and evaluated with `metric_utils.performance_grid`.
+
+Usage:
+------
+    python -m benchmarks.bootstrap_benchmark [resamples]
+"""
+
+
+
+import io
+import sys
+import contextlib
+import numpy as np
+from app.helpers import metric_utils, montecarlo_utils
+from benchmarks.common import synthetic_bars, best_of
+
+def materialised_metrics(returns, resamples, block_size, seed):
+    # the same paths as `bootstrap_metrics`, one column per resample
+    days = len(returns)
+    starts = montecarlo_utils.block_starts(days, resamples, block_size, seed)
+    paths = (starts[:, :, None] + np.arange(block_size)).reshape(resamples, -1)[:, :days] % days
+    return metric_utils.performance_grid(returns[paths].T)
+
+def main(resamples=10_000):
+    close = synthetic_bars(1)['T0000']['close']
+    rng = np.random.default_rng(0)
+    returns = np.where(rng.uniform(size=len(close) - 1) < 0.3, close.pct_change().to_numpy()[1:], 0)
+    print(f"[benchmarks/bootstrap_benchmark.py]: {resamples} resamples of {len(returns)} days")
+    for block_size in [1, 5, 10, 21]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = best_of(lambda: montecarlo_utils.confidence_intervals(returns, resamples, block_size))
+        print(f"  blocks of {block_size:>2} days : {elapsed:8.3f}s")
+
+        metrics = montecarlo_utils.bootstrap_metrics(returns, 200, block_size, seed=1)
+        expected = materialised_metrics(returns, 200, block_size, seed=1)
+        for name, values in metrics.items():
+            np.testing.assert_allclose(values, expected[name], rtol=1e-9)
+    print("  same metrics as the materialised paths")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
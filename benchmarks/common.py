@@ -0,0 +1,55 @@
+"""
+Module Name: common.py
+======================
+
+Description:
+------------
+Shared helpers for the benchmark scripts: synthetic daily bars (no network needed) and a best-of-n timer.
+
+Functions:
+----------
+1. `synthetic_bars(n_tickers: int, start: str, end: str, seed: int) -> dict`:
+    Returns {ticker: OHLCV bars} of random walks, with staggered listing dates like a real universe.
+
+2. `best_of(func: Callable, repeat: int) -> float`:
+    Returns the fastest wall time of `repeat` calls to `func`, in seconds.
+
+Dependencies:
+-------------
+- numpy / pandas: For the synthetic bars.
+"""
+
+
+
+import time
+import numpy as np
+import pandas as pd
+
+def synthetic_bars(n_tickers=100, start='2005-01-01', end='2025-01-01', seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end, inclusive='left', name='date')
+    frames = {}
+    for i in range(n_tickers):
+        # a quarter of the tickers list later, so the panels are ragged as in the real store
+        listed = dates[rng.integers(0, len(dates) // 2)] if i % 4 == 0 else dates[0]
+        index = dates[dates >= listed]
+        rows = len(index)
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+        high = close * (1 + rng.uniform(0, 0.02, rows))
+        low = close * (1 - rng.uniform(0, 0.02, rows))
+        frames[f'T{i:04d}'] = pd.DataFrame({
+            'open': low + (high - low) * rng.uniform(size=rows),
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': rng.integers(100_000, 10_000_000, rows).astype(np.float64),
+        }, index=index)
+    return frames
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
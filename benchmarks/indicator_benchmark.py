@@ -0,0 +1,46 @@
+"""
+Module Name: indicator_benchmark.py
+===================================
+
+Description:
+------------
+Times the ADX / RSI lengths built by `contruct_indicators` (adx 3, 5, 7, 14 and rsi 7, 9, 10, 14):
+    - shared: one `compute_panel` call, true range, directional movement and gains / losses are derived once
+    - per length: one `compute_panel` call per length, every call recomputes its intermediates (what separate
+      `ta.adx` / `ta.rsi` calls did)
+The values of the kernels are checked against recorded pandas_ta 0.3.14b0 values in tests/test_indicator_utils.py.
+
+Usage:
+------
+    python -m benchmarks.indicator_benchmark [n_tickers]
+"""
+
+
+
+import sys
+from app.helpers import indicator_utils
+from benchmarks.common import synthetic_bars, best_of
+
+ADX_LENGTHS = [3, 5, 7, 14]
+RSI_LENGTHS = [7, 9, 10, 14]
+COLUMNS = [f'adx_{n}' for n in ADX_LENGTHS] + [f'rsi_{n}' for n in RSI_LENGTHS]
+
+def shared(panel):
+    indicator_utils.compute_panel(dict(panel), COLUMNS)
+
+def per_length(panel):
+    for column in COLUMNS:
+        indicator_utils.compute_panel(dict(panel), [column])
+
+def main(n_tickers=200):
+    frames = synthetic_bars(n_tickers)
+    panel = indicator_utils.to_panel(frames, ['high', 'low', 'close'])
+    print(f"[benchmarks/indicator_benchmark.py]: {n_tickers} tickers, {panel['close'].shape[0]} bars, columns {COLUMNS}")
+    shared_time = best_of(lambda: shared(panel))
+    per_length_time = best_of(lambda: per_length(panel))
+    print(f"  shared intermediates : {shared_time:8.3f}s")
+    print(f"  per length           : {per_length_time:8.3f}s")
+    print(f"  saved                : {per_length_time - shared_time:8.3f}s ({1 - shared_time / per_length_time:.0%})")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""
+Module Name: median_benchmark.py
+================================
+
+Description:
+------------
+Times the norm_volume_3/5/10/21/50 columns built by `contruct_indicators`:
+    - pandas: volume / volume.rolling(w).median(), one call per window (the original implementation)
+    - kernel: `compute_panel` with every norm_volume window in one call of the rolling-median kernel
+and checks that both give the same numbers.
+
+Usage:
+------
+    python -m benchmarks.median_benchmark [n_tickers]
+"""
+
+
+
+import sys
+import numpy as np
+from app.helpers import indicator_utils
+from benchmarks.common import synthetic_bars, best_of
+
+WINDOWS = [3, 5, 10, 21, 50]
+COLUMNS = [f'norm_volume_{w}' for w in WINDOWS]
+
+def pandas_norm_volume(frames):
+    result = {}
+    for ticker, data in frames.items():
+        result[ticker] = {f'norm_volume_{w}': data['volume'] / data['volume'].rolling(w).median() for w in WINDOWS}
+    return result
+
+def main(n_tickers=300):
+    frames = synthetic_bars(n_tickers)
+    panel = indicator_utils.to_panel(frames, ['volume'])
+    print(f"[benchmarks/median_benchmark.py]: {n_tickers} tickers, {panel['volume'].shape[0]} bars, windows {WINDOWS}")
+    pandas_time = best_of(lambda: pandas_norm_volume(frames), repeat=1)
+    kernel_time = best_of(lambda: indicator_utils.compute_panel(dict(panel), COLUMNS))
+    print(f"  pandas rolling median : {pandas_time:8.3f}s")
+    print(f"  multi-window kernel   : {kernel_time:8.3f}s ({pandas_time / kernel_time:.1f}x)")
+
+    expected = pandas_norm_volume(frames)
+    result = indicator_utils.compute_panel(dict(panel), COLUMNS)
+    for j, ticker in enumerate(frames):
+        rows = len(frames[ticker])
+        for column in COLUMNS:
+            np.testing.assert_allclose(result[column][:rows, j], expected[ticker][column].to_numpy(), rtol=1e-12)
+    print("  same numbers as pandas")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,86 @@
+"""
+Module Name: pooled_benchmark.py
+================================
+
+Description:
+------------
+Compares the two training modes of the ML strategy on a universe of tickers (one estimator job each):
+    - per ticker: one RandomForestClassifier per ticker on its own signal rows (`indicator_ml`, `train_models`)
+    - pooled: one RandomForestClassifier on the stacked rows of every ticker with the sector code (`indicator_ml_pooled`)
+Reports the training time, the memory of the fitted models (pickled size) and of the training (traced peak),
+the inference time of a ticker and the out-of-sample accuracy over the test rows of every ticker.
+
+Usage:
+------
+    python -m benchmarks.pooled_benchmark [n_tickers]
+"""
+
+
+
+import io
+import sys
+import time
+import pickle
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from app.helpers import indicator_utils, strategy_utils
+from benchmarks.common import synthetic_bars
+
+def per_ticker(data, spec):
+    models, tests = {}, {}
+    for ticker in data.index.levels[1]:
+        ticker_data = data.xs(level='ticker', key=ticker)
+        _, train, test, _, _ = strategy_utils.ml_training_set(ticker_data, spec, strategy_utils.forward_return_frame(ticker_data, [spec['holding_period']]))
+        models[ticker] = RandomForestClassifier(n_jobs=1, random_state=0).fit(train[spec['model_features']], train['target'])
+        tests[ticker] = test
+    return models, tests
+
+def pooled(data, spec, sectors):
+    train, test, _, _ = strategy_utils.pooled_training_set(strategy_utils.ml_features(spec, data=data), spec, sectors)
+    FEATURES = strategy_utils.pooled_model_features(spec)
+    return RandomForestClassifier(n_jobs=1, random_state=0).fit(train[FEATURES], train['target']), test
+
+def measured(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main(n_tickers=20):
+    spec = strategy_utils.STRATEGIES['indicator_ml_pooled']
+    frames = indicator_utils.compute_frames(synthetic_bars(n_tickers), spec['indicators'])
+    data = pd.concat(frames, names=['ticker', 'date']).swaplevel().sort_index()
+    sectors = {ticker: f'Sector {i % 5}' for i, ticker in enumerate(frames)}
+    print(f"[benchmarks/pooled_benchmark.py]: {n_tickers} tickers, {len(data)} rows")
+
+    (models, tests), ticker_time, ticker_peak = measured(lambda: per_ticker(data, spec))
+    (model, test), pooled_time, pooled_peak = measured(lambda: pooled(data, spec, sectors))
+    FEATURES = spec['model_features']
+    POOLED_FEATURES = strategy_utils.pooled_model_features(spec)
+
+    # out-of-sample: the test rows of every ticker, predicted by its own model / by the pooled model
+    y_true = np.concatenate([tests[t]['target'] for t in tests])
+    start = time.perf_counter()
+    ticker_pred = np.concatenate([models[t].predict(tests[t][FEATURES]) for t in tests])
+    ticker_predict = (time.perf_counter() - start) / len(tests)
+    start = time.perf_counter()
+    pooled_pred = np.concatenate([model.predict(test[test['ticker'] == t][POOLED_FEATURES]) for t in tests])
+    pooled_predict = (time.perf_counter() - start) / len(tests)
+    y_pooled = np.concatenate([test[test['ticker'] == t]['target'] for t in tests])
+
+    ticker_size = sum(len(pickle.dumps(m)) for m in models.values())
+    pooled_size = len(pickle.dumps(model))
+    print(f"  {'mode':<12}{'train':>10}{'peak memory':>14}{'models':>12}{'predict/ticker':>16}{'OOS accuracy':>14}")
+    print(f"  {'per ticker':<12}{ticker_time:>9.2f}s{ticker_peak / 2**20:>12.1f}MB{ticker_size / 2**20:>10.1f}MB{ticker_predict * 1e3:>14.1f}ms{accuracy_score(y_true, ticker_pred):>14.3f}")
+    print(f"  {'pooled':<12}{pooled_time:>9.2f}s{pooled_peak / 2**20:>12.1f}MB{pooled_size / 2**20:>10.1f}MB{pooled_predict * 1e3:>14.1f}ms{accuracy_score(y_pooled, pooled_pred):>14.3f}")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
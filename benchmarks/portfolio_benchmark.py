@@ -0,0 +1,35 @@
+"""
+Module Name: portfolio_benchmark.py
+===================================
+
+Description:
+------------
+Times `simulate_portfolio` on a universe of tickers x 20 years of daily bars, for every sizing rule,
+with random signals (5% of the days) held for 7 days, slippage and commissions.
+
+Usage:
+------
+    python -m benchmarks.portfolio_benchmark [n_tickers]
+"""
+
+
+
+import sys
+import numpy as np
+import pandas as pd
+from app.helpers import portfolio_utils
+from benchmarks.common import synthetic_bars, best_of
+
+def main(n_tickers=500):
+    frames = synthetic_bars(n_tickers)
+    returns = pd.concat({ticker: data['close'] for ticker, data in frames.items()}, axis=1).pct_change(fill_method=None)
+    rng = np.random.default_rng(0)
+    signals = pd.DataFrame((rng.uniform(size=returns.shape) < 0.05).astype(np.int8), index=returns.index, columns=returns.columns)
+    print(f"[benchmarks/portfolio_benchmark.py]: {n_tickers} tickers x {len(returns)} days")
+    for sizing in portfolio_utils.SIZING_RULES:
+        elapsed = best_of(lambda: portfolio_utils.simulate_portfolio(signals, returns, holding_period=7, sizing=sizing))
+        portfolio = portfolio_utils.simulate_portfolio(signals, returns, holding_period=7, sizing=sizing)
+        print(f"  {sizing:<10} : {elapsed:8.3f}s (final equity {portfolio['equity'].iloc[-1]:,.0f}, average positions {portfolio['positions'].mean():.1f})")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
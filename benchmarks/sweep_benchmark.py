@@ -0,0 +1,69 @@
+"""
+Module Name: sweep_benchmark.py
+===============================
+
+Description:
+------------
+Times the parameter sweep of the RSI + ADX strategy (holding period, RSI/ADX lengths and thresholds) on one ticker:
+    - loop: `strategy_frame` + `strategy_peformance` for every combination (tuning before the sweep), timed on a sample
+    - sweep: `sweep_strategy` over the whole grid, thresholds broadcast and metrics from `strategy_performance_grid` (batched `performance_grid`)
+and checks that both give the same metrics on the sampled combinations.
+
+Usage:
+------
+    python -m benchmarks.sweep_benchmark [n_sampled]
+"""
+
+
+
+import io
+import sys
+import time
+import itertools
+import contextlib
+import numpy as np
+from app.helpers import indicator_utils, strategy_utils
+from benchmarks.common import synthetic_bars, best_of
+
+GRID = {
+    'holding_period': [3, 5, 7, 10, 14],
+    'rsi_k': [7, 9, 10, 14],
+    'rsi_level': list(range(25, 75, 5)),
+    'adx_k': [5, 7, 14],
+    'adx_level': list(range(10, 50, 2)),
+}
+
+def loop_metrics(data, spec, params):
+    spec = strategy_utils.with_params(spec, params)
+    strategy = strategy_utils.strategy_frame(data, spec).loc[spec['window'][0]:spec['window'][1]]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return strategy_utils.metric_utils.strategy_peformance(strategy)
+
+def main(n_sampled=100):
+    spec = strategy_utils.STRATEGIES['rsi_adx']
+    bars = synthetic_bars(1)['T0000']
+    columns = list(dict.fromkeys(spec['indicators'] + [f'rsi_{n}' for n in GRID['rsi_k']] + [f'adx_{n}' for n in GRID['adx_k']]))
+    data = indicator_utils.compute_indicators(bars, columns)
+    combinations = [dict(zip(GRID, values)) for values in itertools.product(*GRID.values())]
+    print(f"[benchmarks/sweep_benchmark.py]: {len(combinations)} combinations, {len(data)} bars")
+
+    rng = np.random.default_rng(0)
+    sample = [combinations[i] for i in rng.choice(len(combinations), n_sampled, replace=False)]
+    start = time.perf_counter()
+    expected = [loop_metrics(data, spec, params) for params in sample]
+    loop_time = (time.perf_counter() - start) / n_sampled * len(combinations)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sweep_time = best_of(lambda: strategy_utils.sweep_strategy('T0000', 'rsi_adx', GRID, data=data))
+        table = strategy_utils.sweep_strategy('T0000', 'rsi_adx', GRID, data=data)
+    print(f"  loop over combinations : {loop_time:8.3f}s (extrapolated from {n_sampled})")
+    print(f"  vectorized sweep       : {sweep_time:8.3f}s ({loop_time / sweep_time:.0f}x)")
+
+    table = table.set_index(list(GRID))
+    for params, metrics in zip(sample, expected):
+        row = table.loc[tuple(params.values())]
+        for name, value in metrics.items():
+            np.testing.assert_allclose(row[name], value, rtol=1e-9)
+    print("  same metrics as strategy_peformance")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
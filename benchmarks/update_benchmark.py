@@ -0,0 +1,41 @@
+"""
+Module Name: update_benchmark.py
+================================
+
+Description:
+------------
+Times an end-of-day refresh (one new bar per ticker) of every indicator built by `contruct_indicators`:
+    - full: `compute_frames` over the whole history, what process_data did for every ticker whose bars changed
+    - update: `update_frames` from the carried state and the `warmup_rows` tail of history
+
+Usage:
+------
+    python -m benchmarks.update_benchmark [n_tickers] [new_bars]
+"""
+
+
+
+import sys
+from app.helpers import indicator_utils
+from benchmarks.common import synthetic_bars, best_of
+
+COLUMNS = ['log_return'] + indicator_utils.DEFAULT_INDICATORS
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def main(n_tickers=300, new_bars=1):
+    frames = synthetic_bars(n_tickers)
+    history = {t: data.iloc[:-new_bars] for t, data in frames.items()}
+    new = {t: data.iloc[-new_bars:] for t, data in frames.items()}
+    states = {}
+    indicator_utils.compute_frames(history, COLUMNS, states)
+    rows = indicator_utils.warmup_rows(COLUMNS, PRICE_COLUMNS)
+    tails = {t: data.iloc[-rows:] for t, data in history.items()}
+    print(f"[benchmarks/update_benchmark.py]: {n_tickers} tickers, {new_bars} new bar(s), {len(COLUMNS)} columns, {rows} warm-up bars")
+    full_time = best_of(lambda: indicator_utils.compute_frames(frames, COLUMNS), repeat=1)
+    # states are updated in place, every run starts again from a copy
+    update_time = best_of(lambda: indicator_utils.update_frames(tails, new, {t: dict(s) for t, s in states.items()}, COLUMNS))
+    print(f"  full history : {full_time:8.3f}s")
+    print(f"  update       : {update_time:8.3f}s ({full_time / update_time:.0f}x)")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""
+Module Name: walk_forward_ml_benchmark.py
+=========================================
+
+Description:
+------------
+Times `strategy_utils.walk_forward_ml` over the full history of synthetic tickers (20 years of bars, quarterly retrains on
+an expanding window), with the retrains warm-started (trees added to the previous forest) against full refits of the forest
+at every retrain. Reports the fitting time, the number of retrains and the out-of-sample accuracy of the stitched test windows.
+
+Usage:
+------
+    python -m benchmarks.walk_forward_ml_benchmark [n_tickers] [retrain_weeks]
+"""
+
+
+
+import io
+import sys
+import time
+import contextlib
+import numpy as np
+from app.helpers import indicator_utils, strategy_utils
+from benchmarks.common import synthetic_bars
+
+def run(frames, spec, retrain_weeks, warm_start):
+    elapsed, fitting, correct, rows, retrains = 0.0, 0.0, 0, 0, 0
+    for data in frames.values():
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = strategy_utils.walk_forward_ml(None, 'indicator_ml', retrain_weeks=retrain_weeks, warm_start=warm_start, n_jobs=1, data=data)
+        elapsed += time.perf_counter() - start
+        windows = result['windows']
+        fitting += windows['fit_seconds'].sum()
+        correct += np.nansum(windows['test_accuracy'] * windows['test_rows'])
+        rows += windows['test_rows'].sum()
+        retrains += len(windows)
+    return elapsed, fitting, retrains, correct / rows
+
+def main(n_tickers=2, retrain_weeks=13):
+    spec = strategy_utils.STRATEGIES['indicator_ml']
+    frames = indicator_utils.compute_frames(synthetic_bars(n_tickers), spec['indicators'])
+    frames = {ticker: frame.astype(np.float64) for ticker, frame in frames.items()}
+    print(f"[benchmarks/walk_forward_ml_benchmark.py]: {n_tickers} tickers, {sum(map(len, frames.values()))} bars, retrain every {retrain_weeks} weeks")
+    print(f"  {'mode':<14}{'total':>10}{'fitting':>10}{'retrains':>10}{'OOS accuracy':>14}")
+    for label, warm_start in [('full refit', False), ('warm start', True)]:
+        elapsed, fitting, retrains, accuracy = run(frames, spec, retrain_weeks, warm_start)
+        print(f"  {label:<14}{elapsed:>9.2f}s{fitting:>9.2f}s{retrains:>10}{accuracy:>14.3f}")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # the helpers read and write under ./app/static/data (store, model registry, plots): an empty one per test
+    (tmp_path / 'app' / 'static' / 'data').mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,27 @@
+from app.helpers import feature_utils, store_utils, strategy_utils
+from benchmarks.common import synthetic_bars
+
+
+def test_ml_requests_read_the_feature_rows_from_the_store(workdir, monkeypatch):
+    bars = synthetic_bars(2)
+    store_utils.write_tickers('ohlcv', bars)
+    store_utils.write_tickers('benchmark', {'SPY': bars['T0000']})
+    builds = []
+    ml_feature_rows = strategy_utils.ml_feature_rows
+    monkeypatch.setattr(strategy_utils, 'ml_feature_rows', lambda *args: builds.append(args[1]) or ml_feature_rows(*args))
+
+    # missing from the store: the rows are built once from the indicators of the request and stored
+    spec = strategy_utils.STRATEGIES['indicator_ml']
+    first = strategy_utils.indicator_ml_strategy('T0001')
+    assert len(builds) == 1
+    assert feature_utils.stale_features(spec, ['T0001'])[0] == []
+
+    # the next request reads them back (same rows, so the same cached model and metrics)
+    second = strategy_utils.indicator_ml_strategy('T0001')
+    assert len(builds) == 1
+    assert first[1]['trades'] == second[1]['trades'] and first[1]['total_return'] == second[1]['total_return']
+
+    # new bars make the stored rows stale, they are rebuilt on the next request
+    store_utils.write_tickers('ohlcv', {'T0001': bars['T0001'].iloc[:-5]})
+    strategy_utils.indicator_ml_strategy('T0001')
+    assert len(builds) == 2
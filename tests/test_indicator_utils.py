@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.helpers import indicator_utils
+
+# Values of the pandas_ta 0.3.14b0 definitions (SMA/EMA, RSI and ADX with wilder's RMA, Bollinger Bands with ddof=0)
+# on the bars of `reference_bars`, recorded at rows 29, 59 and 119 (10 decimals), so the kernels are checked without the library
+REFERENCE_ROWS = [29, 59, 119]
+REFERENCE_VALUES = {
+    'log_return': [0.0022661797, -0.013513245, 0.0038549183],
+    'sma_10': [81.3122570905, 75.797769449, 70.6377631632],
+    'ema_10': [81.814529606, 76.0311689709, 70.3996996342],
+    'rsi_14': [14.248438943, 55.7339443708, 44.9964315683],
+    'adx_14': [61.882895533, 25.8563730033, 15.4198683611],
+    '+DI_14': [8.1215054235, 25.3698950054, 24.9004838197],
+    '-DI_14': [50.5858442576, 26.3897008178, 31.8123174241],
+    'bb_5_lb': [75.2458769347, 74.40384695, 68.6238746748],
+    'bb_5_mb': [79.0561316121, 76.9043018014, 69.7456346432],
+    'bb_5_ub': [82.8663862896, 79.4047566528, 70.8673946116],
+    'bb_5_bw': [9.6393653465, 6.5027697875, 3.216717359],
+    'bb_5_p': [0.3616093566, 0.6761883672, 0.7776623952],
+    'norm_volume_5': [1.4239377706, 0.8554815876, 1.315530536],
+}
+# leading bars without a value (warm-up of the windows and recursions)
+WARMUP_ROWS = {
+    'log_return': 1, 'sma_10': 9, 'ema_10': 9, 'rsi_14': 14, 'adx_14': 27, '+DI_14': 14, '-DI_14': 14,
+    'bb_5_lb': 4, 'bb_5_mb': 4, 'bb_5_ub': 4, 'bb_5_bw': 4, 'bb_5_p': 4, 'norm_volume_5': 4,
+}
+
+
+def reference_bars(rows=120, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    high = close * (1 + rng.uniform(0, 0.02, rows))
+    low = close * (1 - rng.uniform(0, 0.02, rows))
+    volume = rng.integers(1000, 100000, rows).astype(np.float64)
+    index = pd.bdate_range('2020-01-01', periods=rows, name='date')
+    return pd.DataFrame({'open': (high + low) / 2, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+@pytest.fixture(scope='module')
+def indicators():
+    return indicator_utils.compute_indicators(reference_bars(), list(REFERENCE_VALUES))
+
+
+@pytest.mark.parametrize('column', list(REFERENCE_VALUES))
+def test_kernels_match_the_recorded_reference_values(indicators, column):
+    np.testing.assert_allclose(indicators[column].iloc[REFERENCE_ROWS], REFERENCE_VALUES[column], rtol=1e-9, atol=1e-9)
+    assert indicators[column].iloc[:WARMUP_ROWS[column]].isna().all()
+    assert indicators[column].iloc[WARMUP_ROWS[column]:].notna().all()
+
+
+def test_panel_pass_matches_the_single_ticker_computation(indicators):
+    frames = {'A': reference_bars(), 'B': reference_bars(seed=8).iloc[30:]}
+    computed = indicator_utils.compute_frames(frames, list(REFERENCE_VALUES))
+    pd.testing.assert_frame_equal(computed['A'][list(REFERENCE_VALUES)], indicators[list(REFERENCE_VALUES)], rtol=1e-12)
+
+
+@pytest.mark.parametrize('new_bars', [1, 7])
+def test_update_from_the_carried_state_matches_a_full_recompute(new_bars):
+    # two end-of-day refreshes of `new_bars` bars, each from the state carried by the previous pass and the warm-up tail
+    columns = ['log_return'] + indicator_utils.DEFAULT_INDICATORS
+    frames = {'A': reference_bars(300), 'B': reference_bars(300, seed=8).iloc[40:]}
+    full = indicator_utils.compute_frames(frames, columns)
+    history = {t: data.iloc[:-2 * new_bars] for t, data in frames.items()}
+    states = {}
+    indicator_utils.compute_frames(history, columns, states)
+    rows = indicator_utils.warmup_rows(columns, list(reference_bars(1).columns))
+    for _ in range(2):
+        new = {t: data.iloc[len(history[t]):len(history[t]) + new_bars] for t, data in frames.items()}
+        tails = {t: data.iloc[-rows:] for t, data in history.items()}
+        updated = indicator_utils.update_frames(tails, new, states, columns)
+        for t in frames:
+            expected = full[t].iloc[len(history[t]):len(history[t]) + new_bars]
+            pd.testing.assert_frame_equal(updated[t][expected.columns], expected, rtol=1e-9, atol=1e-9)
+        history = {t: data.iloc[:len(history[t]) + new_bars] for t, data in frames.items()}
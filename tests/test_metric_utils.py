@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.helpers import metric_utils
+
+
+def test_profit_factor_without_a_down_day_is_nan():
+    metrics = metric_utils.performance_grid(np.array([[.01, .01], [.02, -.01]]))
+    assert np.isnan(metrics['profit_factor'][0])
+    np.testing.assert_allclose(metrics['profit_factor'][1], np.log1p(.01) / -np.log1p(-.01))
+    # the per-strategy kernel ranks such a parameter set with the undefined metrics, not last by a negative value
+    grid = metric_utils.strategy_performance_grid(np.ones((2, 2)), np.log1p(np.array([[.01, .02], [.01, -.01]])))
+    assert np.isnan(grid['profit_factor'][0]) and grid['profit_factor'][1] > 0
+
+
+def test_trade_profit_factor_without_a_losing_trade_is_nan():
+    rows = np.array([0, 0, 1, 1])
+    metrics = metric_utils.trade_performance_grid(rows, np.array([.01, .02, .03, -.01]), np.array([7, 7, 7, 7]), 3)
+    assert np.isnan(metrics['profit_factor'][0])
+    np.testing.assert_allclose(metrics['profit_factor'][1], 3.0)
+    assert np.isnan(metrics['profit_factor'][2])  # no trade
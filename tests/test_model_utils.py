@@ -0,0 +1,56 @@
+from sklearn.ensemble import RandomForestClassifier
+
+from app.helpers import feature_utils, model_utils, store_utils, strategy_utils
+from benchmarks.common import synthetic_bars
+
+
+def test_batch_models_are_not_evicted_past_the_cache_size(workdir, monkeypatch):
+    monkeypatch.setattr(model_utils, 'DEFAULT_MODEL_CACHE_SIZE', 1)
+    store_utils.write_tickers('ohlcv', synthetic_bars(3))
+    report = strategy_utils.train_models('indicator_ml', workers=1, n_jobs=1)
+    assert len(report) == 3 and (report['status'] == 'trained').all()
+
+    # every model of the run is then served from the registry, even after a request fit over the capacity
+    spec = strategy_utils.STRATEGIES['indicator_ml']
+    FEATURES = spec['model_features']
+    training_sets = {}
+    for ticker in report.index:
+        train, _, _, train_window = strategy_utils.ml_split(feature_utils.ticker_features(spec, ticker), spec)
+        training_sets[ticker] = (train, train_window)
+    train, train_window = training_sets['T0001']
+    _, cached = model_utils.cached_fit('T0001', FEATURES, train_window, train[FEATURES].iloc[:-1], train['target'].iloc[:-1], RandomForestClassifier)
+    assert not cached
+    for ticker, (train, train_window) in training_sets.items():
+        _, cached = model_utils.cached_fit(ticker, FEATURES, train_window, train[FEATURES], train['target'], RandomForestClassifier)
+        assert cached
+
+
+def test_a_newer_batch_model_unpins_the_previous_one(workdir, monkeypatch):
+    monkeypatch.setattr(model_utils, 'DEFAULT_MODEL_CACHE_SIZE', 1)
+    meta = {'ticker': 'AAPL', 'features': ['x1'], 'train_window': [None, '2022-12-31']}
+    for key in ['old', 'new']:
+        model_utils.write_model(key, {'model': key})
+        model_utils.commit_models({key: meta}, pinned=True)
+    models = model_utils.read_model_index()['models']
+    assert models['new']['pinned'] and not models['old']['pinned']
+
+    # the unpinned model is back in the LRU: evicted once the request models fill the capacity
+    model_utils.write_model('request', {'model': 'request'})
+    model_utils.commit_models({'request': {**meta, 'ticker': 'MSFT'}})
+    assert sorted(model_utils.read_model_index()['models']) == ['new', 'request']
+    assert model_utils.load_model('new') == {'model': 'new'}
+
+
+def test_batch_training_warms_the_key_of_the_request_path(workdir, monkeypatch):
+    bars = synthetic_bars(2)
+    store_utils.write_tickers('ohlcv', bars)
+    store_utils.write_tickers('benchmark', {'SPY': bars['T0000']})
+    report = strategy_utils.train_models('indicator_ml', tickers=['T0001'], workers=1, n_jobs=1)
+    assert report.loc['T0001', 'status'] == 'trained'
+
+    fits = []
+    cached_fit = model_utils.cached_fit
+    monkeypatch.setattr(model_utils, 'cached_fit', lambda *args: fits.append(cached_fit(*args)) or fits[-1])
+    strategy_utils.indicator_ml_strategy('T0001')
+    (model, cached), = fits
+    assert cached and isinstance(model, RandomForestClassifier)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from app.helpers import montecarlo_utils
+
+
+@pytest.mark.parametrize('returns', [[], [np.nan, np.nan], [0.01]])
+def test_too_few_returns_give_nan_intervals(returns):
+    intervals = montecarlo_utils.confidence_intervals(np.array(returns), resamples=100, block_size=7)
+    for name in montecarlo_utils.BOOTSTRAP_METRICS:
+        assert len(intervals[name]) == 3 and np.isnan(intervals[name]).all()
+    assert intervals['resamples'] == 100 and intervals['block_size'] == 7
+
+
+def test_intervals_are_ordered():
+    returns = np.random.default_rng(0).normal(0.0005, 0.01, 500)
+    intervals = montecarlo_utils.confidence_intervals(returns, resamples=1000, block_size=5)
+    for name in montecarlo_utils.BOOTSTRAP_METRICS:
+        low, median, high = intervals[name]
+        assert np.isfinite([low, median, high]).all() and low <= median <= high
+
+
+def test_paths_without_a_losing_day_have_no_profit_factor():
+    returns = np.r_[np.full(50, 0.01), -0.01]
+    with np.errstate(all='raise'):
+        metrics = montecarlo_utils.bootstrap_metrics(returns, resamples=200, block_size=5)
+    no_loss = metrics['profit_factor'][np.isnan(metrics['profit_factor'])]
+    assert len(no_loss) and not np.isinf(metrics['profit_factor']).any()
+    intervals = montecarlo_utils.confidence_intervals(returns, resamples=200, block_size=5)
+    assert np.isfinite(intervals['profit_factor']).all()
+
+
+def test_no_losing_day_at_all_gives_a_nan_profit_factor_interval(recwarn):
+    intervals = montecarlo_utils.confidence_intervals(np.full(30, 0.01), resamples=100, block_size=5)
+    assert np.isnan(intervals['profit_factor']).all()
+    assert np.isfinite(intervals['total_return']).all()
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
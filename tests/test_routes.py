@@ -0,0 +1,13 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.routes.stock import table_records
+
+
+def test_table_records_are_valid_json():
+    table = pd.DataFrame({'profit_factor': [np.inf, -np.inf, np.nan, 1.23456]})
+    records = table_records(table)
+    assert [r['profit_factor'] for r in records] == [None, None, None, 1.235]
+    json.dumps(records, allow_nan=False)
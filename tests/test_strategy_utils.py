@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.helpers import market_utils, store_utils, strategy_utils
+from benchmarks.common import synthetic_bars
+
+
+@pytest.mark.parametrize('name', ['ema_crossover_rsi', 'rsi_adx'])
+def test_cross_sectional_loads_are_compact_with_the_same_results(workdir, name):
+    store_utils.write_tickers('ohlcv', synthetic_bars(8))
+    spec = strategy_utils.STRATEGIES[name]
+    compact = market_utils.process_data(columns=spec['indicators'])
+    assert compact['rsi_14'].dtype == np.float32
+    assert compact['log_return'].dtype == compact['close'].dtype == np.float64
+    full = market_utils.process_data(columns=spec['indicators'], dtype=np.float64)
+
+    # the compact load is the default of the batch backtest and of the portfolio signals
+    leaderboard, _ = strategy_utils.batch_strategy(name)
+    pd.testing.assert_frame_equal(leaderboard, strategy_utils.batch_strategy(name, data=full)[0], rtol=1e-9)
+    signals, returns = strategy_utils.signal_panels(name)
+    expected_signals, expected_returns = strategy_utils.signal_panels(name, data=full)
+    pd.testing.assert_frame_equal(signals, expected_signals)
+    pd.testing.assert_frame_equal(returns, expected_returns)